@@ -0,0 +1,91 @@
+import argparse
+import sys
+import time
+from config import TICK, PlayerInput
+from engine import initial_state, start_match, step
+from policies import POLICIES, get_policy
+
+# Runner de partidas em lote: sem sockets, sem sleep, só o step puro.
+
+def play_match(p1, p2, seconds=None):
+    """Joga uma partida completa entre duas políticas.
+    seconds limita a duração (padrão: TIME_LIMIT_SECONDS do config).
+    Retorna (estado final, número de passos)."""
+    state = initial_state()
+    if seconds is not None:
+        state = state._replace(time_left=float(seconds))
+    state = start_match(state)
+    ticks = 0
+    while not state.game_over:
+        state = step(state, PlayerInput(p1(state, 1)), PlayerInput(p2(state, 2)))
+        ticks += 1
+    return state, ticks
+
+def run_batch(matches, p1_name, p2_name, seed=0, seconds=None):
+    """Roda várias partidas e retorna um resumo (dict)."""
+    summary = {"matches": matches, "wins1": 0, "wins2": 0, "draws": 0,
+               "goals1": 0, "goals2": 0, "ticks": 0}
+    started = time.perf_counter()
+    for i in range(matches):
+        p1 = get_policy(p1_name, seed + 2 * i)
+        p2 = get_policy(p2_name, seed + 2 * i + 1)
+        state, ticks = play_match(p1, p2, seconds)
+        summary["ticks"] += ticks
+        summary["goals1"] += state.score1
+        summary["goals2"] += state.score2
+        if state.winner == 1:
+            summary["wins1"] += 1
+        elif state.winner == 2:
+            summary["wins2"] += 1
+        else:
+            summary["draws"] += 1
+    summary["elapsed"] = time.perf_counter() - started
+    return summary
+
+def run_batch_vec(matches, p1_name, p2_name, seed=0, seconds=None):
+    """Mesmo resumo de run_batch, com as partidas em paralelo (requer NumPy)."""
+    from engine_vec import play_matches
+    started = time.perf_counter()
+    batch, ticks = play_matches(matches, p1_name, p2_name, seed, seconds)
+    return {
+        "matches": matches,
+        "wins1": int((batch.winner == 1).sum()),
+        "wins2": int((batch.winner == 2).sum()),
+        "draws": int((batch.winner == 0).sum()),
+        "goals1": int(batch.score1.sum()),
+        "goals2": int(batch.score2.sum()),
+        "ticks": ticks * matches,
+        "elapsed": time.perf_counter() - started,
+    }
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Partidas em lote sem rede (engine puro)")
+    parser.add_argument("--matches", type=int, default=100, help="número de partidas")
+    parser.add_argument("--p1", choices=sorted(POLICIES), default="track", help="política do jogador 1")
+    parser.add_argument("--p2", choices=sorted(POLICIES), default="random", help="política do jogador 2")
+    parser.add_argument("--seed", type=int, default=0, help="semente das políticas aleatórias")
+    parser.add_argument("--seconds", type=float, default=None,
+                        help="duração de cada partida em segundos de jogo")
+    parser.add_argument("--vectorized", action="store_true",
+                        help="simula todas as partidas juntas com NumPy (engine_vec)")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args(sys.argv[1:])
+    if args.vectorized:
+        try:
+            s = run_batch_vec(args.matches, args.p1, args.p2, args.seed, args.seconds)
+        except ImportError:
+            print("--vectorized requer NumPy (pip install numpy)")
+            sys.exit(1)
+    else:
+        s = run_batch(args.matches, args.p1, args.p2, args.seed, args.seconds)
+    elapsed = max(s["elapsed"], 1e-9)
+    print(f"{s['matches']} partidas ({args.p1} x {args.p2})")
+    print(f"Vitórias J1: {s['wins1']}  Vitórias J2: {s['wins2']}  Empates: {s['draws']}")
+    print(f"Gols: {s['goals1']} x {s['goals2']}")
+    print(f"{s['ticks']} passos ({s['ticks'] * TICK:.0f}s de jogo) em {elapsed:.2f}s: "
+          f"{s['ticks'] / elapsed:.0f} passos/s, {s['matches'] / elapsed:.1f} partidas/s")
+
+if __name__ == "__main__":
+    main()
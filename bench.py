@@ -0,0 +1,261 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from config import PADDLE_DISTANCE_FROM_GOAL, PlayerInput
+from codec import FrameReader, get_codec
+from engine import check_paddle_collision, initial_state, start_match, step
+from policies import RandomPolicy, TrackBall
+
+# Micro-benchmarks dos caminhos quentes de cada tick, com cargas fixas
+# (semeadas) e baselines gravados em BASELINE_PATH. Um benchmark regride
+# quando fica mais lento que o baseline além do limite (--threshold ou o
+# "threshold" do arquivo); nesse caso a saída é 1.
+# A comparação usa o custo relativo a uma carga de referência em Python puro,
+# medida intercalada com o benchmark: variações de clock/carga da máquina
+# afetam as duas e se cancelam. O ns/op absoluto é só informativo.
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+DEFAULT_THRESHOLD = 0.25  # 25% mais lento que o baseline
+
+BENCHMARKS = {}  # nome -> função que monta a carga e retorna (run, operações)
+
+def benchmark(name):
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+# ------------------ Cargas ------------------
+
+def match_states(count=2000, seed=1):
+    """Estados e inputs de uma partida real (track x random), em ordem."""
+    p1, p2 = TrackBall(seed), RandomPolicy(seed)
+    state = start_match(initial_state())
+    states = []
+    for _ in range(count):
+        inputs = (PlayerInput(p1(state, 1)), PlayerInput(p2(state, 2)))
+        states.append((state, inputs))
+        state = step(state, *inputs)
+    return states
+
+class FakeConn:
+    """Socket que entrega um stream fixo em pedaços do tamanho de um segmento TCP."""
+
+    def __init__(self, data, chunk=1460):
+        self.data = memoryview(data)
+        self.chunk = chunk
+        self.pos = 0
+
+    def recv_into(self, view):
+        n = min(len(view), self.chunk, len(self.data) - self.pos)
+        view[:n] = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+def chunks(data, size=1460):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+# ------------------ Benchmarks ------------------
+
+@benchmark("engine.step")
+def bench_step():
+    states = match_states()
+
+    def run():
+        for state, (p1_input, p2_input) in states:
+            step(state, p1_input, p2_input)
+    return run, len(states)
+
+@benchmark("engine.check_paddle_collision")
+def bench_paddle_collision():
+    rng = random.Random(2)
+    # Metade perto do paddle (colide), metade no campo
+    cases = [(PADDLE_DISTANCE_FROM_GOAL + rng.uniform(-40, 40), rng.uniform(250, 410),
+              rng.choice((-6.0, 6.0)), rng.uniform(-4, 4), PADDLE_DISTANCE_FROM_GOAL, 330.0)
+             for _ in range(10000)]
+
+    def run():
+        for case in cases:
+            check_paddle_collision(*case)
+    return run, len(cases)
+
+def encode_state_bench(name):
+    codec = get_codec(name)
+    states = [state for state, _ in match_states()]
+
+    def run():
+        for tick, state in enumerate(states):
+            codec.encode_state(state, tick, 1, (tick, tick))
+    return run, len(states)
+
+def encode_delta_bench(name):
+    codec = get_codec(name)
+    states = [state for state, _ in match_states()]
+    pairs = list(zip(states, states[1:]))
+
+    def run():
+        for tick, (base, state) in enumerate(pairs):
+            codec.encode_delta(state, tick + 1, base, tick, 1, (tick, tick))
+    return run, len(pairs)
+
+@benchmark("codec.json.encode_state")
+def bench_json_encode():
+    return encode_state_bench("json")
+
+@benchmark("codec.bin.encode_state")
+def bench_bin_encode():
+    return encode_state_bench("bin")
+
+@benchmark("codec.json.encode_delta")
+def bench_json_delta():
+    return encode_delta_bench("json")
+
+@benchmark("codec.bin.encode_delta")
+def bench_bin_delta():
+    return encode_delta_bench("bin")
+
+@benchmark("client.dict_to_json_string")
+def bench_client_json():
+    from client import dict_to_json_string
+    states = [state._asdict() for state, _ in match_states()]
+
+    def run():
+        for data in states:
+            dict_to_json_string(data)
+    return run, len(states)
+
+@benchmark("server.get_lines")
+def bench_get_lines():
+    from server import get_lines
+    rng = random.Random(3)
+    lines = [json.dumps({"direction": rng.choice((-1, 0, 1)), "seq": seq, "tick": seq, "ack": seq},
+                        separators=(',', ':')).encode("utf-8") for seq in range(1, 20001)]
+    stream = b"\\n".join(lines) + b"\\n"
+
+    def run():
+        for _line in get_lines(FakeConn(stream)):
+            pass
+    return run, len(lines)
+
+def frame_reader_bench(name):
+    codec = get_codec(name)
+    states = [state for state, _ in match_states()]
+    stream = b"".join(codec.encode_state(state, tick, 1) for tick, state in enumerate(states))
+    pieces = chunks(stream)
+
+    def run():
+        reader = FrameReader(codec)
+        for piece in pieces:
+            reader.feed(piece)
+    return run, len(states)
+
+@benchmark("client.FrameReader.json")
+def bench_reader_json():
+    return frame_reader_bench("json")
+
+@benchmark("client.FrameReader.bin")
+def bench_reader_bin():
+    return frame_reader_bench("bin")
+
+# ------------------ Execução ------------------
+
+def reference():
+    """Carga de referência (Python puro: laço, aritmética, dict e tupla)."""
+    table = {}
+    total = 0.0
+    for i in range(20000):
+        x = (i * 7919) % 1000
+        table[x] = table.get(x, 0) + 1
+        total += (x, i)[0] * 0.5
+    return total
+
+def timed(run, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        run()
+    return (time.perf_counter() - started) / rounds
+
+def measure(setup, repeat=5, min_time=0.1):
+    """Retorna (ns por operação, custo relativo): melhor de `repeat` rodadas,
+    cada uma com a carga repetida até durar min_time, e a razão entre o
+    tempo da carga e o da referência medida logo antes."""
+    run, ops = setup()
+    run()  # aquecimento
+    rounds = max(1, int(min_time / max(timed(run, 1), 1e-9)))
+    ref_rounds = max(1, int(min_time / max(timed(reference, 1), 1e-9)))
+    best = best_ratio = None
+    for _ in range(repeat):
+        ref = timed(reference, ref_rounds)
+        elapsed = timed(run, rounds)
+        ratio = elapsed / ref
+        best = elapsed if best is None else min(best, elapsed)
+        best_ratio = ratio if best_ratio is None else min(best_ratio, ratio)
+    return best / ops * 1e9, best_ratio / ops
+
+def load_baseline(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"threshold": DEFAULT_THRESHOLD, "benchmarks": {}}
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks dos caminhos quentes")
+    parser.add_argument("names", nargs="*", help="benchmarks a rodar (padrão: todos; aceita prefixo)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="arquivo de baselines (JSON)")
+    parser.add_argument("--threshold", type=float, default=None,
+                        help="regressão tolerada (0.25 = 25%% mais lento); padrão: o do arquivo")
+    parser.add_argument("--update", action="store_true",
+                        help="grava os resultados como novos baselines")
+    parser.add_argument("--repeat", type=int, default=5, help="rodadas por benchmark (vale a melhor)")
+    parser.add_argument("--list", action="store_true", help="lista os benchmarks")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args(sys.argv[1:])
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return
+    names = [name for name in BENCHMARKS
+             if not args.names or any(name.startswith(prefix) for prefix in args.names)]
+    if not names:
+        print(f"Nenhum benchmark corresponde a {args.names}")
+        sys.exit(2)
+
+    baseline = load_baseline(args.baseline)
+    threshold = args.threshold if args.threshold is not None else baseline.get("threshold", DEFAULT_THRESHOLD)
+    results = {}
+    regressions = []
+    print(f"{'benchmark':<32}{'ns/op':>12}{'relativo':>12}{'baseline':>12}{'variação':>10}")
+    for name in names:
+        ns, relative = measure(BENCHMARKS[name], args.repeat)
+        results[name] = (ns, relative)
+        base = baseline["benchmarks"].get(name, {}).get("relative")
+        if base is None:
+            print(f"{name:<32}{ns:>12.1f}{relative:>12.3e}{'-':>12}{'-':>10}")
+            continue
+        change = relative / base - 1
+        mark = ""
+        if change > threshold:
+            regressions.append(name)
+            mark = "  REGRESSÃO"
+        print(f"{name:<32}{ns:>12.1f}{relative:>12.3e}{base:>12.3e}{change:>+10.1%}{mark}")
+
+    if args.update:
+        baseline.setdefault("threshold", DEFAULT_THRESHOLD)
+        for name, (ns, relative) in results.items():
+            baseline["benchmarks"][name] = {"ns_per_op": round(ns, 1), "relative": float(f"{relative:.4e}")}
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baselines gravados em {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} benchmark(s) mais lentos que o baseline + {threshold:.0%}: "
+              + ", ".join(regressions))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
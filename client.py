@@ -1,9 +1,11 @@
+import argparse
 import json
 import socket
 import sys
-import pygame
 import threading
 import time
+from collections import deque
+from functools import lru_cache
 from config import (
     TICK, GameState, PlayerInput, WIDTH, HEIGHT,
     BLACK, WHITE, GRAY,
@@ -11,100 +13,377 @@ from config import (
     PADDLE_WIDTH, PADDLE_HEIGHT, BALL_SIZE,
     FONT_SIZE, SMALL_FONT_SIZE,
     GOAL_HEIGHT, GOAL_Y, PADDLE_DISTANCE_FROM_GOAL,
-    HUD_HEIGHT, GOAL_INSET, GOAL_BAR_LENGTH, GOAL_THICKNESS
+    HUD_HEIGHT, GOAL_INSET, GOAL_BAR_LENGTH, GOAL_THICKNESS,
+    STATE_HISTORY, INPUT_DELAY_TICKS, INPUT_WINDOW_TICKS, STEP_SCALE,
+    INTERP_DELAY_TICKS, MAX_EXTRAPOLATION_TICKS
 )
+from codec import (
+    CODECS, DEFAULT_CODEC, FrameReader, get_codec, split_frames, encode_udp_input, seq_acked
+)
+from engine import move_paddle
+from policies import POLICIES, get_policy
 
-if len(sys.argv) != 3:
-    print(f"Uso: python {sys.argv[0]} <host> <porta>")
-    sys.exit(1)
-
-host = sys.argv[1]
+# pygame só é necessário para a janela (o modo --bot roda sem ele)
 try:
-    port = int(sys.argv[2])
-except ValueError:
-    print("A porta deve ser um número inteiro.")
-    sys.exit(1)
+    import pygame
+except ImportError:
+    pygame = None
+
+# Intervalo de reenvio do input mesmo sem mudança de direção
+SEND_EVERY = 0.10  # segundos
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog=f"python {sys.argv[0]}", description="Cliente do Hockey")
+    parser.add_argument("host")
+    parser.add_argument("porta")
+    parser.add_argument("--codec", choices=sorted(CODECS), default=DEFAULT_CODEC,
+                        help="codificação do estado recebido do servidor")
+    parser.add_argument("--spectate", action="store_true",
+                        help="apenas assiste (não ocupa vaga de jogador)")
+    parser.add_argument("--room", type=int, default=None,
+                        help="sala a assistir (padrão: primeira partida em andamento)")
+    parser.add_argument("--udp", action="store_true",
+                        help="recebe snapshots e envia inputs por UDP (usa o codec bin)")
+    parser.add_argument("--bot", choices=sorted(POLICIES), default=None,
+                        help="sem janela: o paddle é controlado pela política escolhida")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="semente da política do bot")
+    parser.add_argument("--duration", type=float, default=None,
+                        help="(bot) encerra após esse número de segundos")
+    parser.add_argument("--report", type=float, default=5.0,
+                        help="(bot) intervalo em segundos do log de latência e vazão")
+    return parser.parse_args(argv)
 
 def dict_to_json_string(data: dict) -> str:
     return json.dumps(data, ensure_ascii=False)
 
-def json_string_to_dict(json_str: str) -> dict:
-    return json.loads(json_str)
-
-# Variáveis globais
+# Variáveis globais (conexão configurada em main)
+args = None
+host = None
+port = None
+codec = None
+s = None
 running = True
 current_direction = 0
 game_state_data = None
+last_tick = None     # último tick recebido (confirmado ao servidor no input)
+state_history = {}   # tick -> GameState, bases para os deltas
+udp_sock = None      # canal UDP (após o servidor enviar o token)
+udp_token = None
+input_seq = 0        # número de sequência dos inputs enviados
+# Frames chegam pelas threads do TCP e do UDP: apply_frame/handle_control
+# rodam sob este lock (reentrante: apply_frame trata controles)
+frame_lock = threading.RLock()
+
+# Predição do próprio paddle, reconciliada com os acks dos snapshots
+player_num = None    # 1 ou 2, informado pelo servidor nas boas-vindas
+pending_inputs = []  # (seq, direction, último tick visto ao enviar) ainda não aplicados
+acked_direction = 0  # direção do último input confirmado
+input_lag = float(INPUT_DELAY_TICKS)  # ticks entre o tick visto e a aplicação no servidor
+auth_paddle = None   # (tick, y) do próprio paddle no último snapshot
+last_state_time = 0.0
+prediction_lock = threading.Lock()
+
+# Interpolação: últimos snapshots com o tick do servidor
+snapshots = deque(maxlen=32)  # (tick, GameState)
+snapshot_step = 1             # ticks entre snapshots (informado em cada frame)
+tick_offset = None            # tick do servidor ~= time.time() / TICK + tick_offset
+
+# Estatísticas da conexão (log do modo bot)
+rx_bytes = 0         # bytes recebidos (TCP + UDP)
+rx_frames = 0        # snapshots aplicados
+ack_latencies = deque(maxlen=256)  # envio do input -> snapshot que o confirma (s)
+
+def connect():
+    """Conecta ao servidor e manda a primeira mensagem (codec e papel)."""
+    global s
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.connect((host, port))
+    print(f"Conectado ao servidor {host}:{port}")
+
+    # O servidor assume JSON e jogador
+    hello = {}
+    if codec.name != DEFAULT_CODEC:
+        hello["codec"] = codec.name
+    if args.spectate:
+        hello["role"] = "spectator"
+        if args.room is not None:
+            hello["room"] = args.room
+    if args.udp:
+        hello["udp"] = True
+    if hello:
+        s.sendall((dict_to_json_string(hello) + "\\n").encode("utf-8"))
+
+def handle_control(message):
+    """Mensagens de controle do servidor."""
+    global udp_sock, udp_token, player_num
+    with frame_lock:
+        if "player" in message:
+            player_num = message["player"]
+        if "udp_token" in message and udp_sock is None:
+            udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            udp_sock.connect((host, port))
+            udp_token = message["udp_token"]
+            threading.Thread(target=receive_udp_game_state, daemon=True).start()
+            # O primeiro datagrama registra o endereço UDP no servidor
+            send_player_input()
+            print("Canal UDP ativo")
+        elif message.get("udp") is False:
+            print("Servidor sem UDP; seguindo pelo TCP")
+
+def apply_frame(frame):
+    """Decodifica um frame (keyframe, delta ou controle) e atualiza o estado atual."""
+    global game_state_data, last_tick, snapshot_step, rx_frames
+    with frame_lock:
+        message = codec.decode_control(frame)
+        if message is not None:
+            handle_control(message)
+            return
+        tick, step, acks, state = codec.decode_state(frame, state_history)
+        if last_tick is not None and tick <= last_tick:
+            return  # pacote velho (UDP fora de ordem ou repetido pelo TCP)
+        if state is None:
+            return  # delta sem base conhecida: aguarda o próximo keyframe
+        state_history[tick] = state
+        for old in [t for t in state_history if t <= tick - STATE_HISTORY]:
+            del state_history[old]
+        last_tick = tick
+        rx_frames += 1
+        game_state_data = state._asdict()
+        snapshots.append((tick, state))
+        snapshot_step = max(1, step)
+        sync_clock(tick)
+        if player_num is not None:
+            reconcile(tick, acks[player_num - 1], state.p1y if player_num == 1 else state.p2y)
+
+def reconcile(tick, ack, y):
+    """Descarta os inputs que o servidor já aplicou (seq <= ack) e guarda a
+    posição autoritativa do próprio paddle, base da predição.
+    O último input confirmado mede o atraso real de aplicação (no mínimo
+    INPUT_DELAY_TICKS; o servidor aumenta o atraso de cada jogador com o RTT)."""
+    global acked_direction, auth_paddle, last_state_time, input_lag
+    with prediction_lock:
+        applied = None
+        while pending_inputs and seq_acked(pending_inputs[0][0], ack):
+            applied = pending_inputs.pop(0)
+        now = time.time()
+        if applied is not None:
+            _seq, acked_direction, seen_tick, sent_at = applied
+            lag = max(tick - seen_tick, INPUT_DELAY_TICKS)
+            input_lag += (lag - input_lag) * 0.25
+            ack_latencies.append(now - sent_at)
+        auth_paddle = (tick, y)
+        last_state_time = now
+
+def sync_clock(tick):
+    """Atualiza a estimativa do tick atual do servidor com um snapshot que
+    acabou de chegar. Adianta na hora (o snapshot mais rápido é o que melhor
+    mede o relógio) e recua devagar, para um pacote atrasado não puxar a
+    renderização para trás."""
+    global tick_offset
+    sample = tick - time.time() / TICK
+    if tick_offset is None or sample > tick_offset:
+        tick_offset = sample
+    else:
+        tick_offset += (sample - tick_offset) * 0.01
+
+def render_state():
+    """Estado a desenhar (None antes do primeiro snapshot): interpolado entre
+    os dois snapshots em volta de um tick um pouco no passado. Sem snapshot
+    novo a bola é extrapolada pela velocidade, limitada ao campo, por no
+    máximo MAX_EXTRAPOLATION_TICKS. Gol ou pausa entre os dois snapshots
+    (bola teleportada) não são interpolados."""
+    buffered = list(snapshots)
+    if not buffered or tick_offset is None:
+        return None
+    render_tick = time.time() / TICK + tick_offset - (INTERP_DELAY_TICKS + snapshot_step)
+
+    newest_tick, newest = buffered[-1]
+    if render_tick >= newest_tick:
+        if not newest.game_started or newest.game_over:
+            return newest
+        ahead = min(render_tick - newest_tick, MAX_EXTRAPOLATION_TICKS) * STEP_SCALE
+        return newest._replace(
+            ballx=max(0, min(WIDTH, newest.ballx + newest.ballvx * ahead)),
+            bally=max(HUD_HEIGHT + BALL_SIZE//2, min(HEIGHT - BALL_SIZE//2, newest.bally + newest.ballvy * ahead)),
+        )
+    if render_tick <= buffered[0][0]:
+        return buffered[0][1]
 
-# Conectar ao servidor
-s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-s.connect((host, port))
-print(f"Conectado ao servidor {host}:{port}")
+    for i in range(len(buffered) - 1, 0, -1):
+        t0, a = buffered[i - 1]
+        if t0 <= render_tick:
+            t1, b = buffered[i]
+            break
+    if (a.score1, a.score2, a.game_started) != (b.score1, b.score2, b.game_started):
+        return a
+    f = (render_tick - t0) / (t1 - t0)
+    return a._replace(
+        p1y=a.p1y + (b.p1y - a.p1y) * f,
+        p2y=a.p2y + (b.p2y - a.p2y) * f,
+        ballx=a.ballx + (b.ballx - a.ballx) * f,
+        bally=a.bally + (b.bally - a.bally) * f,
+    )
+
+def predicted_paddle_y():
+    """Posição prevista do próprio paddle (None sem snapshot/jogador).
+    Parte do y autoritativo do tick T e reaplica, passo a passo e com o mesmo
+    move_paddle do servidor, a direção que estará valendo em cada tick até
+    o tick em que o input atual deve ser aplicado (T + atraso medido), mais
+    os ticks passados desde o snapshot. Inputs não confirmados valem a partir
+    do tick em que foram vistos + atraso (no mínimo T + 1)."""
+    with prediction_lock:
+        if auth_paddle is None:
+            return None
+        tick, y = auth_paddle
+        pending = list(pending_inputs)
+        direction = acked_direction
+        lag = round(input_lag)
+        elapsed = int((time.time() - last_state_time) / TICK)
+    horizon = tick + lag + min(elapsed, INPUT_WINDOW_TICKS)
+    i = 0
+    for t in range(tick + 1, horizon + 1):
+        while i < len(pending) and max(pending[i][2] + lag, tick + 1) <= t:
+            direction = pending[i][1]
+            i += 1
+        y = move_paddle(y, direction)
+    return y
 
 def receive_game_state():
-    """Thread para receber o estado do jogo do servidor"""
-    global game_state_data
-    buffer = ""
+    """Thread para receber o estado do jogo pelo TCP (frames JSON ou binários)"""
+    global rx_bytes
+    reader = FrameReader(codec)
     while running:
         try:
-            data = s.recv(4096).decode("utf-8", errors="ignore")
+            data = s.recv(65536)
             if not data:
                 break
-            buffer += data
-            while True:
-                start = buffer.find('{')
-                if start == -1:
-                    buffer = ""
-                    break
-                # balanceamento de chaves
-                brace = 0
-                end = None
-                for i,ch in enumerate(buffer[start:], start):
-                    if ch == '{':
-                        brace += 1
-                    elif ch == '}':
-                        brace -= 1
-                        if brace == 0:
-                            end = i
-                            break
-                if end is None:
-                    # aguardar mais dados
-                    if start > 0:
-                        buffer = buffer[start:]
-                    break
-                try:
-                    json_str = buffer[start:end+1]
-                    buffer = buffer[end+1:]
-                    game_state_data = json_string_to_dict(json_str)
-                except json.JSONDecodeError:
-                    buffer = buffer[end+1:]
-                    continue
+            rx_bytes += len(data)
+            # Controles são sempre tratados; dos estados só interessa o mais recente
+            controls, newest = reader.feed(data)
+            for message in controls:
+                handle_control(message)
+            if newest is not None:
+                apply_frame(newest)
         except Exception as e:
             print(f"Erro ao receber dados: {e}")
             break
 
+def receive_udp_game_state():
+    """Thread para receber os snapshots pelo UDP (descarta os atrasados)"""
+    global rx_bytes
+    while running:
+        try:
+            data = udp_sock.recv(2048)
+            rx_bytes += len(data)
+            frames, _rest = split_frames(data)
+            if frames:
+                apply_frame(frames[-1])
+        except Exception as e:
+            print(f"Erro ao receber dados (UDP): {e}")
+            break
+
 def send_player_input():
     """Enviar input do jogador para o servidor"""
-    player_input = PlayerInput(direction=current_direction)
-    json_data = dict_to_json_string(player_input._asdict())
+    global input_seq
+    input_seq += 1
+    if player_num is not None:
+        with prediction_lock:
+            pending_inputs.append((input_seq, current_direction, last_tick or 0, time.time()))
+    if udp_token is not None:
+        try:
+            udp_sock.send(encode_udp_input(udp_token, input_seq, last_tick or 0, current_direction))
+        except OSError as e:
+            print(f"Erro ao enviar input (UDP): {e}")
+        return
+
+    # tick: último tick visto, para o servidor aplicar o input no tick certo
+    player_input = PlayerInput(direction=current_direction, seq=input_seq, tick=last_tick)
+    message = player_input._asdict()
+    if last_tick is not None:
+        message["ack"] = last_tick
+    json_data = dict_to_json_string(message)
     try:
         s.sendall((json_data + "\\n").encode("utf-8"))
     except Exception as e:
         print(f"Erro ao enviar input: {e}")
 
+def update_direction(new_direction, now, last_send):
+    """Envia o input quando a direção muda ou a cada SEND_EVERY (espectador
+    não envia). Retorna o horário do último envio."""
+    global current_direction
+    changed = new_direction != current_direction or (now - last_send) >= SEND_EVERY
+    if changed and not args.spectate:
+        current_direction = new_direction
+        send_player_input()
+        return now
+    return last_send
+
+# ---------------------- Bot (sem janela) ----------------------
+
+def report_stats(elapsed, frames, nbytes):
+    """Uma linha de log da conexão: vazão no intervalo e latência dos inputs."""
+    latencies = sorted(ack_latencies)
+    if latencies:
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000
+        latency = f"input->ack p50 {p50:.1f} ms p99 {p99:.1f} ms"
+    else:
+        latency = "input->ack sem amostras"
+    score = ""
+    if game_state_data is not None:
+        score = f" placar {game_state_data['score1']} x {game_state_data['score2']}"
+    print(f"[bot {host}:{port} J{player_num}] {frames / elapsed:.1f} snapshots/s "
+          f"{nbytes / elapsed / 1024:.1f} KiB/s, {latency}, atraso {input_lag:.1f} ticks{score}")
+
+def run_bot(policy, duration=None, report_every=5.0):
+    """Modo sem janela: a cada tick a política decide a direção a partir do
+    último estado recebido; usa os mesmos caminhos de recepção e envio."""
+    started = time.time()
+    last_send = 0.0
+    next_step = started
+    next_report = started + report_every
+    reported = (started, 0, 0)
+    while running and receive_thread.is_alive():
+        now = time.time()
+        if duration is not None and now - started >= duration:
+            break
+        new_direction = 0
+        if game_state_data is not None and player_num is not None:
+            new_direction = policy(GameState(**game_state_data), player_num)
+        last_send = update_direction(new_direction, now, last_send)
+
+        if now >= next_report:
+            last_time, last_frames, last_bytes = reported
+            report_stats(now - last_time, rx_frames - last_frames, rx_bytes - last_bytes)
+            reported = (now, rx_frames, rx_bytes)
+            next_report = now + report_every
+
+        next_step += TICK
+        time.sleep(max(0.0, next_step - time.time()))
+
 # ---------------------- Desenho ----------------------
 
+# Área da HUD (redesenhada só quando placar/tempo/aviso mudam)
+HUD_RECT = (0, 0, WIDTH, HUD_HEIGHT + 2)
+
+prev_rects = None   # paddles e bola do quadro anterior (None: redesenhar tudo)
+hud_values = None   # valores mostrados na HUD
+
+@lru_cache(maxsize=128)
+def render_text(font, text, color):
+    """Superfície do texto, cacheada por valor (placar e tempo mudam pouco)."""
+    return font.render(text, True, color)
+
 def draw_hud(score1, score2, time_left, game_started, game_over):
     """Faixa superior com placar e tempo (separada do campo)."""
-    # faixa
-    pygame.draw.rect(screen, BLACK, (0, 0, WIDTH, HUD_HEIGHT))
-    # linha de separação
-    pygame.draw.line(screen, WHITE, (0, HUD_HEIGHT), (WIDTH, HUD_HEIGHT), 2)
+    # faixa e linha de separação vêm do fundo
+    screen.blit(background, HUD_RECT, HUD_RECT)
 
         # placar centralizado (cores por jogador e tamanho maior)
-    left_score_surf = score_font.render(str(score1), True, PINK)
-    sep_surf = score_font.render(" - ", True, WHITE)
-    right_score_surf = score_font.render(str(score2), True, YELLOW)
+    left_score_surf = render_text(score_font, str(score1), PINK)
+    sep_surf = render_text(score_font, " - ", WHITE)
+    right_score_surf = render_text(score_font, str(score2), YELLOW)
     total_w = left_score_surf.get_width() + sep_surf.get_width() + right_score_surf.get_width()
     x = WIDTH//2 - total_w//2
     y = HUD_HEIGHT//2 - left_score_surf.get_height()//2
@@ -116,47 +395,58 @@ def draw_hud(score1, score2, time_left, game_started, game_over):
     total_secs = int(max(0, time_left))
     minutes = total_secs // 60
     seconds = total_secs % 60
-    time_text = small_font.render(f"{minutes:01d}:{seconds:02d}", True, WHITE)
+    time_text = render_text(small_font, f"{minutes:01d}:{seconds:02d}", WHITE)
     time_rect = time_text.get_rect(midright=(WIDTH - 16, HUD_HEIGHT//2))
     screen.blit(time_text, time_rect)
 
     # mensagem de espera
     if not game_started and not game_over:
-        waiting_text = small_font.render("Aguardando jogadores...", True, GRAY)
+        waiting_text = render_text(small_font, "Aguardando jogadores...", GRAY)
         waiting_rect = waiting_text.get_rect(midleft=(16, HUD_HEIGHT//2))
         screen.blit(waiting_text, waiting_rect)
 
-def draw_field():
+def draw_field(surface):
     """Desenha somente o campo (sem linha/círculo central, estilo Video Olympics)."""
     # Fundo azul claro
-    screen.fill(LIGHT_BLUE)
+    surface.fill(LIGHT_BLUE)
     # linhas laterais e inferior (o topo é a HUD)
-    pygame.draw.line(screen, WHITE, (0, HUD_HEIGHT), (0, HEIGHT), 2)
-    pygame.draw.line(screen, WHITE, (WIDTH-1, HUD_HEIGHT), (WIDTH-1, HEIGHT), 2)
-    pygame.draw.line(screen, WHITE, (0, HEIGHT-1), (WIDTH, HEIGHT-1), 2)
-
-def draw_goals():
+    pygame.draw.line(surface, WHITE, (0, HUD_HEIGHT), (0, HEIGHT), 2)
+    pygame.draw.line(surface, WHITE, (WIDTH-1, HUD_HEIGHT), (WIDTH-1, HEIGHT), 2)
+    pygame.draw.line(surface, WHITE, (0, HEIGHT-1), (WIDTH, HEIGHT-1), 2)
+    # faixa da HUD e linha de separação
+    pygame.draw.rect(surface, BLACK, (0, 0, WIDTH, HUD_HEIGHT))
+    pygame.draw.line(surface, WHITE, (0, HUD_HEIGHT), (WIDTH, HUD_HEIGHT), 2)
+
+def draw_goals(surface):
     """Desenha os gols em 'C', pretos e separados da parede do fundo."""
     # Esquerda (abre para a direita)
     x_left = GOAL_INSET
     y_top = GOAL_Y
     y_bot = GOAL_Y + GOAL_HEIGHT
-    pygame.draw.line(screen, BLACK, (x_left, y_top), (x_left, y_bot), GOAL_THICKNESS)  # haste vertical
-    pygame.draw.line(screen, BLACK, (x_left, y_top), (x_left + GOAL_BAR_LENGTH, y_top), GOAL_THICKNESS)  # barra superior
-    pygame.draw.line(screen, BLACK, (x_left, y_bot), (x_left + GOAL_BAR_LENGTH, y_bot), GOAL_THICKNESS)  # barra inferior
+    pygame.draw.line(surface, BLACK, (x_left, y_top), (x_left, y_bot), GOAL_THICKNESS)  # haste vertical
+    pygame.draw.line(surface, BLACK, (x_left, y_top), (x_left + GOAL_BAR_LENGTH, y_top), GOAL_THICKNESS)  # barra superior
+    pygame.draw.line(surface, BLACK, (x_left, y_bot), (x_left + GOAL_BAR_LENGTH, y_bot), GOAL_THICKNESS)  # barra inferior
 
     # Direita (abre para a esquerda)
     x_right = WIDTH - GOAL_INSET
-    pygame.draw.line(screen, BLACK, (x_right, y_top), (x_right, y_bot), GOAL_THICKNESS)
-    pygame.draw.line(screen, BLACK, (x_right - GOAL_BAR_LENGTH, y_top), (x_right, y_top), GOAL_THICKNESS)
-    pygame.draw.line(screen, BLACK, (x_right - GOAL_BAR_LENGTH, y_bot), (x_right, y_bot), GOAL_THICKNESS)
+    pygame.draw.line(surface, BLACK, (x_right, y_top), (x_right, y_bot), GOAL_THICKNESS)
+    pygame.draw.line(surface, BLACK, (x_right - GOAL_BAR_LENGTH, y_top), (x_right, y_top), GOAL_THICKNESS)
+    pygame.draw.line(surface, BLACK, (x_right - GOAL_BAR_LENGTH, y_bot), (x_right, y_bot), GOAL_THICKNESS)
+
+def build_background():
+    """Campo, gols e faixa da HUD: tudo que não se mexe, desenhado uma vez."""
+    surface = pygame.Surface((WIDTH, HEIGHT)).convert()
+    draw_field(surface)
+    draw_goals(surface)
+    return surface
 
 def draw_paddles(p1y, p2y):
-    """Desenha os paddles dos jogadores - menores, à frente do gol."""
+    """Desenha os paddles dos jogadores - menores, à frente do gol.
+    Retorna os retângulos desenhados."""
     # Paddle esquerdo (Rosa)
     paddle1_rect = pygame.Rect(
         PADDLE_DISTANCE_FROM_GOAL - PADDLE_WIDTH//2,
-        p1y - PADDLE_HEIGHT//2,
+        int(p1y - PADDLE_HEIGHT//2),
         PADDLE_WIDTH,
         PADDLE_HEIGHT
     )
@@ -165,15 +455,18 @@ def draw_paddles(p1y, p2y):
     # Paddle direito (Amarelo)
     paddle2_rect = pygame.Rect(
         WIDTH - PADDLE_DISTANCE_FROM_GOAL - PADDLE_WIDTH//2,
-        p2y - PADDLE_HEIGHT//2,
+        int(p2y - PADDLE_HEIGHT//2),
         PADDLE_WIDTH,
         PADDLE_HEIGHT
     )
     pygame.draw.rect(screen, YELLOW, paddle2_rect)
+    return [paddle1_rect, paddle2_rect]
 
 def draw_ball(ballx, bally):
-    """Desenha a bola"""
-    pygame.draw.rect(screen, WHITE, pygame.Rect(int(ballx - BALL_SIZE//2), int(bally - BALL_SIZE//2), BALL_SIZE, BALL_SIZE))
+    """Desenha a bola e retorna o retângulo desenhado."""
+    ball_rect = pygame.Rect(int(ballx - BALL_SIZE//2), int(bally - BALL_SIZE//2), BALL_SIZE, BALL_SIZE)
+    pygame.draw.rect(screen, WHITE, ball_rect)
+    return ball_rect
 
 def draw_game_over(winner, score1, score2):
     """Overlay de fim de jogo com vencedor."""
@@ -181,7 +474,7 @@ def draw_game_over(winner, score1, score2):
     overlay.fill((0, 0, 0, 120))
     screen.blit(overlay, (0, HUD_HEIGHT))
 
-    title = font.render("FIM DE JOGO", True, WHITE)
+    title = render_text(font, "FIM DE JOGO", WHITE)
     title_rect = title.get_rect(center=(WIDTH//2, HUD_HEIGHT + (HEIGHT - HUD_HEIGHT)//2 - 30))
     screen.blit(title, title_rect)
 
@@ -191,13 +484,16 @@ def draw_game_over(winner, score1, score2):
         msg = "Vencedor: Jogador 2 (Amarelo)"
     else:
         msg = "Empate"
-    msg_text = small_font.render(msg, True, WHITE)
+    msg_text = render_text(small_font, msg, WHITE)
     msg_rect = msg_text.get_rect(center=(WIDTH//2, HUD_HEIGHT + (HEIGHT - HUD_HEIGHT)//2 + 20))
     screen.blit(msg_text, msg_rect)
 
 def draw_game():
-    """Desenha todo o jogo"""
-    draw_field()
+    """Desenha o quadro atual sobre o anterior: apaga paddles e bola com o
+    fundo pré-desenhado, redesenha a HUD só se os valores mudaram e desenha
+    as posições novas. Retorna os retângulos alterados (para
+    display.update) ou None quando a tela inteira foi redesenhada."""
+    global prev_rects, hud_values
 
     # HUD (em cima do fundo, antes do campo)
     time_left = game_state_data.get('time_left', 180) if game_state_data else 180
@@ -205,51 +501,72 @@ def draw_game():
     game_over = game_state_data.get('game_over', False) if game_state_data else False
     score1 = game_state_data.get('score1', 0) if game_state_data else 0
     score2 = game_state_data.get('score2', 0) if game_state_data else 0
-    draw_hud(score1, score2, time_left, game_started, game_over)
-
-    if game_state_data is None:
-        return
-    
-    draw_goals()
 
-    # Se não começou, desenha posições e instrução já aparecem na HUD
-    draw_paddles(
-        game_state_data.get('p1y', HEIGHT//2),
-        game_state_data.get('p2y', HEIGHT//2)
-    )
-
-    if game_started:
-        draw_ball(
-            game_state_data.get('ballx', WIDTH//2),
-            game_state_data.get('bally', HEIGHT//2)
-        )
+    # Primeiro quadro ou fim de jogo (overlay por cima de tudo): tela inteira
+    if prev_rects is None or game_over:
+        screen.blit(background, (0, 0))
+        dirty = None
+        hud_values = None
+    else:
+        for rect in prev_rects:
+            screen.blit(background, rect, rect)
+        dirty = list(prev_rects)
+
+    hud = (score1, score2, int(max(0, time_left)), game_started, game_over)
+    if hud != hud_values:
+        draw_hud(score1, score2, time_left, game_started, game_over)
+        hud_values = hud
+        if dirty is not None:
+            dirty.append(HUD_RECT)
+
+    # Posições interpoladas (um pouco no passado); placar e fim vêm do último estado
+    view = render_state() if game_state_data is not None else None
+    rects = []
+    if view is not None:
+        # Se não começou, desenha posições e instrução já aparecem na HUD
+        p1y, p2y = view.p1y, view.p2y
+        # O próprio paddle é desenhado na posição prevista (sem esperar o servidor)
+        predicted = predicted_paddle_y()
+        if predicted is not None:
+            if player_num == 1:
+                p1y = predicted
+            else:
+                p2y = predicted
+        rects += draw_paddles(p1y, p2y)
+
+        if game_started:
+            rects.append(draw_ball(view.ballx, view.bally))
+
+    if dirty is not None:
+        dirty += rects
+    prev_rects = rects
 
     if game_over:
         winner = game_state_data.get('winner', 0)
         draw_game_over(winner, score1, score2)
-
-# Inicializar pygame
-pygame.init()
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Hockey Client")
-clock = pygame.time.Clock()
-
-# Inicializar fontes
-font = pygame.font.Font(None, FONT_SIZE)
-small_font = pygame.font.Font(None, SMALL_FONT_SIZE)
-SCORE_FONT_SIZE = int(FONT_SIZE * 1.5)
-score_font = pygame.font.Font(None, SCORE_FONT_SIZE)
-
-# Iniciar thread para receber dados do servidor
-receive_thread = threading.Thread(target=receive_game_state, daemon=True)
-receive_thread.start()
-
-print("Cliente iniciado. Use as setas para cima/baixo para controlar. Pressione ESC para sair.")
-
-last_send = 0.0
-SEND_EVERY = 0.10  # segundos
-
-try:
+    return dirty
+
+def init_display():
+    """Janela, fontes e fundo pré-desenhado."""
+    global screen, clock, font, small_font, score_font, background
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Hockey Client")
+    clock = pygame.time.Clock()
+
+    # Inicializar fontes
+    font = pygame.font.Font(None, FONT_SIZE)
+    small_font = pygame.font.Font(None, SMALL_FONT_SIZE)
+    score_font = pygame.font.Font(None, int(FONT_SIZE * 1.5))
+
+    # Fundo estático (campo, gols, faixa da HUD) pré-desenhado
+    background = build_background()
+
+def run_window():
+    """Loop da janela: teclado, envio de input e desenho."""
+    global running, prev_rects
+    print("Cliente iniciado. Use as setas para cima/baixo para controlar. Pressione ESC para sair.")
+    last_send = 0.0
     while running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -257,33 +574,63 @@ try:
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     running = False
-        
+            elif event.type == pygame.VIDEOEXPOSE:
+                prev_rects = None  # janela exposta: redesenha tudo
+
         # Capturar input das teclas
         keys = pygame.key.get_pressed()
         new_direction = 0
-        
+
         if keys[pygame.K_UP]:
             new_direction = -1
         elif keys[pygame.K_DOWN]:
             new_direction = 1
-        
-        # Enviar input quando mudar OU a cada SEND_EVERY
-        now = time.time()
-        if new_direction != current_direction or (now - last_send) >= SEND_EVERY:
-            current_direction = new_direction
-            send_player_input()
-            last_send = now
-        
-        # Desenhar jogo
-        draw_game()
-        
-        pygame.display.flip()
+
+        last_send = update_direction(new_direction, time.time(), last_send)
+
+        # Desenhar jogo e enviar à tela só o que mudou
+        dirty = draw_game()
+        if dirty is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(dirty)
         clock.tick(FPS)
 
-except KeyboardInterrupt:
-    pass
+def main():
+    global args, host, port, codec, running, receive_thread
+    args = parse_args(sys.argv[1:])
+    host = args.host
+    try:
+        port = int(args.porta)
+    except ValueError:
+        print("A porta deve ser um número inteiro.")
+        sys.exit(1)
+    if args.bot is None and pygame is None:
+        print("A janela requer pygame (pip install pygame); use --bot para rodar sem janela")
+        sys.exit(1)
+    # Pelo UDP os snapshots são sempre frames binários
+    codec = get_codec("bin" if args.udp else args.codec)
+
+    connect()
+    # Iniciar thread para receber dados do servidor
+    receive_thread = threading.Thread(target=receive_game_state, daemon=True)
+    receive_thread.start()
 
-running = False
-s.close()
-pygame.quit()
-print("Cliente encerrado.")
\ No newline at end of file
+    try:
+        if args.bot is not None:
+            print(f"Bot iniciado (política {args.bot}).")
+            run_bot(get_policy(args.bot, args.seed), args.duration, args.report)
+        else:
+            init_display()
+            run_window()
+    except KeyboardInterrupt:
+        pass
+
+    running = False
+    s.close()
+    if args.bot is None:
+        pygame.quit()
+    print("Cliente encerrado.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+import json
+import struct
+from functools import lru_cache
+from config import GameState
+
+# Campos do GameState na ordem do namedtuple
+STATE_FIELDS = GameState._fields
+
+# Delimitador dos frames JSON (o cliente antigo procura as chaves)
+JSON_DELIMITER = "\\n"
+
+# Sem inputs confirmados (espectadores, sala sem jogadores)
+NO_ACKS = (0, 0)
+
+# ------------------ JSON ------------------
+
+class JsonCodec:
+    """JSON compacto, um objeto por frame terminado pelo delimitador."""
+
+    name = "json"
+
+    def __init__(self):
+        # Encoder reaproveitado: json.dumps com argumentos cria um novo a cada chamada
+        self._encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+
+    def encode_state(self, state, tick, step=1, acks=NO_ACKS):
+        """acks: último seq de input aplicado de cada jogador (até este tick)."""
+        data = dict(zip(STATE_FIELDS, state))
+        data["tick"] = tick
+        data["step"] = step
+        data["acks"] = acks
+        return (self._encode(data) + JSON_DELIMITER).encode("utf-8")
+
+    def encode_delta(self, state, tick, base, base_tick, step=1, acks=NO_ACKS):
+        """Somente os campos que mudaram em relação ao estado base."""
+        data = {"tick": tick, "step": step, "acks": acks, "base": base_tick}
+        for name, value, old in zip(STATE_FIELDS, state, base):
+            if value != old:
+                data[name] = value
+        return (self._encode(data) + JSON_DELIMITER).encode("utf-8")
+
+    def encode_control(self, message):
+        """Mensagem de controle do servidor (ex.: token UDP)."""
+        return (self._encode({"control": message}) + JSON_DELIMITER).encode("utf-8")
+
+    def decode_control(self, data):
+        """Conteúdo da mensagem de controle, ou None se for um frame de estado."""
+        return data.get("control")
+
+    def decode_state(self, data, history=None):
+        """Recebe o dict já decodificado e retorna (tick, step, acks, GameState),
+        onde step é o número de ticks desde o envio anterior e acks o último
+        seq de input aplicado de cada jogador.
+        Para deltas o base vem de history (tick -> GameState); se não
+        estiver lá o estado retornado é None (aguardar o próximo keyframe)."""
+        tick = data.get("tick", 0)
+        step = data.get("step", 1)
+        acks = tuple(data.get("acks", NO_ACKS))
+        if "base" in data:
+            base = history.get(data["base"]) if history else None
+            if base is None:
+                return tick, step, acks, None
+            return tick, step, acks, base._replace(**{f: data[f] for f in STATE_FIELDS if f in data})
+        return tick, step, acks, GameState(*(data[f] for f in STATE_FIELDS))
+
+# ------------------ Binário ------------------
+
+# Frame binário: tamanho (uint16) + corpo.
+# Corpo: tipo (1 byte) + tick (uint32) + ticks desde o envio anterior (uint8)
+# + seq de input aplicado de cada jogador (2x uint16, com volta em 65536)
+# + estado em layout fixo (keyframe)
+# ou tick base (uint32) + máscara de campos (uint16) + campos alterados (delta).
+FRAME_LENGTH = struct.Struct("<H")
+FRAME_HEADER = struct.Struct("<BIBHH")
+DELTA_BASE = struct.Struct("<I")
+DELTA_MASK = struct.Struct("<H")
+# p1y p2y ballx bally ballvx ballvy | score1 score2 | time_left | flags winner
+STATE_STRUCT = struct.Struct("<6f2HfBB")
+
+# Formato de cada campo isolado, na ordem de STATE_FIELDS (usado nos deltas)
+FIELD_FORMATS = "ffffffHH?f?B"
+
+FRAME_KEYFRAME = 0x4B  # 'K'
+FRAME_DELTA = 0x44     # 'D'
+FRAME_CONTROL = 0x43   # 'C' (corpo em JSON, fora do caminho quente)
+
+FLAG_GAME_STARTED = 0x01
+FLAG_GAME_OVER = 0x02
+
+@lru_cache(maxsize=None)
+def _delta_struct(mask):
+    """Struct dos campos presentes na máscara (cacheado por máscara)."""
+    return struct.Struct("<H" + "".join(
+        fmt for i, fmt in enumerate(FIELD_FORMATS) if mask & (1 << i)
+    ))
+
+class BinaryCodec:
+    """Layout fixo com struct: 10 bytes de cabeçalho + 34 bytes de estado."""
+
+    name = "bin"
+
+    def encode_state(self, state, tick, step=1, acks=NO_ACKS):
+        flags = (FLAG_GAME_STARTED if state.game_started else 0) | (FLAG_GAME_OVER if state.game_over else 0)
+        body = FRAME_HEADER.pack(
+            FRAME_KEYFRAME, tick, min(step, 255), acks[0] & 0xFFFF, acks[1] & 0xFFFF
+        ) + STATE_STRUCT.pack(
+            state.p1y, state.p2y,
+            state.ballx, state.bally, state.ballvx, state.ballvy,
+            state.score1, state.score2,
+            state.time_left,
+            flags, state.winner
+        )
+        return FRAME_LENGTH.pack(len(body)) + body
+
+    def encode_control(self, message):
+        body = FRAME_HEADER.pack(FRAME_CONTROL, 0, 0, 0, 0) + json.dumps(message).encode("utf-8")
+        return FRAME_LENGTH.pack(len(body)) + body
+
+    def decode_control(self, body):
+        if body[0] != FRAME_CONTROL:
+            return None
+        return json.loads(bytes(body[FRAME_HEADER.size:]))
+
+    def encode_delta(self, state, tick, base, base_tick, step=1, acks=NO_ACKS):
+        mask = 0
+        values = []
+        for i, (value, old) in enumerate(zip(state, base)):
+            if value != old:
+                mask |= 1 << i
+                values.append(value)
+        body = (FRAME_HEADER.pack(FRAME_DELTA, tick, min(step, 255), acks[0] & 0xFFFF, acks[1] & 0xFFFF)
+                + DELTA_BASE.pack(base_tick)
+                + _delta_struct(mask).pack(mask, *values))
+        return FRAME_LENGTH.pack(len(body)) + body
+
+    def decode_state(self, body, history=None):
+        """Recebe o corpo de um frame (sem o tamanho) e retorna (tick, step, acks, GameState).
+        Os acks vêm truncados em 16 bits (compare com seq_acked).
+        Deltas cujo base não está em history retornam estado None."""
+        kind, tick, step, ack1, ack2 = FRAME_HEADER.unpack_from(body, 0)
+        acks = (ack1, ack2)
+        if kind == FRAME_DELTA:
+            return tick, step, acks, self._decode_delta(body, history)
+        if kind != FRAME_KEYFRAME:
+            raise ValueError(f"Tipo de frame desconhecido: {kind}")
+        (p1y, p2y, ballx, bally, ballvx, ballvy,
+         score1, score2, time_left, flags, winner) = STATE_STRUCT.unpack_from(body, FRAME_HEADER.size)
+        return tick, step, acks, GameState(
+            p1y=p1y, p2y=p2y,
+            ballx=ballx, bally=bally, ballvx=ballvx, ballvy=ballvy,
+            score1=score1, score2=score2,
+            game_started=bool(flags & FLAG_GAME_STARTED),
+            time_left=time_left,
+            game_over=bool(flags & FLAG_GAME_OVER),
+            winner=winner
+        )
+
+    def _decode_delta(self, body, history):
+        offset = FRAME_HEADER.size
+        (base_tick,) = DELTA_BASE.unpack_from(body, offset)
+        offset += DELTA_BASE.size
+        (mask,) = DELTA_MASK.unpack_from(body, offset)
+        values = _delta_struct(mask).unpack_from(body, offset)[1:]
+        base = history.get(base_tick) if history else None
+        if base is None:
+            return None
+        fields = list(base)
+        it = iter(values)
+        for i in range(len(STATE_FIELDS)):
+            if mask & (1 << i):
+                fields[i] = next(it)
+        return GameState._make(fields)
+
+def seq_acked(seq, ack):
+    """Se o input seq já foi aplicado segundo o ack (que pode vir truncado
+    em 16 bits pelo codec binário)."""
+    return ((ack - seq) & 0xFFFF) < 0x8000
+
+def split_frames(buffer):
+    """Separa os frames binários completos do buffer.
+    Retorna (lista de corpos, bytes restantes)."""
+    frames = []
+    pos = 0
+    while len(buffer) - pos >= FRAME_LENGTH.size:
+        (size,) = FRAME_LENGTH.unpack_from(buffer, pos)
+        end = pos + FRAME_LENGTH.size + size
+        if end > len(buffer):
+            break
+        frames.append(buffer[pos + FRAME_LENGTH.size:end])
+        pos = end
+    return frames, buffer[pos:]
+
+# Maior frame aceito de um stream: o tamanho binário é um uint16; um frame
+# JSON sem delimitador depois disso indica um stream corrompido
+MAX_FRAME_SIZE = 64 * 1024
+
+JSON_DELIMITER_BYTES = JSON_DELIMITER.encode("utf-8")
+JSON_CONTROL_PREFIX = b'{"control"'
+
+class FrameReader:
+    """Leitura incremental dos frames de um stream TCP, em tempo linear.
+
+    Os bytes recebidos são acumulados em um bytearray e cada byte é
+    examinado uma única vez: o tamanho dos frames binários é lido direto do
+    buffer e a busca do delimitador JSON continua de onde parou. O que já
+    foi consumido é descartado uma vez por feed (só sobra o frame parcial).
+    feed() decodifica as mensagens de controle e devolve apenas o frame de
+    estado mais recente: um backlog (após um travamento) é resolvido em uma
+    passada, sem decodificar os estados que ficaram velhos."""
+
+    def __init__(self, codec, max_frame=MAX_FRAME_SIZE):
+        self.binary = codec.name == BinaryCodec.name
+        self.max_frame = max_frame
+        self.buffer = bytearray()
+        self.scan = 0  # JSON: até onde o delimitador já foi procurado
+
+    def feed(self, data):
+        """Acrescenta os bytes recebidos. Retorna (controles, estado): as
+        mensagens de controle completas, em ordem, e o frame de estado mais
+        novo pronto para decode_state (ou None).
+        ValueError se um frame passar de max_frame."""
+        buffer = self.buffer
+        buffer += data
+        controls = []
+        newest = None
+        pos = 0
+        if self.binary:
+            while len(buffer) - pos >= FRAME_LENGTH.size:
+                (size,) = FRAME_LENGTH.unpack_from(buffer, pos)
+                start = pos + FRAME_LENGTH.size
+                end = start + size
+                if end > len(buffer):
+                    break
+                if buffer[start] == FRAME_CONTROL:
+                    controls.append(json.loads(buffer[start + FRAME_HEADER.size:end]))
+                else:
+                    newest = (start, end)
+                pos = end
+            if newest is not None:
+                newest = bytes(buffer[newest[0]:newest[1]])
+        else:
+            while True:
+                end = buffer.find(JSON_DELIMITER_BYTES, max(pos, self.scan))
+                if end == -1:
+                    self.scan = max(pos, len(buffer) - len(JSON_DELIMITER_BYTES) + 1)
+                    break
+                if buffer.startswith(JSON_CONTROL_PREFIX, pos):
+                    controls.append(json.loads(buffer[pos:end])["control"])
+                else:
+                    newest = (pos, end)
+                pos = end + len(JSON_DELIMITER_BYTES)
+            if newest is not None:
+                newest = json.loads(buffer[newest[0]:newest[1]])
+            self.scan -= pos
+        del buffer[:pos]
+        if len(buffer) > self.max_frame:
+            raise ValueError(f"Frame maior que {self.max_frame} bytes")
+        return controls, newest
+
+# ------------------ UDP ------------------
+
+# Datagramas do servidor são frames binários (com o tamanho), um ou mais por pacote.
+# Datagrama de input do cliente: tipo + token da sessão + seq do input +
+# último tick recebido (ack) + direção.
+UDP_INPUT = struct.Struct("<BIIIb")
+UDP_KIND_INPUT = 0x49  # 'I'
+
+def encode_udp_input(token, seq, ack, direction):
+    return UDP_INPUT.pack(UDP_KIND_INPUT, token, seq, ack, direction)
+
+def decode_udp_input(data):
+    """Retorna (token, seq, ack, direction) ou None se o datagrama for inválido."""
+    if len(data) != UDP_INPUT.size or data[0] != UDP_KIND_INPUT:
+        return None
+    return UDP_INPUT.unpack(data)[1:]
+
+CODECS = {
+    JsonCodec.name: JsonCodec(),
+    BinaryCodec.name: BinaryCodec(),
+}
+
+DEFAULT_CODEC = JsonCodec.name
+
+def get_codec(name):
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"Codec desconhecido: {name}") from None
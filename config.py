@@ -1,9 +1,12 @@
 from collections import namedtuple
 
 # Tick e FPS
-TICK_RATE = 60
+TICK_RATE = 60         # passos de simulação por segundo
 TICK = 1 / TICK_RATE
+SEND_RATE = 60         # snapshots por segundo enviados aos jogadores
+SEND_EVERY_TICKS = max(1, round(TICK_RATE / SEND_RATE))
 FPS = 60
+MAX_CATCHUP_STEPS = 5  # passos recuperados de uma vez quando o servidor atrasa
 
 # Tamanho da janela
 WIDTH = 800
@@ -29,6 +32,16 @@ PADDLE_HEIGHT = 48
 BALL_SIZE = 14
 BALL_SPEED = 6
 
+# Velocidades (BALL_SPEED, velocidade dos paddles) são em px por tick a 60 Hz;
+# com outro TICK_RATE cada passo anda STEP_SCALE disso
+BASE_TICK_RATE = 60
+STEP_SCALE = BASE_TICK_RATE / TICK_RATE
+
+# Colisão contínua (swept) da bola contra paddles, barras e postes dos gols.
+# Necessária quando a bola anda mais que a espessura de um paddle por passo
+# (TICK_RATE baixo ou BALL_SPEED alto); desligada a física é a discreta original.
+SWEPT_COLLISION = False
+
 # Campo útil (sem a HUD)
 FIELD_HEIGHT = HEIGHT - HUD_HEIGHT
 
@@ -50,6 +63,49 @@ SMALL_FONT_SIZE = 24
 # Tempo de partida (3 minutos)
 TIME_LIMIT_SECONDS = 180
 
+# Salas (partidas simultâneas em um mesmo processo do servidor)
+MAX_ROOMS = 500
+
+# Snapshots: delta contra o último tick confirmado pelo cliente (ack)
+KEYFRAME_INTERVAL = TICK_RATE    # ticks entre estados completos (1 s)
+STATE_HISTORY = 2 * TICK_RATE    # ticks guardados como base para deltas (2 s)
+
+# Fila de saída por conexão (em frames). Quando enche:
+#   "latest"     -> descarta os frames antigos e mantém só o mais recente
+#   "disconnect" -> encerra a conexão lenta
+OUTBOUND_QUEUE_SIZE = 8
+OUTBOUND_POLICY = "latest"
+
+# Espectadores: recebem um frame completo a SPECTATOR_SEND_RATE Hz
+SPECTATOR_SEND_RATE = 30
+SPECTATOR_SEND_EVERY = max(1, round(TICK_RATE / SPECTATOR_SEND_RATE))
+
+# Buffer de inputs no servidor: um input gerado no tick T do cliente é aplicado
+# no tick T + atraso do jogador. O atraso é no mínimo INPUT_DELAY_TICKS e cresce
+# com a idade dos inputs na chegada (RTT em ticks), até INPUT_MAX_DELAY_TICKS.
+# Os que chegam depois disso vão para o próximo tick; os adiantados demais
+# ficam limitados a INPUT_WINDOW_TICKS à frente.
+INPUT_DELAY_TICKS = 2
+INPUT_MAX_DELAY_TICKS = TICK_RATE // 2  # 0,5 s
+INPUT_WINDOW_TICKS = 6
+
+# Interpolação no cliente: desenha os snapshots INTERP_DELAY_TICKS (mais o
+# intervalo entre snapshots) atrás do tick estimado do servidor, o que absorve
+# o jitter e permite um SEND_RATE menor. Se o próximo snapshot atrasa, a bola
+# é extrapolada pela velocidade por no máximo MAX_EXTRAPOLATION_TICKS.
+INTERP_DELAY_TICKS = 2
+MAX_EXTRAPOLATION_TICKS = 6
+
+# Profiler do loop de ticks: amostras guardadas por fase (p50/p99/max)
+PROFILE_WINDOW = 10 * TICK_RATE  # ~10 s de iterações
+
+# Replays (servidor com --replay-dir): inputs de cada tick + estado completo
+# a cada REPLAY_KEYFRAME_INTERVAL ticks (o seek refaz no máximo isso de passos).
+# O buffer de cada sala vai para a thread de escrita ao passar de
+# REPLAY_FLUSH_BYTES ou em cada keyframe.
+REPLAY_KEYFRAME_INTERVAL = 10 * TICK_RATE  # 10 s
+REPLAY_FLUSH_BYTES = 4096
+
 # Estado do jogo (inclui tempo e status de game over)
 GameState = namedtuple(
     "GameState",
@@ -65,4 +121,6 @@ GameState = namedtuple(
 )
 
 # Input do jogador: -1 (cima), 0 (parado), 1 (baixo)
-PlayerInput = namedtuple("PlayerInput", ["direction"])
\ No newline at end of file
+# seq: número de sequência do cliente; tick: último tick do servidor que o
+# cliente tinha visto ao gerar o input (None = aplicar no próximo tick)
+PlayerInput = namedtuple("PlayerInput", ["direction", "seq", "tick"], defaults=(0, None))
\ No newline at end of file
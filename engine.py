@@ -0,0 +1,417 @@
+import math
+from config import (
+    TICK, GameState, HEIGHT, WIDTH,
+    PADDLE_WIDTH, PADDLE_HEIGHT, BALL_SIZE, BALL_SPEED,
+    GOAL_HEIGHT, GOAL_Y, PADDLE_DISTANCE_FROM_GOAL,
+    HUD_HEIGHT, GOAL_INSET, GOAL_BAR_LENGTH, GOAL_THICKNESS, TIME_LIMIT_SECONDS,
+    STEP_SCALE, SWEPT_COLLISION
+)
+
+# Física pura do jogo: sem sockets, locks, prints ou relógio.
+# step() avança um passo fixo (TICK) a partir do estado e dos inputs.
+
+# Posições iniciais (centradas no campo útil)
+FIELD_CENTER_Y = HUD_HEIGHT + (HEIGHT - HUD_HEIGHT) // 2
+
+PADDLE_SPEED = 5
+
+def move_paddle(y, direction):
+    """Um passo do paddle: anda PADDLE_SPEED na direção e fica dentro do campo.
+    Usado também pelo cliente para prever o próprio paddle."""
+    y = y + (direction * PADDLE_SPEED * STEP_SCALE)
+    return max(HUD_HEIGHT + PADDLE_HEIGHT//2, min(HEIGHT - PADDLE_HEIGHT//2, y))
+
+def reset_ball(direction: int = 1):
+    """Reinicia a bola no centro.
+    direction: 1 = para a direita, -1 = para a esquerda
+    """
+    speed = float(BALL_SPEED)
+    vx = speed if direction >= 0 else -speed
+    return WIDTH//2, FIELD_CENTER_Y, vx, 0.0
+
+def paddle_bounce(ball_x, ball_y, ball_vx, paddle_x, paddle_y):
+    """Rebote da bola no paddle (já em contato): ângulo conforme onde bateu.
+    Retorna (ball_x reposicionado, nova vx, nova vy)."""
+    # Onde bateu (-1..1)
+    relative_intersect_y = (ball_y - paddle_y) / (PADDLE_HEIGHT//2)
+    relative_intersect_y = max(-1.0, min(1.0, relative_intersect_y))
+    
+    bounce_angle = relative_intersect_y * (math.pi / 4)  # até 45º
+    
+    speed = float(BALL_SPEED)
+    new_vx = speed * math.cos(bounce_angle) * (-1 if ball_vx > 0 else 1)
+    new_vy = speed * math.sin(bounce_angle)
+    
+    # Reposiciona a bola para não "colar"
+    if new_vx > 0:
+        ball_x = paddle_x + PADDLE_WIDTH//2 + BALL_SIZE//2
+    else:
+        ball_x = paddle_x - PADDLE_WIDTH//2 - BALL_SIZE//2
+    return ball_x, new_vx, new_vy
+
+def check_paddle_collision(ball_x, ball_y, ball_vx, ball_vy, paddle_x, paddle_y):
+    """Verifica colisão da bola com paddle e retorna nova velocidade (com ângulo)."""
+    if (ball_x - BALL_SIZE//2 <= paddle_x + PADDLE_WIDTH//2 and 
+        ball_x + BALL_SIZE//2 >= paddle_x - PADDLE_WIDTH//2 and
+        ball_y - BALL_SIZE//2 <= paddle_y + PADDLE_HEIGHT//2 and
+        ball_y + BALL_SIZE//2 >= paddle_y - PADDLE_HEIGHT//2):
+        ball_x, new_vx, new_vy = paddle_bounce(ball_x, ball_y, ball_vx, paddle_x, paddle_y)
+        return True, ball_x, new_vx, new_vy
+    
+    return False, ball_x, ball_vx, ball_vy
+
+# ------------------ Geometria dos gols ------------------
+# Calculada uma vez a partir do config; step() só consulta as tabelas.
+
+HALF_TH = GOAL_THICKNESS / 2.0
+HALF_B = BALL_SIZE / 2.0
+
+TOP_BAR_Y = GOAL_Y
+BOT_BAR_Y = GOAL_Y + GOAL_HEIGHT
+
+# Linha invisível do gol, puxada 'pra fora' do C (lado de campo)
+GOAL_LINE_OFFSET_OUT = 13.0
+# Gol da ESQUERDA (C abre para a direita): linha um pouco À DIREITA do poste
+LINE_LEFT_X = GOAL_INSET + GOAL_LINE_OFFSET_OUT
+# Gol da DIREITA (C abre para a esquerda): linha um pouco À ESQUERDA do poste
+LINE_RIGHT_X = (WIDTH - GOAL_INSET) - GOAL_LINE_OFFSET_OUT
+
+LEFT_POST_X = GOAL_INSET
+RIGHT_POST_X = (WIDTH - GOAL_INSET)
+# Faixa y em que a bola toca os postes
+POST_TOP_Y = GOAL_Y - HALF_TH
+POST_BOT_Y = GOAL_Y + GOAL_HEIGHT + HALF_TH
+
+# Faixas x cobertas pelas barras (esquerda, direita), com a espessura
+BAR_SPANS = (
+    (GOAL_INSET - HALF_TH, GOAL_INSET + GOAL_BAR_LENGTH + HALF_TH),
+    (WIDTH - GOAL_INSET - GOAL_BAR_LENGTH - HALF_TH, WIDTH - GOAL_INSET + HALF_TH),
+)
+BAR_YS = (TOP_BAR_Y, BOT_BAR_Y)
+
+# Pontas das barras, tratadas como círculos de raio HALF_TH, na ordem de teste:
+# gol esquerdo (topo, fundo), gol direito (topo, fundo)
+CORNERS = (
+    (GOAL_INSET + GOAL_BAR_LENGTH, TOP_BAR_Y),
+    (GOAL_INSET + GOAL_BAR_LENGTH, BOT_BAR_Y),
+    ((WIDTH - GOAL_INSET) - GOAL_BAR_LENGTH, TOP_BAR_Y),
+    ((WIDTH - GOAL_INSET) - GOAL_BAR_LENGTH, BOT_BAR_Y),
+)
+CORNER_DIST = (HALF_TH + HALF_B)
+CORNER_DIST2 = CORNER_DIST * CORNER_DIST
+
+# Broadphase: limites x das regiões dos gols (barras, postes, linha e fundo)
+LEFT_GOAL_ZONE_X = BAR_SPANS[0][1]
+RIGHT_GOAL_ZONE_X = BAR_SPANS[1][0]
+
+def _corner_bounce(cx, cy, ball_x, ball_y, ball_vx, ball_vy):
+    """Rebate na ponta (cx, cy) de uma barra; a bola tem raio HALF_B."""
+    dx = ball_x - cx
+    dy = ball_y - cy
+    dist2 = dx*dx + dy*dy
+    if dist2 < CORNER_DIST2:
+        dist = math.sqrt(dist2) if dist2 > 0 else 1.0
+        nx = dx / dist
+        ny = dy / dist
+        # Reposiciona a bola para fora da sobreposição
+        ball_x = cx + nx * CORNER_DIST
+        ball_y = cy + ny * CORNER_DIST
+        # Reflete velocidade se estiver indo em direção ao canto
+        vdotn = ball_vx * nx + ball_vy * ny
+        if vdotn < 0:
+            ball_vx = ball_vx - 2.0 * vdotn * nx
+            ball_vy = ball_vy - 2.0 * vdotn * ny
+        return True, ball_x, ball_y, ball_vx, ball_vy
+    return False, ball_x, ball_y, ball_vx, ball_vy
+
+def goal_collisions(prev_x, prev_y, ball_x, ball_y, ball_vx, ball_vy, score1, score2):
+    """Gols em C: linha de gol, postes, barras, cantos, failsafe e parede do fundo.
+    Retorna (ball_x, ball_y, ball_vx, ball_vy, score1, score2)."""
+    # 1) Verificação de GOL por CRUZAMENTO da linha de gol (só de FRENTE p/ TRÁS)
+    #    Esquerda: cruza quando a face esquerda passa de x>LINE_LEFT_X para x<=LINE_LEFT_X
+    prev_left = prev_x - HALF_B
+    new_left = ball_x - HALF_B
+    prev_right = prev_x + HALF_B
+    new_right = ball_x + HALF_B
+
+    left_cross = (prev_left > LINE_LEFT_X) and (new_left <= LINE_LEFT_X)
+    right_cross = (prev_right < LINE_RIGHT_X) and (new_right >= LINE_RIGHT_X)
+
+    if left_cross:
+        denom = (new_left - prev_left)
+        t = (LINE_LEFT_X - prev_left) / denom if denom != 0 else 0.0
+        t = max(0.0, min(1.0, t))
+        y_at_cross = prev_y + t * (ball_y - prev_y)
+        if GOAL_Y <= y_at_cross <= GOAL_Y + GOAL_HEIGHT:
+            # Gol do Jogador 2 (direita)
+            score2 += 1
+            ball_x, ball_y, ball_vx, ball_vy = reset_ball(-1)  # reinicia para a esquerda (quem tomou foi o Jogador 1)
+    elif right_cross:
+        denom = (new_right - prev_right)
+        t = (LINE_RIGHT_X - prev_right) / denom if denom != 0 else 0.0
+        t = max(0.0, min(1.0, t))
+        y_at_cross = prev_y + t * (ball_y - prev_y)
+        if GOAL_Y <= y_at_cross <= GOAL_Y + GOAL_HEIGHT:
+            # Gol do Jogador 1 (esquerda)
+            score1 += 1
+            ball_x, ball_y, ball_vx, ball_vy = reset_ball(1)  # reinicia para a direita (quem tomou foi o Jogador 2)
+    else:
+        # 2) HASTE VERTICAL dos gols (apenas face EXTERNA): evita que a bola
+        #    atravesse a parte de trás do gol
+        if POST_TOP_Y <= ball_y <= POST_BOT_Y:
+            if abs(ball_x - LEFT_POST_X) <= (HALF_TH + HALF_B) and ball_x <= LEFT_POST_X:
+                # Fora do gol (lado esquerdo): rebate para a esquerda
+                ball_vx = -abs(ball_vx)
+                ball_x = LEFT_POST_X - HALF_TH - HALF_B
+            if abs(ball_x - RIGHT_POST_X) <= (HALF_TH + HALF_B) and ball_x >= RIGHT_POST_X:
+                # Fora do gol (lado direito): rebate para a direita
+                ball_vx = abs(ball_vx)
+                ball_x = RIGHT_POST_X + HALF_TH + HALF_B
+
+        #    BARRAS superior/inferior do "C" (por dentro e por fora)
+        for bar_min_x, bar_max_x in BAR_SPANS:
+            if bar_min_x <= ball_x <= bar_max_x:
+                for bar_y in BAR_YS:
+                    if abs(ball_y - bar_y) <= (HALF_TH + HALF_B):
+                        if ball_y <= bar_y:
+                            ball_vy = -abs(ball_vy)
+                            ball_y = bar_y - HALF_TH - HALF_B
+                        else:
+                            ball_vy = abs(ball_vy)
+                            ball_y = bar_y + HALF_TH + HALF_B
+
+    # 2.1) Cantos das barras (evita teleporte ao bater na ponta); o primeiro que bater encerra
+    for cx, cy in CORNERS:
+        changed, ball_x, ball_y, ball_vx, ball_vy = _corner_bounce(cx, cy, ball_x, ball_y, ball_vx, ball_vy)
+        if changed:
+            return ball_x, ball_y, ball_vx, ball_vy, score1, score2
+
+    # 1b) Failsafe: se após colisões a bola já estiver ALÉM da linha de gol, conte o gol
+    # Somente se cruzou DA FRENTE PARA DENTRO neste tick (usa prev_x e a direção atual).
+    mouth_top = TOP_BAR_Y + HALF_TH
+    mouth_bot = BOT_BAR_Y - HALF_TH
+    if mouth_top <= ball_y <= mouth_bot:
+        prev_left_face = prev_x - HALF_B
+        prev_right_face = prev_x + HALF_B
+        # Esquerda: bola inteira passou da linha e estava à frente antes (indo para a esquerda)
+        if (ball_vx < 0) and (prev_right_face > LINE_LEFT_X) and ((ball_x + HALF_B) <= LINE_LEFT_X):
+            score2 += 1
+            ball_x, ball_y, ball_vx, ball_vy = reset_ball(-1)  # recomeça para a esquerda
+        # Direita: bola inteira passou da linha e estava à frente antes (indo para a direita)
+        elif (ball_vx > 0) and (prev_left_face < LINE_RIGHT_X) and ((ball_x - HALF_B) >= LINE_RIGHT_X):
+            score1 += 1
+            ball_x, ball_y, ball_vx, ball_vy = reset_ball(1)   # recomeça para a direita
+
+    # 3) PAREDE ATRÁS DOS GOLS (nas bordas da tela) — SEM exceção
+    #    (sempre rebate no fundo, mesmo se a bola estiver alinhada com a boca)
+    if (ball_x - HALF_B) <= 0:
+        ball_vx = abs(ball_vx)
+        ball_x = HALF_B
+    if (ball_x + HALF_B) >= WIDTH:
+        ball_vx = -abs(ball_vx)
+        ball_x = WIDTH - HALF_B
+
+    return ball_x, ball_y, ball_vx, ball_vy, score1, score2
+
+# ------------------ Colisão contínua (SWEPT_COLLISION) ------------------
+
+def sweep_box(x0, y0, dx, dy, left, top, right, bottom):
+    """Primeiro contato do centro da bola, indo de (x0, y0) a (x0+dx, y0+dy),
+    com a caixa já expandida pela meia-bola.
+    Retorna (t, nx, ny): tempo de impacto em [0, 1] e normal da face atingida,
+    ou None se não toca no passo ou se já começa dentro (sobreposição fica com
+    os testes discretos)."""
+    if dx == 0:
+        if not (left <= x0 <= right):
+            return None
+        tx_enter, tx_exit = -math.inf, math.inf
+    else:
+        tx_enter, tx_exit = (left - x0) / dx, (right - x0) / dx
+        if tx_enter > tx_exit:
+            tx_enter, tx_exit = tx_exit, tx_enter
+    if dy == 0:
+        if not (top <= y0 <= bottom):
+            return None
+        ty_enter, ty_exit = -math.inf, math.inf
+    else:
+        ty_enter, ty_exit = (top - y0) / dy, (bottom - y0) / dy
+        if ty_enter > ty_exit:
+            ty_enter, ty_exit = ty_exit, ty_enter
+
+    t_enter = max(tx_enter, ty_enter)
+    t_exit = min(tx_exit, ty_exit)
+    if t_enter > t_exit or t_enter < 0.0 or t_enter > 1.0:
+        return None
+    if tx_enter >= ty_enter:
+        return t_enter, (-1 if dx > 0 else 1), 0
+    return t_enter, 0, (-1 if dy > 0 else 1)
+
+def _static_sweep_boxes():
+    """Barras e postes dos gols como caixas expandidas pela meia-bola.
+    Cada item: (caixa, normal aceita em x) — postes só rebatem pela face externa."""
+    boxes = []
+    for bar_y in BAR_YS:
+        for bar_min_x, bar_max_x in BAR_SPANS:
+            boxes.append(((bar_min_x - HALF_B, bar_y - HALF_TH - HALF_B,
+                           bar_max_x + HALF_B, bar_y + HALF_TH + HALF_B), None))
+    for post_x, face in ((LEFT_POST_X, -1), (RIGHT_POST_X, 1)):
+        boxes.append(((post_x - HALF_TH - HALF_B, POST_TOP_Y - HALF_B,
+                       post_x + HALF_TH + HALF_B, POST_BOT_Y + HALF_B), face))
+    return tuple(boxes)
+
+SWEEP_STATIC = _static_sweep_boxes()
+
+def sweep_ball(x0, y0, vx, vy, p1y0, p1y1, p2y0, p2y1):
+    """Move a bola um passo com colisão contínua contra o primeiro collider
+    atingido (paddles no referencial do próprio paddle, que também se move).
+    Retorna (x, y, vx, vy, paddle) onde paddle é 1/2 se o rebote foi num
+    paddle (o teste discreto desse paddle deve ser pulado), senão 0."""
+    dx = vx * STEP_SCALE
+    dy = vy * STEP_SCALE
+    best = None
+
+    for (left, top, right, bottom), face in SWEEP_STATIC:
+        hit = sweep_box(x0, y0, dx, dy, left, top, right, bottom)
+        if hit and (face is None or hit[1] == face) and (best is None or hit[0] < best[0]):
+            best = hit + (0, 0.0, 0.0)
+
+    half_w = PADDLE_WIDTH//2 + BALL_SIZE//2
+    half_h = PADDLE_HEIGHT//2 + BALL_SIZE//2
+    for num, paddle_x, py0, py1 in ((1, PADDLE_DISTANCE_FROM_GOAL, p1y0, p1y1),
+                                    (2, WIDTH - PADDLE_DISTANCE_FROM_GOAL, p2y0, p2y1)):
+        hit = sweep_box(x0, y0, dx, dy - (py1 - py0),
+                        paddle_x - half_w, py0 - half_h, paddle_x + half_w, py0 + half_h)
+        if hit and (best is None or hit[0] < best[0]):
+            best = hit + (num, paddle_x, py0 + (py1 - py0) * hit[0])
+
+    if best is None:
+        return x0 + dx, y0 + dy, vx, vy, 0
+
+    t, nx, ny, paddle, paddle_x, paddle_y = best
+    x = x0 + dx * t
+    y = y0 + dy * t
+    if paddle:
+        # O sweep já garante o contato: rebate sem refazer o teste de
+        # sobreposição, que no ponto de impacto pode errar por arredondamento
+        x, vx, vy = paddle_bounce(x, y, vx, paddle_x, paddle_y)
+    else:
+        if nx:
+            vx = abs(vx) * nx
+        if ny:
+            vy = abs(vy) * ny
+    # Resto do passo com a velocidade nova
+    rest = (1.0 - t) * STEP_SCALE
+    return x + vx * rest, y + vy * rest, vx, vy, paddle
+
+def initial_state():
+    return GameState(
+        p1y=FIELD_CENTER_Y,
+        p2y=FIELD_CENTER_Y,
+        ballx=WIDTH//2, bally=FIELD_CENTER_Y,
+        ballvx=0.0, ballvy=0.0,
+        score1=0, score2=0,
+        game_started=False,
+        time_left=TIME_LIMIT_SECONDS,
+        game_over=False,
+        winner=0
+    )
+
+def start_match(state):
+    """Coloca a bola em jogo (início da partida)."""
+    ball_x, ball_y, ball_vx, ball_vy = reset_ball()
+    return state._replace(
+        ballx=ball_x, bally=ball_y, ballvx=ball_vx, ballvy=ball_vy,
+        game_started=True
+    )
+
+def step(state, p1_input, p2_input):
+    """Avança um passo da simulação e retorna o novo GameState."""
+    # Atualizar posições dos jogadores
+    new_p1y = move_paddle(state.p1y, p1_input.direction)
+    new_p2y = move_paddle(state.p2y, p2_input.direction)
+
+    # Atualizar física da bola
+    ball_x, ball_y = state.ballx, state.bally
+    ball_vx, ball_vy = state.ballvx, state.ballvy
+    score1, score2 = state.score1, state.score2
+    time_left = state.time_left
+    game_over = state.game_over
+    winner = state.winner
+
+    if state.game_started and not game_over:
+        # cronômetro (contagem regressiva só enquanto rola)
+        time_left = max(0.0, time_left - TICK)
+        if time_left <= 0.0 and not game_over:
+            game_over = True
+            # decide vencedor
+            if score1 > score2:
+                winner = 1
+            elif score2 > score1:
+                winner = 2
+            else:
+                winner = 0
+            ball_vx = 0.0
+            ball_vy = 0.0
+
+        # Salva posição anterior para detectar cruzamento da linha de gol
+        prev_x, prev_y = ball_x, ball_y
+
+        # Mover bola
+        swept_paddle = 0
+        if not game_over:
+            if SWEPT_COLLISION:
+                ball_x, ball_y, ball_vx, ball_vy, swept_paddle = sweep_ball(
+                    ball_x, ball_y, ball_vx, ball_vy, state.p1y, new_p1y, state.p2y, new_p2y
+                )
+            else:
+                ball_x += ball_vx * STEP_SCALE
+                ball_y += ball_vy * STEP_SCALE
+
+            # Colisão com teto (topo do campo é HUD_HEIGHT) e chão
+            if ball_y <= HUD_HEIGHT + BALL_SIZE//2:
+                ball_vy = abs(ball_vy)
+                ball_y = HUD_HEIGHT + BALL_SIZE//2
+            elif ball_y >= HEIGHT - BALL_SIZE//2:
+                ball_vy = -abs(ball_vy)
+                ball_y = HEIGHT - BALL_SIZE//2
+
+            # ---------- Gols em C (espessura real + parede atrás) ----------
+            # Broadphase: com a bola longe dos dois gols (no eixo x, antes e
+            # depois do movimento) nenhum teste de gol, poste, barra, canto ou
+            # parede do fundo pode acertar, então todos são pulados.
+            if (min(prev_x, ball_x) - HALF_B <= LEFT_GOAL_ZONE_X or
+                    max(prev_x, ball_x) + HALF_B >= RIGHT_GOAL_ZONE_X):
+                ball_x, ball_y, ball_vx, ball_vy, score1, score2 = goal_collisions(
+                    prev_x, prev_y, ball_x, ball_y, ball_vx, ball_vy, score1, score2
+                )
+
+            # 4) Colisão com PADDLES (sempre verificar ambos, menos o que já
+            #    rebateu pela colisão contínua neste passo)
+            if swept_paddle != 1:
+                _c, ball_x, ball_vx, ball_vy = check_paddle_collision(
+                    ball_x, ball_y, ball_vx, ball_vy, PADDLE_DISTANCE_FROM_GOAL, new_p1y
+                )
+            if swept_paddle != 2:
+                _c, ball_x, ball_vx, ball_vy = check_paddle_collision(
+                    ball_x, ball_y, ball_vx, ball_vy, WIDTH - PADDLE_DISTANCE_FROM_GOAL, new_p2y
+                )
+
+            # Segurança: se sair da tela por algum bug, reseta
+            if ball_x < -BALL_SIZE or ball_x > WIDTH + BALL_SIZE:
+                ball_x, ball_y, ball_vx, ball_vy = reset_ball()
+
+    # Commit do estado
+    return GameState(
+        p1y=new_p1y,
+        p2y=new_p2y,
+        ballx=ball_x,
+        bally=ball_y,
+        ballvx=ball_vx,
+        ballvy=ball_vy,
+        score1=score1,
+        score2=score2,
+        game_started=state.game_started,
+        time_left=time_left,
+        game_over=game_over,
+        winner=winner
+    )
@@ -0,0 +1,336 @@
+import math
+import numpy as np
+from config import (
+    TICK, GameState, HEIGHT, WIDTH,
+    PADDLE_WIDTH, PADDLE_HEIGHT, BALL_SIZE, BALL_SPEED,
+    GOAL_HEIGHT, GOAL_Y, PADDLE_DISTANCE_FROM_GOAL,
+    HUD_HEIGHT, TIME_LIMIT_SECONDS,
+    STEP_SCALE, SWEPT_COLLISION
+)
+from engine import (
+    FIELD_CENTER_Y, PADDLE_SPEED,
+    HALF_TH, HALF_B, TOP_BAR_Y, BOT_BAR_Y, LINE_LEFT_X, LINE_RIGHT_X,
+    LEFT_POST_X, RIGHT_POST_X, POST_TOP_Y, POST_BOT_Y, BAR_SPANS, BAR_YS,
+    CORNERS, CORNER_DIST, CORNER_DIST2, LEFT_GOAL_ZONE_X, RIGHT_GOAL_ZONE_X
+)
+from policies import SCRIPT, expand_script
+
+# Física de N partidas de uma vez (struct-of-arrays com NumPy).
+# Mesmas regras e mesma ordem de operações de engine.step: cada partida
+# dá exatamente o mesmo resultado que no caminho escalar.
+# Só a colisão discreta está implementada (SWEPT_COLLISION desligado).
+
+PADDLE_MIN_Y = HUD_HEIGHT + PADDLE_HEIGHT//2
+PADDLE_MAX_Y = HEIGHT - PADDLE_HEIGHT//2
+
+FLOAT_FIELDS = ("p1y", "p2y", "ballx", "bally", "ballvx", "ballvy", "time_left")
+INT_FIELDS = ("score1", "score2", "winner")
+
+class MatchBatch:
+    """Estado de N partidas, um array por campo do GameState."""
+
+    def __init__(self, n):
+        if SWEPT_COLLISION:
+            raise ValueError("engine_vec não implementa SWEPT_COLLISION; use engine.step")
+        self.n = n
+        self.p1y = np.full(n, FIELD_CENTER_Y, dtype=np.float64)
+        self.p2y = np.full(n, FIELD_CENTER_Y, dtype=np.float64)
+        self.ballx = np.full(n, WIDTH//2, dtype=np.float64)
+        self.bally = np.full(n, FIELD_CENTER_Y, dtype=np.float64)
+        self.ballvx = np.zeros(n, dtype=np.float64)
+        self.ballvy = np.zeros(n, dtype=np.float64)
+        self.score1 = np.zeros(n, dtype=np.int64)
+        self.score2 = np.zeros(n, dtype=np.int64)
+        self.game_started = np.zeros(n, dtype=bool)
+        self.time_left = np.full(n, TIME_LIMIT_SECONDS, dtype=np.float64)
+        self.game_over = np.zeros(n, dtype=bool)
+        self.winner = np.zeros(n, dtype=np.int64)
+
+    @classmethod
+    def from_states(cls, states):
+        states = list(states)
+        batch = cls(len(states))
+        for name in GameState._fields:
+            getattr(batch, name)[:] = [getattr(s, name) for s in states]
+        return batch
+
+    def state(self, i):
+        """GameState (tipos Python) da partida i."""
+        return GameState(**{
+            name: (float if name in FLOAT_FIELDS else int if name in INT_FIELDS else bool)(getattr(self, name)[i])
+            for name in GameState._fields
+        })
+
+    def states(self):
+        return [self.state(i) for i in range(self.n)]
+
+    def start(self, mask=None):
+        """Equivalente a engine.start_match nas partidas de mask (todas se None)."""
+        if mask is None:
+            mask = np.ones(self.n, dtype=bool)
+        self.ballx[mask] = WIDTH//2
+        self.bally[mask] = FIELD_CENTER_Y
+        self.ballvx[mask] = float(BALL_SPEED)
+        self.ballvy[mask] = 0.0
+        self.game_started[mask] = True
+
+    def step(self, p1_dir, p2_dir):
+        """Avança um passo em todas as partidas.
+        p1_dir/p2_dir: direção de cada jogador (escalar ou array de N)."""
+        p1_dir = np.broadcast_to(np.asarray(p1_dir, dtype=np.int64), (self.n,))
+        p2_dir = np.broadcast_to(np.asarray(p2_dir, dtype=np.int64), (self.n,))
+
+        # Paddles
+        self.p1y = np.clip(self.p1y + (p1_dir * PADDLE_SPEED * STEP_SCALE), PADDLE_MIN_Y, PADDLE_MAX_Y)
+        self.p2y = np.clip(self.p2y + (p2_dir * PADDLE_SPEED * STEP_SCALE), PADDLE_MIN_Y, PADDLE_MAX_Y)
+
+        # Cronômetro
+        active = self.game_started & ~self.game_over
+        self.time_left = np.where(active, np.maximum(0.0, self.time_left - TICK), self.time_left)
+        ended = active & (self.time_left <= 0.0)
+        if ended.any():
+            self.game_over = self.game_over | ended
+            self.winner = np.where(
+                ended,
+                np.where(self.score1 > self.score2, 1, np.where(self.score2 > self.score1, 2, 0)),
+                self.winner
+            )
+            self.ballvx = np.where(ended, 0.0, self.ballvx)
+            self.ballvy = np.where(ended, 0.0, self.ballvy)
+
+        # Só as partidas com a bola rolando, em arrays compactos
+        idx = np.flatnonzero(active & ~self.game_over)
+        if idx.size == 0:
+            return
+        x, y, vx, vy, s1, s2 = _step_ball(
+            self.ballx[idx], self.bally[idx], self.ballvx[idx], self.ballvy[idx],
+            self.score1[idx], self.score2[idx], self.p1y[idx], self.p2y[idx]
+        )
+        self.ballx[idx] = x
+        self.bally[idx] = y
+        self.ballvx[idx] = vx
+        self.ballvy[idx] = vy
+        self.score1[idx] = s1
+        self.score2[idx] = s2
+
+def _reset(mask, x, y, vx, vy, direction=1):
+    speed = float(BALL_SPEED)
+    x = np.where(mask, WIDTH//2, x)
+    y = np.where(mask, FIELD_CENTER_Y, y)
+    vx = np.where(mask, speed if direction >= 0 else -speed, vx)
+    vy = np.where(mask, 0.0, vy)
+    return x, y, vx, vy
+
+def _step_ball(x, y, vx, vy, s1, s2, p1y, p2y):
+    prev_x, prev_y = x, y
+
+    # Mover bola
+    x = x + vx * STEP_SCALE
+    y = y + vy * STEP_SCALE
+
+    # Teto e chão
+    top = y <= HUD_HEIGHT + BALL_SIZE//2
+    bottom = ~top & (y >= HEIGHT - BALL_SIZE//2)
+    vy = np.where(top, np.abs(vy), np.where(bottom, -np.abs(vy), vy))
+    y = np.where(top, HUD_HEIGHT + BALL_SIZE//2, np.where(bottom, HEIGHT - BALL_SIZE//2, y))
+
+    # Broadphase: só as partidas com a bola perto de um gol
+    near = np.flatnonzero((np.minimum(prev_x, x) - HALF_B <= LEFT_GOAL_ZONE_X) |
+                          (np.maximum(prev_x, x) + HALF_B >= RIGHT_GOAL_ZONE_X))
+    if near.size:
+        x, y, vx, vy, s1, s2 = x.copy(), y.copy(), vx.copy(), vy.copy(), s1.copy(), s2.copy()
+        (x[near], y[near], vx[near], vy[near], s1[near], s2[near]) = _goal_collisions(
+            prev_x[near], prev_y[near], x[near], y[near], vx[near], vy[near], s1[near], s2[near]
+        )
+
+    # 4) Paddles
+    x, vx, vy = _paddle_collision(x, y, vx, vy, PADDLE_DISTANCE_FROM_GOAL, p1y)
+    x, vx, vy = _paddle_collision(x, y, vx, vy, WIDTH - PADDLE_DISTANCE_FROM_GOAL, p2y)
+
+    # Segurança: fora da tela, reseta
+    lost = (x < -BALL_SIZE) | (x > WIDTH + BALL_SIZE)
+    x, y, vx, vy = _reset(lost, x, y, vx, vy)
+    return x, y, vx, vy, s1, s2
+
+def _goal_collisions(prev_x, prev_y, x, y, vx, vy, s1, s2):
+    """engine.goal_collisions para todas as partidas dos arrays."""
+    # 1) Gol por cruzamento da linha
+    prev_left = prev_x - HALF_B
+    new_left = x - HALF_B
+    prev_right = prev_x + HALF_B
+    new_right = x + HALF_B
+    left_cross = (prev_left > LINE_LEFT_X) & (new_left <= LINE_LEFT_X)
+    right_cross = ~left_cross & (prev_right < LINE_RIGHT_X) & (new_right >= LINE_RIGHT_X)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denom = new_left - prev_left
+        t = np.clip(np.where(denom != 0, (LINE_LEFT_X - prev_left) / denom, 0.0), 0.0, 1.0)
+        y_at_cross = prev_y + t * (y - prev_y)
+        goal2 = left_cross & (GOAL_Y <= y_at_cross) & (y_at_cross <= GOAL_Y + GOAL_HEIGHT)
+
+        denom = new_right - prev_right
+        t = np.clip(np.where(denom != 0, (LINE_RIGHT_X - prev_right) / denom, 0.0), 0.0, 1.0)
+        y_at_cross = prev_y + t * (y - prev_y)
+        goal1 = right_cross & (GOAL_Y <= y_at_cross) & (y_at_cross <= GOAL_Y + GOAL_HEIGHT)
+
+    s2 = s2 + goal2
+    s1 = s1 + goal1
+    x, y, vx, vy = _reset(goal2, x, y, vx, vy, -1)
+    x, y, vx, vy = _reset(goal1, x, y, vx, vy, 1)
+
+    # 2) Postes (face externa) e barras do C, só sem cruzamento
+    no_cross = ~left_cross & ~right_cross
+    in_post_y = no_cross & (POST_TOP_Y <= y) & (y <= POST_BOT_Y)
+    hit = in_post_y & (np.abs(x - LEFT_POST_X) <= (HALF_TH + HALF_B)) & (x <= LEFT_POST_X)
+    vx = np.where(hit, -np.abs(vx), vx)
+    x = np.where(hit, LEFT_POST_X - HALF_TH - HALF_B, x)
+    hit = in_post_y & (np.abs(x - RIGHT_POST_X) <= (HALF_TH + HALF_B)) & (x >= RIGHT_POST_X)
+    vx = np.where(hit, np.abs(vx), vx)
+    x = np.where(hit, RIGHT_POST_X + HALF_TH + HALF_B, x)
+
+    for bar_min_x, bar_max_x in BAR_SPANS:
+        region = no_cross & (bar_min_x <= x) & (x <= bar_max_x)
+        for bar_y in BAR_YS:
+            hit = region & (np.abs(y - bar_y) <= (HALF_TH + HALF_B))
+            above = y <= bar_y
+            vy = np.where(hit, np.where(above, -np.abs(vy), np.abs(vy)), vy)
+            y = np.where(hit, np.where(above, bar_y - HALF_TH - HALF_B, bar_y + HALF_TH + HALF_B), y)
+
+    # 2.1) Cantos das barras: o primeiro que bater encerra a checagem
+    changed = np.zeros(x.shape, dtype=bool)
+    for cx, cy in CORNERS:
+        dx = x - cx
+        dy = y - cy
+        dist2 = dx*dx + dy*dy
+        hit = ~changed & (dist2 < CORNER_DIST2)
+        if hit.any():
+            dist = np.where(dist2 > 0, np.sqrt(dist2), 1.0)
+            nx = dx / dist
+            ny = dy / dist
+            x = np.where(hit, cx + nx * CORNER_DIST, x)
+            y = np.where(hit, cy + ny * CORNER_DIST, y)
+            vdotn = vx * nx + vy * ny
+            reflect = hit & (vdotn < 0)
+            vx, vy = (np.where(reflect, vx - 2.0 * vdotn * nx, vx),
+                      np.where(reflect, vy - 2.0 * vdotn * ny, vy))
+            changed |= hit
+
+    # 1b) Failsafe de gol e 3) parede do fundo, só se nenhum canto bateu
+    free = ~changed
+    mouth = free & ((TOP_BAR_Y + HALF_TH) <= y) & (y <= (BOT_BAR_Y - HALF_TH))
+    late2 = mouth & (vx < 0) & ((prev_x + HALF_B) > LINE_LEFT_X) & ((x + HALF_B) <= LINE_LEFT_X)
+    late1 = mouth & ~late2 & (vx > 0) & ((prev_x - HALF_B) < LINE_RIGHT_X) & ((x - HALF_B) >= LINE_RIGHT_X)
+    s2 = s2 + late2
+    s1 = s1 + late1
+    x, y, vx, vy = _reset(late2, x, y, vx, vy, -1)
+    x, y, vx, vy = _reset(late1, x, y, vx, vy, 1)
+
+    hit = free & ((x - HALF_B) <= 0)
+    vx = np.where(hit, np.abs(vx), vx)
+    x = np.where(hit, HALF_B, x)
+    hit = free & ((x + HALF_B) >= WIDTH)
+    vx = np.where(hit, -np.abs(vx), vx)
+    x = np.where(hit, WIDTH - HALF_B, x)
+    return x, y, vx, vy, s1, s2
+
+def _paddle_collision(x, y, vx, vy, paddle_x, paddle_y):
+    """engine.check_paddle_collision para todas as partidas."""
+    hit = ((x - BALL_SIZE//2 <= paddle_x + PADDLE_WIDTH//2) &
+           (x + BALL_SIZE//2 >= paddle_x - PADDLE_WIDTH//2) &
+           (y - BALL_SIZE//2 <= paddle_y + PADDLE_HEIGHT//2) &
+           (y + BALL_SIZE//2 >= paddle_y - PADDLE_HEIGHT//2))
+    hits = np.flatnonzero(hit)
+    if hits.size == 0:
+        return x, vx, vy
+    x, vx, vy = x.copy(), vx.copy(), vy.copy()
+    speed = float(BALL_SPEED)
+    # Poucas partidas batem por passo: cos/sin do math garantem os mesmos
+    # bits do caminho escalar (o SIMD do NumPy pode diferir no último ulp)
+    for i in hits:
+        relative_intersect_y = (y[i] - paddle_y[i]) / (PADDLE_HEIGHT//2)
+        relative_intersect_y = max(-1.0, min(1.0, float(relative_intersect_y)))
+        bounce_angle = relative_intersect_y * (math.pi / 4)
+        new_vx = speed * math.cos(bounce_angle) * (-1 if vx[i] > 0 else 1)
+        vy[i] = speed * math.sin(bounce_angle)
+        vx[i] = new_vx
+        if new_vx > 0:
+            x[i] = paddle_x + PADDLE_WIDTH//2 + BALL_SIZE//2
+        else:
+            x[i] = paddle_x - PADDLE_WIDTH//2 - BALL_SIZE//2
+    return x, vx, vy
+
+# Políticas vetorizadas: mesmos nomes e regras de policies.POLICIES,
+# policy(batch, player_num) -> array de direções
+
+class VecIdle:
+    def __init__(self, n, rng):
+        pass
+
+    def __call__(self, batch, player_num):
+        return 0
+
+class VecRandom:
+    """Direção aleatória por partida, mantida por `hold` passos."""
+
+    def __init__(self, n, rng, hold=10):
+        self.rng = rng
+        self.hold = hold
+        self.count = 0
+        self.direction = np.zeros(n, dtype=np.int64)
+
+    def __call__(self, batch, player_num):
+        if self.count <= 0:
+            self.direction = self.rng.integers(-1, 2, size=batch.n)
+            self.count = self.hold
+        self.count -= 1
+        return self.direction
+
+class VecScripted:
+    """Roteiro fixo (policies.SCRIPT), cada partida em um ponto aleatório do ciclo."""
+
+    def __init__(self, n, rng, script=SCRIPT):
+        self.steps = np.array(expand_script(script), dtype=np.int64)
+        self.index = rng.integers(0, len(self.steps), size=n)
+
+    def __call__(self, batch, player_num):
+        direction = self.steps[self.index]
+        self.index = (self.index + 1) % len(self.steps)
+        return direction
+
+class VecTrack:
+    """Segue a bola quando ela vem na direção do jogador; senão volta ao centro."""
+
+    def __init__(self, n, rng, dead_zone=PADDLE_HEIGHT // 4):
+        self.dead_zone = dead_zone
+
+    def __call__(self, batch, player_num):
+        if player_num == 1:
+            paddle_y, coming = batch.p1y, batch.ballvx < 0
+        else:
+            paddle_y, coming = batch.p2y, batch.ballvx > 0
+        target = np.where(coming, batch.bally, FIELD_CENTER_Y)
+        return np.where(target < paddle_y - self.dead_zone, -1,
+                        np.where(target > paddle_y + self.dead_zone, 1, 0))
+
+VECTOR_POLICIES = {
+    "idle": VecIdle,
+    "random": VecRandom,
+    "scripted": VecScripted,
+    "track": VecTrack,
+}
+
+def play_matches(n, p1_name, p2_name, seed=0, seconds=None):
+    """Joga n partidas em paralelo até todas acabarem.
+    Retorna (MatchBatch final, número de passos)."""
+    rng = np.random.default_rng(seed)
+    p1 = VECTOR_POLICIES[p1_name](n, rng)
+    p2 = VECTOR_POLICIES[p2_name](n, rng)
+    batch = MatchBatch(n)
+    if seconds is not None:
+        batch.time_left[:] = float(seconds)
+    batch.start()
+    ticks = 0
+    while not batch.game_over.all():
+        batch.step(p1(batch, 1), p2(batch, 2))
+        ticks += 1
+    return batch, ticks
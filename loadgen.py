@@ -0,0 +1,292 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import sys
+import time
+from collections import deque
+from config import TICK, STATE_HISTORY
+from codec import CODECS, DEFAULT_CODEC, FrameReader, get_codec, seq_acked
+from policies import POLICIES, get_policy
+from profiler import RollingStats, format_report
+
+# Gerador de carga: milhares de jogadores sintéticos (asyncio, divididos em
+# --processes processos). O servidor junta as conexões em partidas na ordem de chegada;
+# cada jogador decide a direção com uma política a cada snapshot e envia o
+# input como o cliente (na mudança e a cada SEND_EVERY). O relatório usa as
+# mesmas estatísticas (p50/p99/max) do profiler do servidor.
+
+SEND_EVERY = 0.10    # reenvio do input sem mudança de direção (igual ao cliente)
+SAMPLE_WINDOW = 200_000  # amostras guardadas por métrica
+
+# Métricas medidas nos jogadores (segundos)
+METRICS = (
+    "tick_jitter",     # chegada do snapshot vs. relógio de ticks (atraso além do melhor caso)
+    "snapshot_gap",    # intervalo entre snapshots de uma conexão
+    "input_latency",   # envio do input -> snapshot com o ack dele
+    "loadgen_lag",     # atraso do event loop do próprio gerador (medição confiável se baixo)
+)
+
+class LoadStats:
+    """Amostras e contadores de todas as conexões."""
+
+    def __init__(self):
+        self.metrics = {name: RollingStats(SAMPLE_WINDOW) for name in METRICS}
+        self.counters = dict.fromkeys(
+            ("connected", "rejected", "errors", "players", "snapshots",
+             "rx_bytes", "tx_bytes", "inputs"), 0)
+
+    def add(self, name, value):
+        self.metrics[name].add(value)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def reset_measurements(self):
+        """Descarta o que foi medido até aqui (ramp); conexões continuam contadas."""
+        self.metrics = {name: RollingStats(SAMPLE_WINDOW) for name in METRICS}
+        for name in ("snapshots", "rx_bytes", "tx_bytes", "inputs"):
+            self.counters[name] = 0
+
+    def merge(self, other):
+        """Junta as amostras e contadores de outro processo."""
+        for name, theirs in other.metrics.items():
+            mine = self.metrics[name]
+            if mine.samples.maxlen < len(mine.samples) + len(theirs.samples):
+                mine.samples = deque(mine.samples, maxlen=len(mine.samples) + len(theirs.samples))
+            mine.samples.extend(theirs.samples)
+            mine.count += theirs.count
+            mine.max = max(mine.max, theirs.max)
+        for name, value in other.counters.items():
+            self.counters[name] += value
+
+    def report(self, elapsed, server=None):
+        data = {
+            "phases": {name: stats.summary() for name, stats in self.metrics.items()},
+            "counters": dict(self.counters),
+        }
+        data["counters"]["elapsed_s"] = round(elapsed, 3)
+        data["counters"]["rx_bytes_per_s"] = round(self.counters["rx_bytes"] / elapsed)
+        data["counters"]["tx_bytes_per_s"] = round(self.counters["tx_bytes"] / elapsed)
+        if server is not None:
+            data["server"] = server
+        return data
+
+class LoadPlayer:
+    """Uma conexão de jogador: lê os snapshots, confirma os ticks e envia inputs."""
+
+    def __init__(self, index, args, stats):
+        self.index = index
+        self.codec = get_codec(args.codec)
+        self.policy = get_policy(args.policy, args.seed + index)
+        self.stats = stats
+        self.writer = None
+        self.player_num = None
+        self.history = {}
+        self.last_tick = None
+        self.last_arrival = None
+        self.best_offset = None   # menor (chegada - tick * TICK) visto
+        self.direction = 0
+        self.seq = 0
+        self.last_send = 0.0
+        self.sent_at = {}         # seq -> horário de envio (ainda sem ack)
+
+    def send(self, message):
+        payload = (json.dumps(message, separators=(',', ':')) + "\\n").encode("utf-8")
+        self.writer.write(payload)
+        self.stats.count("tx_bytes", len(payload))
+
+    def send_input(self, now):
+        self.seq += 1
+        self.sent_at[self.seq] = now
+        message = {"direction": self.direction, "seq": self.seq, "tick": self.last_tick}
+        if self.last_tick is not None:
+            message["ack"] = self.last_tick
+        self.send(message)
+        self.last_send = now
+        self.stats.count("inputs")
+
+    def on_state(self, frame, now):
+        tick, _step, acks, state = self.codec.decode_state(frame, self.history)
+        if state is None or (self.last_tick is not None and tick <= self.last_tick):
+            return
+        self.history[tick] = state
+        for old in [t for t in self.history if t <= tick - STATE_HISTORY]:
+            del self.history[old]
+        self.last_tick = tick
+        self.stats.count("snapshots")
+
+        offset = now - tick * TICK
+        if self.best_offset is None or offset < self.best_offset:
+            self.best_offset = offset
+        self.stats.add("tick_jitter", offset - self.best_offset)
+        if self.last_arrival is not None:
+            self.stats.add("snapshot_gap", now - self.last_arrival)
+        self.last_arrival = now
+
+        if self.player_num is None:
+            return
+        ack = acks[self.player_num - 1]
+        for seq in [seq for seq in self.sent_at if seq_acked(seq, ack)]:
+            sent = self.sent_at.pop(seq)
+            if seq & 0xFFFF == ack & 0xFFFF:  # o aplicado (os anteriores foram substituídos)
+                self.stats.add("input_latency", now - sent)
+
+        direction = self.policy(state, self.player_num)
+        if direction != self.direction or now - self.last_send >= SEND_EVERY:
+            self.direction = direction
+            self.send_input(now)
+
+    async def run(self, host, port, stop):
+        try:
+            reader, self.writer = await asyncio.open_connection(host, port)
+        except OSError:
+            self.stats.count("errors")
+            return
+        self.stats.count("connected")
+        frames = FrameReader(self.codec)
+        # Primeira linha: codec (o servidor responde com o número do jogador)
+        self.send({"codec": self.codec.name})
+        try:
+            while not stop.is_set():
+                data = await reader.read(65536)
+                if not data:
+                    if self.player_num is None:
+                        self.stats.count("rejected")
+                    break
+                now = time.perf_counter()
+                self.stats.count("rx_bytes", len(data))
+                controls, newest = frames.feed(data)
+                for message in controls:
+                    if "player" in message and self.player_num is None:
+                        self.player_num = message["player"]
+                        self.stats.count("players")
+                if newest is not None:
+                    self.on_state(newest, now)
+        except (ConnectionError, OSError, ValueError):
+            self.stats.count("errors")
+        finally:
+            self.writer.close()
+
+async def measure_loop_lag(stats, stop, interval=0.05):
+    """Quanto o event loop do gerador atrasa um sleep (saturação do próprio gerador)."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        stats.add("loadgen_lag", max(0.0, time.perf_counter() - started - interval))
+
+async def admin_command(port, command):
+    """Comando no socket de admin do servidor (profiler); None se indisponível."""
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(command.encode("utf-8") + b"\n")
+        data = await reader.read()
+        writer.close()
+        return data.decode("utf-8")
+    except OSError:
+        return None
+
+async def run_load(args, first, count, admin):
+    """Roda os jogadores first..first+count-1 neste processo.
+    Com admin, zera o profiler do servidor no início e o lê no fim da medição.
+    Retorna (LoadStats, segundos medidos, snapshot do servidor ou None)."""
+    stats = LoadStats()
+    stop = asyncio.Event()
+    if admin:
+        await admin_command(args.admin_port, "reset")
+    lag_task = asyncio.create_task(measure_loop_lag(stats, stop))
+
+    # Abre as conexões aos poucos (ramp) para não medir só a rajada inicial
+    tasks = []
+    interval = args.processes / args.ramp
+    for index in range(first, first + count):
+        player = LoadPlayer(index, args, stats)
+        tasks.append(asyncio.create_task(player.run(args.host, args.port, stop)))
+        await asyncio.sleep(interval)
+
+    # As métricas valem a partir do fim do ramp
+    stats.reset_measurements()
+    measured = time.perf_counter()
+    await asyncio.sleep(args.duration)
+    elapsed = time.perf_counter() - measured
+
+    server = None
+    if admin:
+        raw = await admin_command(args.admin_port, "json")
+        server = json.loads(raw) if raw else None
+    stop.set()
+    for task in tasks + [lag_task]:
+        task.cancel()
+    await asyncio.gather(*tasks, lag_task, return_exceptions=True)
+    return stats, elapsed, server
+
+def load_worker(args, first, count, admin):
+    raise_fd_limit()
+    return asyncio.run(run_load(args, first, count, admin))
+
+def raise_fd_limit():
+    """Sobe o limite de descritores até o máximo permitido (milhares de sockets)."""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or hard > soft:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError):
+            pass
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Gerador de carga para o servidor do Hockey")
+    parser.add_argument("host")
+    parser.add_argument("port", type=int)
+    parser.add_argument("--connections", type=int, default=200,
+                        help="jogadores sintéticos (pareados em partidas pelo servidor)")
+    parser.add_argument("--ramp", type=float, default=200.0,
+                        help="conexões abertas por segundo")
+    parser.add_argument("--duration", type=float, default=30.0,
+                        help="segundos de medição após abrir todas as conexões")
+    parser.add_argument("--codec", choices=sorted(CODECS), default=DEFAULT_CODEC)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="track",
+                        help="política dos jogadores")
+    parser.add_argument("--seed", type=int, default=0, help="semente das políticas")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="processos geradores (um event loop satura com algumas centenas)")
+    parser.add_argument("--admin-port", type=int, default=None,
+                        help="porta de admin do servidor: inclui o profiler dele no relatório")
+    parser.add_argument("--out", default=None, help="grava o relatório em JSON neste arquivo")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args(sys.argv[1:])
+    args.processes = max(1, min(args.processes, args.connections))
+    # Divide as conexões entre os processos (o primeiro fala com o admin)
+    shares = [args.connections // args.processes + (i < args.connections % args.processes)
+              for i in range(args.processes)]
+    jobs = [(args, sum(shares[:i]), shares[i], i == 0 and args.admin_port is not None)
+            for i in range(args.processes)]
+    print(f"{args.connections} conexões em {args.processes} processo(s), "
+          f"{args.ramp:.0f}/s; medindo {args.duration:.0f}s após o ramp")
+    if args.processes == 1:
+        results = [load_worker(*jobs[0])]
+    else:
+        with multiprocessing.Pool(args.processes) as pool:
+            results = pool.starmap(load_worker, jobs)
+
+    stats, elapsed, server = results[0]
+    for other, other_elapsed, _ in results[1:]:
+        stats.merge(other)
+        elapsed = max(elapsed, other_elapsed)
+    report = stats.report(elapsed, server)
+    print(format_report(report), end="")
+    if "server" in report:
+        print("-- servidor --")
+        print(format_report(report["server"]), end="")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Relatório gravado em {args.out}")
+
+if __name__ == "__main__":
+    main()
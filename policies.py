@@ -0,0 +1,83 @@
+import random
+from config import PADDLE_HEIGHT
+from engine import FIELD_CENTER_Y
+
+# Políticas de jogo scriptadas: policy(state, player_num) -> direção (-1, 0, 1).
+# Usadas pelo runner em lote e por bots.
+
+# Roteiro do Scripted: (direção, passos), repetido em ciclo. Sobe até o
+# topo, desce até o fundo e volta ao centro, com pausas.
+SCRIPT = ((-1, 40), (0, 20), (1, 80), (0, 20), (-1, 40))
+
+def expand_script(script=SCRIPT):
+    """Uma direção por passo do roteiro."""
+    return [direction for direction, steps in script for _ in range(steps)]
+
+class Idle:
+    """Não se mexe."""
+
+    def __init__(self, seed=None):
+        pass
+
+    def __call__(self, state, player_num):
+        return 0
+
+class RandomPolicy:
+    """Direção aleatória, mantida por `hold` passos."""
+
+    def __init__(self, seed=None, hold=10):
+        self.rng = random.Random(seed)
+        self.hold = hold
+        self.count = 0
+        self.direction = 0
+
+    def __call__(self, state, player_num):
+        if self.count <= 0:
+            self.direction = self.rng.choice((-1, 0, 1))
+            self.count = self.hold
+        self.count -= 1
+        return self.direction
+
+class Scripted:
+    """Segue o roteiro fixo, ignorando o estado. Sem semente começa do
+    início; com semente, de um ponto aleatório do ciclo."""
+
+    def __init__(self, seed=None, script=SCRIPT):
+        self.steps = expand_script(script)
+        self.index = 0 if seed is None else random.Random(seed).randrange(len(self.steps))
+
+    def __call__(self, state, player_num):
+        direction = self.steps[self.index]
+        self.index = (self.index + 1) % len(self.steps)
+        return direction
+
+class TrackBall:
+    """Segue a bola quando ela vem na direção do jogador; senão volta ao centro."""
+
+    def __init__(self, seed=None, dead_zone=PADDLE_HEIGHT // 4):
+        self.dead_zone = dead_zone
+
+    def __call__(self, state, player_num):
+        if player_num == 1:
+            paddle_y, coming = state.p1y, state.ballvx < 0
+        else:
+            paddle_y, coming = state.p2y, state.ballvx > 0
+        target = state.bally if coming else FIELD_CENTER_Y
+        if target < paddle_y - self.dead_zone:
+            return -1
+        if target > paddle_y + self.dead_zone:
+            return 1
+        return 0
+
+POLICIES = {
+    "idle": Idle,
+    "random": RandomPolicy,
+    "scripted": Scripted,
+    "track": TrackBall,
+}
+
+def get_policy(name, seed=None):
+    try:
+        return POLICIES[name](seed)
+    except KeyError:
+        raise ValueError(f"Política desconhecida: {name}") from None
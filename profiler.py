@@ -0,0 +1,129 @@
+import json
+import socket
+import threading
+from collections import deque
+from config import PROFILE_WINDOW
+
+# Instrumentação do loop de ticks: duração de cada fase por iteração
+# (janela das últimas PROFILE_WINDOW amostras -> p50/p99/max) e contadores.
+
+# Fases de cada iteração do loop (tick = iteração inteira)
+TICK_PHASES = ("lock_wait", "physics", "encode", "send", "tick")
+# Entrega aos espectadores roda fora do loop, uma amostra por entrega
+PHASES = TICK_PHASES + ("spectators",)
+
+class RollingStats:
+    """Janela das últimas amostras de uma fase (segundos)."""
+
+    def __init__(self, window=PROFILE_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.max = 0.0  # desde o início (a janela pode já ter descartado o pico)
+
+    def add(self, value):
+        self.samples.append(value)
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def summary(self):
+        values = sorted(self.samples)
+        if not values:
+            return {"count": self.count, "p50_ms": 0.0, "p99_ms": 0.0, "window_max_ms": 0.0, "max_ms": 0.0}
+        def pct(p):
+            return values[min(len(values) - 1, int(p * len(values)))] * 1000
+        return {
+            "count": self.count,
+            "p50_ms": pct(0.50),
+            "p99_ms": pct(0.99),
+            "window_max_ms": values[-1] * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+class TickProfiler:
+    """Registra fases e contadores; lido por outra thread (admin)."""
+
+    def __init__(self, window=PROFILE_WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.phases = {name: RollingStats(self.window) for name in PHASES}
+            self.counters = {}
+
+    def timings(self):
+        """Acumulador de uma iteração, preenchido pelas salas e depois gravado."""
+        return dict.fromkeys(TICK_PHASES, 0.0)
+
+    def record(self, timings):
+        """Grava as fases de uma iteração (as que ficaram em zero também contam)."""
+        with self.lock:
+            for name, value in timings.items():
+                self.phases[name].add(value)
+
+    def add(self, name, value):
+        """Uma amostra isolada de uma fase (ex.: entrega aos espectadores)."""
+        with self.lock:
+            self.phases[name].add(value)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self, extra=None):
+        with self.lock:
+            data = {
+                "phases": {name: stats.summary() for name, stats in self.phases.items()},
+                "counters": dict(self.counters),
+            }
+        if extra:
+            data["counters"].update(extra)
+        return data
+
+def format_report(data):
+    """Tabela de texto de um snapshot."""
+    lines = [f"{'fase':<12}{'amostras':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}"]
+    for name, s in data["phases"].items():
+        lines.append(f"{name:<12}{s['count']:>10}{s['p50_ms']:>10.3f}{s['p99_ms']:>10.3f}{s['max_ms']:>10.3f}")
+    for name, value in sorted(data["counters"].items()):
+        lines.append(f"{name}: {value}")
+    return "\n".join(lines) + "\n"
+
+def admin_response(command, snapshot, reset=None):
+    """Resposta do socket de admin para um comando ("", "json" ou "reset")."""
+    command = command.strip().lower()
+    if command == "reset" and reset is not None:
+        reset()
+        return b"ok\n"
+    if command == "json":
+        return (json.dumps(snapshot()) + "\n").encode("utf-8")
+    return format_report(snapshot()).encode("utf-8")
+
+def serve_admin(port, snapshot, reset=None, host="127.0.0.1"):
+    """Socket de admin local (thread): cada conexão pode mandar um comando
+    em uma linha (json, reset); sem comando recebe o relatório em texto."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen()
+
+    def run():
+        while True:
+            conn, _addr = sock.accept()
+            with conn:
+                conn.settimeout(0.2)
+                try:
+                    command = conn.recv(64).decode("utf-8", errors="ignore")
+                except socket.timeout:
+                    command = ""
+                except OSError:
+                    continue
+                try:
+                    conn.sendall(admin_response(command, snapshot, reset))
+                except OSError:
+                    pass
+
+    threading.Thread(target=run, daemon=True).start()
+    return sock
@@ -0,0 +1,325 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from bisect import bisect_right
+from collections import deque
+from config import TICK_RATE, GameState, PlayerInput, REPLAY_KEYFRAME_INTERVAL, REPLAY_FLUSH_BYTES
+import engine
+from engine import step
+
+# Replay de uma partida: arquivo binário só de acréscimo, um por sala.
+# Cabeçalho + registros em sequência:
+#   input    - direção dos dois jogadores (2x int8) aplicada em um tick
+#   keyframe - KEYFRAME_TAG + tick (uint32) + GameState completo (float64)
+# O keyframe do tick T é o estado de entrada do step de T (antes dos inputs
+# de T), e os inputs seguintes são dos ticks T, T+1, ... até o próximo
+# keyframe. Há um keyframe a cada REPLAY_KEYFRAME_INTERVAL ticks e sempre
+# que a sala altera o estado fora do step (início e pausa da partida).
+# As direções ficam em -127..127, então o byte KEYFRAME_TAG (0x80) nunca
+# aparece em um input e os keyframes são achados com uma busca no mmap.
+
+MAGIC = b"HKRP"
+VERSION = 2
+# magic, versão, ticks por segundo, flags, sala, início (unix)
+# TICK_RATE e SWEPT_COLLISION mudam a física: o replay só é lido com os mesmos
+HEADER = struct.Struct("<4sBHBId")
+HEADER_FLAG_SWEPT = 0x01
+INPUT_RECORD = struct.Struct("<bb")
+KEYFRAME_TAG = b"\x80"
+# tick | p1y p2y ballx bally ballvx ballvy | score1 score2 | time_left | flags winner
+KEYFRAME = struct.Struct("<BI6d2HdBB")
+
+FLAG_GAME_STARTED = 0x01
+FLAG_GAME_OVER = 0x02
+
+MAX_DIRECTION = 127  # direções além disso já levam o paddle à borda em um passo
+
+def _clamp(direction):
+    return max(-MAX_DIRECTION, min(MAX_DIRECTION, direction))
+
+# Registros prontos das direções normais (-1, 0, 1): no tick é só um lookup
+INPUT_BYTES = {(p1, p2): INPUT_RECORD.pack(p1, p2) for p1 in (-1, 0, 1) for p2 in (-1, 0, 1)}
+
+def pack_keyframe(tick, state):
+    flags = (FLAG_GAME_STARTED if state.game_started else 0) | (FLAG_GAME_OVER if state.game_over else 0)
+    return KEYFRAME.pack(
+        KEYFRAME_TAG[0], tick,
+        state.p1y, state.p2y,
+        state.ballx, state.bally, state.ballvx, state.ballvy,
+        state.score1, state.score2,
+        state.time_left,
+        flags, state.winner
+    )
+
+def unpack_keyframe(data, offset=0):
+    """Retorna (tick, GameState) do keyframe em offset."""
+    (_tag, tick, p1y, p2y, ballx, bally, ballvx, ballvy,
+     score1, score2, time_left, flags, winner) = KEYFRAME.unpack_from(data, offset)
+    return tick, GameState(
+        p1y, p2y, ballx, bally, ballvx, ballvy, score1, score2,
+        bool(flags & FLAG_GAME_STARTED), time_left, bool(flags & FLAG_GAME_OVER), winner
+    )
+
+# ------------------ Gravação ------------------
+
+class ReplayWriter:
+    """Grava os replays fora do loop de ticks: as salas só publicam pedaços
+    prontos (deque.append, sem lock) e esta thread faz o I/O."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.pending = deque()  # (caminho, bytes, fechar depois)
+        self.files = {}         # caminho -> arquivo aberto
+        self.lock = threading.Lock()  # drenagem (thread de escrita ou close na saída)
+        self._wakeup = threading.Event()
+
+    def start_recording(self, room_id):
+        """Nova gravação para a partida da sala (arquivo criado na primeira escrita)."""
+        started = time.time()
+        name = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(started))}-sala{room_id}.replay"
+        return ReplayRecorder(self, os.path.join(self.directory, name), room_id, started)
+
+    def submit(self, path, data, close=False):
+        self.pending.append((path, data, close))
+        self._wakeup.set()
+
+    def drain(self):
+        with self.lock:
+            touched = set()
+            while self.pending:
+                path, data, close = self.pending.popleft()
+                try:
+                    f = self.files.get(path)
+                    if f is None:
+                        f = self.files[path] = open(path, "ab")
+                    f.write(data)
+                    touched.add(path)
+                    if close:
+                        touched.discard(path)
+                        self.files.pop(path).close()
+                except OSError as e:
+                    print(f"Erro ao gravar replay {path}: {e}")
+                    f = self.files.pop(path, None)
+                    if f is not None:
+                        f.close()
+            # Cada pedaço vai para o SO (um crash perde no máximo o buffer da sala)
+            for path in touched:
+                try:
+                    self.files[path].flush()
+                except OSError as e:
+                    print(f"Erro ao gravar replay {path}: {e}")
+
+    def close(self):
+        """Grava o pendente e fecha os arquivos (saída do servidor)."""
+        self.drain()
+        with self.lock:
+            for f in self.files.values():
+                f.close()
+            self.files.clear()
+
+    def run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self.drain()
+
+class ReplayRecorder:
+    """Gravação de uma partida. Usado só pela thread de ticks: acumula os
+    registros em memória e entrega ao ReplayWriter em pedaços."""
+
+    def __init__(self, writer, path, room_id, started):
+        self.writer = writer
+        self.path = path
+        flags = HEADER_FLAG_SWEPT if engine.SWEPT_COLLISION else 0
+        self.buffer = bytearray(HEADER.pack(MAGIC, VERSION, TICK_RATE, flags, room_id, started))
+        self.next_keyframe_tick = 0
+
+    def record(self, tick, state, p1_direction, p2_direction, keyframe=False):
+        """Registra os inputs aplicados no tick a partir de state (o estado
+        antes do step). keyframe força um estado completo (estado alterado
+        fora do step)."""
+        if keyframe or tick >= self.next_keyframe_tick:
+            self.next_keyframe_tick = tick + REPLAY_KEYFRAME_INTERVAL
+            self.buffer += pack_keyframe(tick, state)
+            keyframe = True
+        record = INPUT_BYTES.get((p1_direction, p2_direction))
+        if record is None:
+            record = INPUT_RECORD.pack(_clamp(p1_direction), _clamp(p2_direction))
+        self.buffer += record
+        if keyframe or len(self.buffer) >= REPLAY_FLUSH_BYTES:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.writer.submit(self.path, bytes(self.buffer))
+            self.buffer.clear()
+
+    def close(self):
+        self.writer.submit(self.path, bytes(self.buffer), close=True)
+        self.buffer.clear()
+
+# ------------------ Leitura ------------------
+
+class Replay:
+    """Leitura de um replay via mmap. O índice dos keyframes é montado na
+    abertura; state_at(tick) parte do keyframe anterior e refaz os passos
+    com engine.step. Aceita arquivos truncados (gravação interrompida):
+    vale até o último registro completo."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            if os.fstat(self._file.fileno()).st_size < HEADER.size:
+                raise ValueError(f"Replay vazio ou truncado: {path}")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            self._file.close()
+            raise
+        magic, version, self.tick_rate, flags, self.room_id, self.started = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Não é um replay (versão {VERSION}): {path}")
+        self.swept_collision = bool(flags & HEADER_FLAG_SWEPT)
+        if (self.tick_rate, self.swept_collision) != (TICK_RATE, engine.SWEPT_COLLISION):
+            self.close()
+            raise ValueError(
+                f"Replay gravado com TICK_RATE={self.tick_rate} e SWEPT_COLLISION={self.swept_collision}; "
+                f"a configuração atual ({TICK_RATE}, {engine.SWEPT_COLLISION}) não o reproduz: {path}"
+            )
+        self._index()
+
+    def _index(self):
+        """Ticks e offsets dos keyframes e onde terminam os inputs de cada um."""
+        data, size = self._map, len(self._map)
+        self.keyframe_ticks = []
+        self._offsets = []
+        self._ends = []
+        pos = HEADER.size
+        while True:
+            found = data.find(KEYFRAME_TAG, pos)
+            if found < 0 or found + KEYFRAME.size > size:
+                end = size if found < 0 else found
+                break
+            if self._offsets:
+                self._ends.append(found)
+            tick, _state = unpack_keyframe(data, found)
+            self.keyframe_ticks.append(tick)
+            self._offsets.append(found)
+            pos = found + KEYFRAME.size
+        if self._offsets:
+            self._ends.append(end)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if not self._file.closed:
+            if getattr(self, "_map", None) is not None:
+                self._map.close()
+            self._file.close()
+
+    def _inputs(self, i):
+        start = self._offsets[i] + KEYFRAME.size
+        end = start + (self._ends[i] - start) // INPUT_RECORD.size * INPUT_RECORD.size
+        return start, end
+
+    @property
+    def first_tick(self):
+        return self.keyframe_ticks[0] if self.keyframe_ticks else None
+
+    @property
+    def last_tick(self):
+        """Último tick com input gravado (None se não houver nenhum)."""
+        if not self.keyframe_ticks:
+            return None
+        start, end = self._inputs(len(self._offsets) - 1)
+        last = self.keyframe_ticks[-1] + (end - start) // INPUT_RECORD.size - 1
+        return last if last >= self.first_tick else None
+
+    def _segment(self, tick):
+        last = self.last_tick
+        if last is None or not self.first_tick <= tick <= last:
+            raise IndexError(f"Tick {tick} fora do replay ({self.first_tick}..{last})")
+        return bisect_right(self.keyframe_ticks, tick) - 1
+
+    def inputs_at(self, tick):
+        """(direção do jogador 1, direção do jogador 2) aplicadas no tick."""
+        i = self._segment(tick)
+        start, _end = self._inputs(i)
+        return INPUT_RECORD.unpack_from(self._map, start + (tick - self.keyframe_ticks[i]) * INPUT_RECORD.size)
+
+    def state_at(self, tick):
+        """Estado da partida depois do tick (o que o servidor enviou nele)."""
+        i = self._segment(tick)
+        _tick, state = unpack_keyframe(self._map, self._offsets[i])
+        start, _end = self._inputs(i)
+        end = start + (tick - self.keyframe_ticks[i] + 1) * INPUT_RECORD.size
+        for p1, p2 in INPUT_RECORD.iter_unpack(self._map[start:end]):
+            state = step(state, PlayerInput(p1), PlayerInput(p2))
+        return state
+
+    def states(self, first=None, last=None):
+        """(tick, estado depois do tick) de first a last, em ordem."""
+        first = self.first_tick if first is None else first
+        last = self.last_tick if last is None else last
+        if first > last:
+            return
+        i = self._segment(first)
+        state = self.state_at(first)
+        yield first, state
+        tick = first + 1
+        while tick <= last:
+            if i + 1 < len(self.keyframe_ticks) and tick >= self.keyframe_ticks[i + 1]:
+                i += 1
+                _tick, state = unpack_keyframe(self._map, self._offsets[i])
+            start, end = self._inputs(i)
+            offset = start + (tick - self.keyframe_ticks[i]) * INPUT_RECORD.size
+            stop = min(end, offset + (last - tick + 1) * INPUT_RECORD.size)
+            for p1, p2 in INPUT_RECORD.iter_unpack(self._map[offset:stop]):
+                state = step(state, PlayerInput(p1), PlayerInput(p2))
+                yield tick, state
+                tick += 1
+
+# ------------------ CLI ------------------
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Lê um replay gravado pelo servidor (--replay-dir)")
+    parser.add_argument("path", help="arquivo .replay")
+    parser.add_argument("--tick", type=int, action="append", default=[],
+                        help="mostra o estado depois deste tick (pode repetir)")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args(sys.argv[1:])
+    with Replay(args.path) as replay:
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(replay.started))
+        swept = ", colisão swept" if replay.swept_collision else ""
+        print(f"Sala {replay.room_id}, início {started}, {replay.tick_rate} ticks/s{swept}")
+        if replay.last_tick is None:
+            print("Nenhum tick gravado")
+            return
+        ticks = replay.last_tick - replay.first_tick + 1
+        final = replay.state_at(replay.last_tick)
+        print(f"Ticks {replay.first_tick}..{replay.last_tick} ({ticks / replay.tick_rate:.1f} s), "
+              f"{len(replay.keyframe_ticks)} keyframes")
+        print(f"Placar: {final.score1} x {final.score2}"
+              + (f" (fim de jogo, vencedor {final.winner})" if final.game_over else ""))
+        for tick in args.tick:
+            try:
+                state = replay.state_at(tick)
+            except IndexError as e:
+                print(e)
+                continue
+            p1, p2 = replay.inputs_at(tick)
+            print(f"Tick {tick}: inputs {p1:+d} {p2:+d} -> {dict(state._asdict())}")
+
+if __name__ == "__main__":
+    main()
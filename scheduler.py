@@ -0,0 +1,65 @@
+import time
+from config import TICK, MAX_CATCHUP_STEPS
+
+class FixedStepScheduler:
+    """Passo fixo com prazos absolutos (acumulador).
+
+    Cada passo tem um prazo em step, 2*step, ...; atrasos (sono além do
+    previsto, pausa do GC, tick pesado) são compensados rodando mais de um
+    passo de uma vez, até max_catchup. O que passar disso é descartado para
+    não entrar em espiral.
+
+    Contadores:
+      late_ticks    - passos que começaram depois do próprio prazo (recuperação)
+      dropped_steps - passos descartados por passar de max_catchup
+      overruns      - iterações cujo trabalho levou mais que um passo
+    """
+
+    def __init__(self, step=TICK, max_catchup=MAX_CATCHUP_STEPS, clock=time.perf_counter):
+        self.step = step
+        self.max_catchup = max_catchup
+        self.clock = clock
+        self.next_deadline = clock() + step
+        self.steps = 0
+        self.late_ticks = 0
+        self.dropped_steps = 0
+        self.overruns = 0
+
+    def due_steps(self, now=None):
+        """Quantos passos devem rodar agora (0 se o próximo prazo não chegou)."""
+        if now is None:
+            now = self.clock()
+        if now < self.next_deadline:
+            return 0
+        due = int((now - self.next_deadline) // self.step) + 1
+        if due > self.max_catchup:
+            self.dropped_steps += due - self.max_catchup
+            due = self.max_catchup
+            # Descarta o atraso excedente: a grade recomeça a partir de agora
+            self.next_deadline = now + self.step
+        else:
+            self.next_deadline += due * self.step
+        self.late_ticks += due - 1
+        self.steps += due
+        return due
+
+    def finish(self, started, now=None):
+        """Registra o fim do trabalho de uma iteração iniciada em started."""
+        if now is None:
+            now = self.clock()
+        if now - started > self.step:
+            self.overruns += 1
+
+    def sleep_time(self, now=None):
+        """Tempo até o próximo prazo."""
+        if now is None:
+            now = self.clock()
+        return max(0.0, self.next_deadline - now)
+
+    def stats(self):
+        return {
+            "steps": self.steps,
+            "late_ticks": self.late_ticks,
+            "dropped_steps": self.dropped_steps,
+            "overruns": self.overruns,
+        }
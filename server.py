@@ -1,517 +1,792 @@
+import argparse
+import atexit
+import heapq
 import json
+import os
+import secrets
+import signal
 import socket
 import threading
 import sys
 import time
-import math
+from collections import deque
 from config import (
-    TICK, GameState, PlayerInput, HEIGHT, WIDTH,
-    PADDLE_WIDTH, PADDLE_HEIGHT, BALL_SIZE, BALL_SPEED,
-    GOAL_HEIGHT, GOAL_Y, PADDLE_DISTANCE_FROM_GOAL,
-    HUD_HEIGHT, GOAL_INSET, GOAL_BAR_LENGTH, GOAL_THICKNESS, TIME_LIMIT_SECONDS
+    PlayerInput, MAX_ROOMS, INPUT_DELAY_TICKS, INPUT_MAX_DELAY_TICKS, INPUT_WINDOW_TICKS,
+    KEYFRAME_INTERVAL, STATE_HISTORY,
+    OUTBOUND_QUEUE_SIZE, OUTBOUND_POLICY, SPECTATOR_SEND_EVERY,
+    SEND_EVERY_TICKS
 )
+from codec import get_codec, DEFAULT_CODEC, decode_udp_input
+from scheduler import FixedStepScheduler
+from engine import initial_state, start_match, step
+from profiler import TickProfiler, serve_admin
+from replay import ReplayWriter
 
-clients = []
-client_players = {}  # mapeia conexão para número do jogador (1 ou 2)
-
-# Posições iniciais (centradas no campo útil)
-FIELD_CENTER_Y = HUD_HEIGHT + (HEIGHT - HUD_HEIGHT) // 2
-
-game_state = GameState(
-    p1y=FIELD_CENTER_Y,
-    p2y=FIELD_CENTER_Y,
-    ballx=WIDTH//2, bally=FIELD_CENTER_Y,
-    ballvx=0.0, ballvy=0.0,
-    score1=0, score2=0,
-    game_started=False,
-    time_left=TIME_LIMIT_SECONDS,
-    game_over=False,
-    winner=0
-)
+host = ''
+porta = None
 
-p1_input = PlayerInput(direction=0)
-p2_input = PlayerInput(direction=0)
-mutex = threading.Lock()
+BUFFER_SIZE = 2048
 
-if len(sys.argv) != 2:
-    print(f"Uso: python {sys.argv[0]} <port>")
-    sys.exit(1)
+# Delimitador das linhas de input do cliente
+DELIMITER = b"\\n"
 
-host = ''
-porta = int(sys.argv[1])
+# Tamanho máximo de uma linha de input (evita buffer sem limite)
+MAX_LINE_SIZE = BUFFER_SIZE
 
-BUFFER_SIZE = 2048
+rooms = {}  # mapeia id da sala para GameRoom
+rooms_lock = threading.Lock()
+_next_room_id = 1
+
+udp_channel = None  # UdpChannel ativo (servidor iniciado com --udp)
+
+replay_writer = None  # ReplayWriter ativo (servidor iniciado com --replay-dir)
+closed_rooms = deque()  # salas encerradas com replay a fechar (na thread de ticks)
+
+profiler = TickProfiler()  # fases do loop de ticks (consultado pelo admin)
 
 # ------------------ Util ------------------
 
-def get_lines(conn):
-    """Monta linhas completas a partir do socket (delimitadas por \\n)."""
-    current_line = ""
+def get_lines(conn, max_line=MAX_LINE_SIZE):
+    """Linhas completas (bytes, sem o delimitador) lidas do socket.
+    recv_into em um buffer fixo por conexão (max_line + BUFFER_SIZE bytes):
+    sem decodificar para str nem concatenar pedaços, e a busca do
+    delimitador continua de onde parou. Uma linha maior que max_line
+    encerra a leitura com ValueError (memória constante por conexão)."""
+    buffer = bytearray(max_line + BUFFER_SIZE)
+    view = memoryview(buffer)
+    start = end = scan = 0  # linha pendente em buffer[start:end]
     while True:
-        data = conn.recv(BUFFER_SIZE) 
-        if not data:
-            if current_line:
-                yield current_line
+        # Pouco espaço no fim: move a linha pendente para o início
+        if len(buffer) - end < BUFFER_SIZE:
+            view[:end - start] = buffer[start:end]
+            end -= start
+            scan -= start
+            start = 0
+        received = conn.recv_into(view[end:])
+        if not received:
+            if end > start:
+                yield bytes(view[start:end])
             break
+        end += received
 
-        decoded = data.decode("utf-8", errors="ignore")
-        parts = decoded.split("\\n")
-
-        for part in parts[:-1]:
-            yield current_line + part
-            current_line = ""
-
-        current_line += parts[-1]
+        while True:
+            found = buffer.find(DELIMITER, max(start, scan), end)
+            if found == -1:
+                scan = max(start, end - len(DELIMITER) + 1)
+                break
+            # O limite vale para toda linha, chegue ela inteira ou aos pedaços
+            if found - start > max_line:
+                raise ValueError(f"Linha maior que {max_line} bytes")
+            yield bytes(view[start:found])
+            start = found + len(DELIMITER)
+
+        if end - start > max_line:
+            raise ValueError(f"Linha maior que {max_line} bytes")
+        if start == end:
+            start = end = scan = 0
+
+class OutboundQueue:
+    """Fila de saída limitada de uma conexão (drenada fora do loop do jogo).
+    Ao encher, aplica a política: "latest" descarta os frames de estado
+    antigos e fica só com o mais recente; "disconnect" pede o encerramento
+    da conexão. Frames de controle (jogador, token UDP) nunca são
+    descartados: se a fila enche só com eles, a conexão é encerrada."""
+
+    def __init__(self, maxsize=OUTBOUND_QUEUE_SIZE, policy=OUTBOUND_POLICY):
+        self.frames = deque()  # (payload, é frame de estado)
+        self.maxsize = maxsize
+        self.policy = policy
+        # Estados vêm do loop do jogo e controles da thread da conexão
+        self.lock = threading.Lock()
+
+    def push(self, payload, state=False):
+        """Enfileira o frame; retorna False se a conexão deve ser encerrada.
+        state marca um frame de estado (pode ser descartado pela política)."""
+        with self.lock:
+            if len(self.frames) >= self.maxsize:
+                if self.policy == "disconnect":
+                    return False
+                # Deltas são contra o tick confirmado, então descartar estados
+                # velhos é seguro; os controles ficam, na ordem
+                controls = [frame for frame in self.frames if not frame[1]]
+                if len(controls) >= self.maxsize:
+                    return False
+                # Descartes aparecem no relatório do profiler (admin)
+                profiler.count("dropped_frames", len(self.frames) - len(controls))
+                self.frames = deque(controls)
+            self.frames.append((payload, state))
+            return True
+
+    def pop(self):
+        with self.lock:
+            if not self.frames:
+                return None
+            return self.frames.popleft()[0]
+
+class Session:
+    """Uma conexão de cliente, o codec de fio escolhido e sua fila de saída."""
+
+    def __init__(self, conn, addr):
+        self.conn = conn
+        self.addr = addr
+        # Definido pela primeira linha recebida; até lá nada é enviado,
+        # para que um cliente binário nunca receba um frame JSON
+        self.codec = None
+        # Último tick que o cliente confirmou ter recebido (base dos deltas)
+        self.acked_tick = None
+        self.player_num = None  # None para espectadores
+        self.spectator = False
+        # Canal UDP opcional para os snapshots (endereço aprendido pelo 1º datagrama)
+        self.udp = None
+        self.udp_token = None
+        self.udp_addr = None
+        self.udp_seq = 0
+        self.input_seq = 0  # último seq de input aceito pelo TCP
+        self.outbound = OutboundQueue()
+        self.closed = False
+        self._wakeup = threading.Event()
+
+    def send(self, payload, state=False):
+        """Não bloqueia: enfileira para a thread de envio (state: frame de
+        estado, descartável). Retorna False se a conexão deve ser encerrada."""
+        if self.closed or not self.outbound.push(payload, state):
+            return False
+        self._wakeup.set()
+        return True
+
+    def send_state(self, payload):
+        """Frame de estado: pelo UDP se o cliente optou por ele, senão pela fila TCP."""
+        if self.udp_addr is not None:
+            if self.closed:
+                return False
+            self.udp.sendto(payload, self.udp_addr)
+            return True
+        return self.send(payload, state=True)
+
+    def run_sender(self):
+        """Thread que drena a fila de saída para o socket."""
+        try:
+            while not self.closed:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                while True:
+                    payload = self.outbound.pop()
+                    if payload is None:
+                        break
+                    self.conn.sendall(payload)
+        except OSError:
+            pass
+        finally:
+            self.closed = True
+
+    def close(self):
+        self.closed = True
+        self._wakeup.set()
+        if self.udp is not None:
+            self.udp.unregister(self)
+        try:
+            # Desbloqueia a thread de envio presa em sendall
+            self.conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.conn.close()
+
+    def label(self):
+        return "Espectador" if self.spectator else f"Jogador {self.player_num}"
 
 def handle_client(conn, addr):
-    global p1_input, p2_input
-    
-    # Determinar qual jogador é este cliente
-    player_num = None
-    with mutex:
-        if conn not in client_players:
-            if len(client_players) == 0:
-                player_num = 1
-            elif len(client_players) == 1:
-                player_num = 2
-            else:
-                print(f"Máximo de 2 jogadores. Rejeitando {addr}")
-                conn.close()
-                return
-            client_players[conn] = player_num
-        else:
-            player_num = client_players[conn]
-    
-    print(f"Conexão aceita de {addr} - Jogador {player_num}")
-    
+    session = Session(conn, addr)
+    room = None
+
     try:
         for line in get_lines(conn):
             if not line:
                 continue
+            # A primeira linha decide a sala e o papel (jogador ou espectador)
+            if room is None:
+                room = join_from_hello(session, line)
+                if room is None:
+                    break
+                threading.Thread(target=session.run_sender, daemon=True).start()
             try:
-                input_data = json.loads(line.strip())
-                direction = int(input_data.get('direction', 0))
-                player_input = PlayerInput(direction=direction)
-                with mutex:
-                    if player_num == 1:
-                        p1_input = player_input
-                    elif player_num == 2:
-                        p2_input = player_input
+                handle_line(room, session, line)
             except Exception as e:
                 print(f"Erro ao processar input de {addr}: {e}")
-                    
+
     except Exception as e:
         print(f"Erro ao lidar com {addr}: {e}")
     finally:
-        # Remover cliente da lista
-        if conn in clients:
-            clients.remove(conn)
-        if conn in client_players:
-            with mutex:
-                del client_players[conn]
-        conn.close()
+        # Remover cliente da sala
+        if room is not None:
+            leave_room(room, session)
+        session.close()
         print(f"Conexão com {addr} fechada")
 
-def dict_to_json_string(data: dict) -> str:
-    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
-
-def reset_ball(direction: int = 1):
-    """Reinicia a bola no centro.
-    direction: 1 = para a direita, -1 = para a esquerda
-    """
-    speed = float(BALL_SPEED)
-    vx = speed if direction >= 0 else -speed
-    return WIDTH//2, FIELD_CENTER_Y, vx, 0.0
-
-def check_paddle_collision(ball_x, ball_y, ball_vx, ball_vy, paddle_x, paddle_y):
-    """Verifica colisão da bola com paddle e retorna nova velocidade (com ângulo)."""
-    if (ball_x - BALL_SIZE//2 <= paddle_x + PADDLE_WIDTH//2 and 
-        ball_x + BALL_SIZE//2 >= paddle_x - PADDLE_WIDTH//2 and
-        ball_y - BALL_SIZE//2 <= paddle_y + PADDLE_HEIGHT//2 and
-        ball_y + BALL_SIZE//2 >= paddle_y - PADDLE_HEIGHT//2):
-        
-        # Onde bateu (-1..1)
-        relative_intersect_y = (ball_y - paddle_y) / (PADDLE_HEIGHT//2)
-        relative_intersect_y = max(-1.0, min(1.0, relative_intersect_y))
-        
-        bounce_angle = relative_intersect_y * (math.pi / 4)  # até 45º
+def join_from_hello(session, line):
+    """Entra numa sala a partir da primeira linha do cliente.
+    {"role": "spectator", "room": id} assiste a uma sala (sem id, a primeira
+    partida em andamento); qualquer outra mensagem entra como jogador.
+    Retorna a sala ou None se a conexão foi recusada."""
+    try:
+        hello = json.loads(line.strip())
+    except ValueError:
+        hello = {}
+
+    if hello.get('role') == 'spectator':
+        room = watch_room(session, hello.get('room'))
+        if room is None:
+            print(f"Nenhuma sala para assistir. Rejeitando {session.addr}")
+            return None
+    else:
+        room = join_room(session)
+        if room is None:
+            print(f"Servidor cheio ({MAX_ROOMS} salas). Rejeitando {session.addr}")
+            return None
+
+    print(f"Conexão aceita de {session.addr} - Sala {room.room_id}, {session.label()}")
+    return room
+
+def handle_line(room, session, line):
+    """Processa uma linha JSON do cliente: controle (codec) ou input do jogador."""
+    input_data = json.loads(line.strip())
+
+    # Mensagem de controle: escolha do codec de fio desta conexão
+    first_line = session.codec is None
+    if 'codec' in input_data:
+        session.codec = get_codec(input_data['codec'])
+    if session.codec is None:
+        session.codec = get_codec(DEFAULT_CODEC)
+
+    # Boas-vindas (já no codec escolhido): qual paddle é o do jogador, para
+    # o cliente prever o próprio movimento a partir dos acks dos snapshots
+    if first_line and not session.spectator:
+        session.send(session.codec.encode_control({"player": session.player_num}))
+
+    # Pedido do canal UDP: responde pelo TCP com o token da sessão
+    if input_data.get('udp') and session.udp is None:
+        if udp_channel is None:
+            session.send(session.codec.encode_control({"udp": False}))
+        else:
+            token = udp_channel.register(room, session)
+            session.send(session.codec.encode_control({"udp_token": token}))
+
+    if 'codec' in input_data or 'udp' in input_data:
+        return
+
+    # Confirmação de recebimento (pode vir junto do input)
+    if 'ack' in input_data:
+        session.acked_tick = int(input_data['ack'])
+        if 'direction' not in input_data:
+            return
+
+    if session.spectator:
+        return
+    direction = int(input_data.get('direction', 0))
+    seq = int(input_data.get('seq', 0))
+    if seq:
+        if seq <= session.input_seq:
+            return  # duplicado ou fora de ordem
+        session.input_seq = seq
+    tick = input_data.get('tick')
+    room.set_input(session.player_num, PlayerInput(
+        direction=direction, seq=seq, tick=None if tick is None else int(tick)
+    ))
+
+# ------------------ Salas ------------------
+
+class GameRoom:
+    """Uma partida 1x1 com estado, inputs e conexões próprios."""
+
+    def __init__(self, room_id):
+        self.room_id = room_id
+        self.state = initial_state()
+        # Filas de input por jogador: os leitores (threads dos sockets, UDP)
+        # publicam com deque.append, sem lock; o tick drena as filas e agenda
+        # cada input no tick pretendido em input_buffers (heaps só do tick)
+        self.input_queues = (deque(), deque())
+        self.input_buffers = ([], [])
+        self._input_order = 0
+        # Atraso de aplicação de cada jogador (ticks, ver _take_input)
+        self.input_delays = [float(INPUT_DELAY_TICKS), float(INPUT_DELAY_TICKS)]
+        self.p1_input = PlayerInput(direction=0)
+        self.p2_input = PlayerInput(direction=0)
+        self.tick_count = 0
+        self.last_keyframe_tick = 0
+        self.last_sent_tick = 0
+        self.last_spectator_tick = 0
+        self.history = {}  # tick -> GameState dos últimos STATE_HISTORY ticks
+        self.clients = []
+        self.client_players = {}  # mapeia sessão para número do jogador (1 ou 2)
+        self.spectators = []      # recebem o frame compartilhado via SpectatorFanout
+        self.replay = None        # ReplayRecorder da partida (só a thread de ticks usa)
+        self.mutex = threading.Lock()  # entrada/saída de conexões (não usado no tick)
+
+    def free_slot(self):
+        """Número do jogador livre (1 ou 2) ou None se a sala estiver cheia/encerrada."""
+        if self.state.game_over:
+            return None
+        taken = set(self.client_players.values())
+        for player_num in (1, 2):
+            if player_num not in taken:
+                return player_num
+        return None
+
+    def add_player(self, session):
+        with self.mutex:
+            player_num = self.free_slot()
+            if player_num is None:
+                return None
+            session.player_num = player_num
+            self.client_players[session] = player_num
+            self.clients.append(session)
+            self.input_delays[player_num - 1] = float(INPUT_DELAY_TICKS)
+            self.input_queues[player_num - 1].append(PlayerInput(direction=0))
+            return player_num
+
+    def add_spectator(self, session):
+        with self.mutex:
+            session.spectator = True
+            self.spectators.append(session)
+
+    def remove(self, session):
+        """Remove a sessão; retorna True se a sala ficou vazia."""
+        with self.mutex:
+            if session in self.clients:
+                self.clients.remove(session)
+            if session in self.spectators:
+                self.spectators.remove(session)
+            self.client_players.pop(session, None)
+            return not self.clients and not self.spectators
+
+    def set_input(self, player_num, player_input):
+        """Publica um input do jogador (não bloqueia o tick)."""
+        if player_num in (1, 2):
+            self.input_queues[player_num - 1].append(player_input)
+
+    def _take_input(self, index, current):
+        """Input do jogador para o tick atual. Cada input recebido é agendado
+        para tick + atraso do jogador (limitado entre o tick atual e
+        INPUT_WINDOW_TICKS à frente); vale o último que já venceu.
+        O atraso acompanha a idade dos inputs na chegada (o RTT em ticks, já
+        que o tick do input é o último que o cliente viu): sobe na hora com
+        um input atrasado e desce devagar, para o jitter não mudar o tick de
+        aplicação de um input para o outro."""
+        queue, buffer = self.input_queues[index], self.input_buffers[index]
+        tick = self.tick_count
+        while queue:
+            player_input = queue.popleft()
+            if player_input.tick is None:
+                target = tick
+            else:
+                delay = self.input_delays[index]
+                target = player_input.tick + max(INPUT_DELAY_TICKS, round(delay))
+                if target < tick:
+                    target = tick
+                    profiler.count("late_inputs")
+                age = max(0, min(tick - player_input.tick, INPUT_MAX_DELAY_TICKS))
+                if age > delay:
+                    self.input_delays[index] = float(age)
+                else:
+                    self.input_delays[index] = delay + (age - delay) * 0.01
+                target = min(target, tick + INPUT_WINDOW_TICKS)
+            self._input_order += 1
+            heapq.heappush(buffer, (target, self._input_order, player_input))
+        while buffer and buffer[0][0] <= tick:
+            current = heapq.heappop(buffer)[2]
+        return current
+
+    def tick(self, timings=None):
+        """Avança um passo fixo (TICK) da simulação.
+        Roda sem o mutex: os inputs vêm das filas e as listas de conexões só
+        são lidas (entradas/saídas trocam elementos sob o mutex).
+        timings (opcional) acumula o tempo de física."""
+        started = time.perf_counter()
+        self.tick_count += 1
+        self.p1_input = self._take_input(0, self.p1_input)
+        self.p2_input = self._take_input(1, self.p2_input)
+
+        # Controle de início/parada
+        game_should_start = (len(self.client_players) >= 2) and (not self.state.game_over)
+        changed = False  # estado alterado fora do step (keyframe no replay)
         
-        speed = float(BALL_SPEED)
-        new_vx = speed * math.cos(bounce_angle) * (-1 if ball_vx > 0 else 1)
-        new_vy = speed * math.sin(bounce_angle)
+        # Se deve começar e ainda não começou
+        if not self.state.game_started and game_should_start:
+            self.state = start_match(self.state)
+            changed = True
+            if self.replay is None and replay_writer is not None:
+                self.replay = replay_writer.start_recording(self.room_id)
+            print(f"[Sala {self.room_id}] Jogo iniciado! 2 jogadores conectados.")
         
-        # Reposiciona a bola para não "colar"
-        if new_vx > 0:
-            ball_x = paddle_x + PADDLE_WIDTH//2 + BALL_SIZE//2
+        # Se estava rolando e parou (falta jogador) — apenas se não acabou
+        elif self.state.game_started and (not game_should_start) and (not self.state.game_over):
+            self.state = self.state._replace(
+                ballvx=0.0, ballvy=0.0, game_started=False
+            )
+            changed = True
+            print(f"[Sala {self.room_id}] Jogo pausado. Aguardando 2 jogadores.")
+
+        prev = self.state
+        self.state = step(prev, self.p1_input, self.p2_input)
+        if self.replay is not None:
+            self.replay.record(self.tick_count, prev, self.p1_input.direction,
+                               self.p2_input.direction, changed)
+
+        if self.state.score1 > prev.score1:
+            print(f"[Sala {self.room_id}] Gol do Jogador 1! Placar: {self.state.score1} x {self.state.score2}")
+        if self.state.score2 > prev.score2:
+            print(f"[Sala {self.room_id}] Gol do Jogador 2! Placar: {self.state.score1} x {self.state.score2}")
+        if self.state.game_over and not prev.game_over:
+            print(f"[Sala {self.room_id}] Fim de jogo!")
+            self.close_replay()
+
+        self.history[self.tick_count] = self.state
+        self.history.pop(self.tick_count - STATE_HISTORY, None)
+
+        if timings is not None:
+            timings["physics"] += time.perf_counter() - started
+
+    def close_replay(self):
+        """Encerra a gravação da partida (chamado na thread de ticks)."""
+        if self.replay is not None:
+            self.replay.close()
+            print(f"[Sala {self.room_id}] Replay gravado em {self.replay.path}")
+            self.replay = None
+
+    def broadcast(self, timings=None):
+        """Envia o estado atual aos jogadores; timings (opcional) acumula o
+        tempo de codificação e de envio. Retorna as sessões a encerrar."""
+        tick = self.tick_count
+        ticks_since_send = tick - self.last_sent_tick
+        self.last_sent_tick = tick
+        keyframe = tick - self.last_keyframe_tick >= KEYFRAME_INTERVAL
+        if keyframe:
+            self.last_keyframe_tick = tick
+
+        # Cada frame (codec + base do delta) é codificado uma única vez por tick
+        frames = {}
+        disconnected_clients = []
+        # Último input aplicado de cada jogador (reconciliação no cliente)
+        acks = (self.p1_input.seq, self.p2_input.seq)
+
+        for session in list(self.clients):
+            codec = session.codec
+            if codec is None:
+                continue
+            # Delta contra o último tick confirmado; keyframe se não houver base
+            base_tick = None if keyframe else session.acked_tick
+            base = self.history.get(base_tick) if base_tick is not None else None
+            if base is None:
+                base_tick = None
+            key = (codec.name, base_tick)
+            payload = frames.get(key)
+            if payload is None:
+                started = time.perf_counter()
+                if base is None:
+                    payload = codec.encode_state(self.state, tick, ticks_since_send, acks)
+                else:
+                    payload = codec.encode_delta(self.state, tick, base, base_tick, ticks_since_send, acks)
+                frames[key] = payload
+                if timings is not None:
+                    timings["encode"] += time.perf_counter() - started
+            started = time.perf_counter()
+            if not session.send_state(payload):
+                disconnected_clients.append(session)
+            if timings is not None:
+                timings["send"] += time.perf_counter() - started
+
+        return disconnected_clients
+
+def join_room(session):
+    """Coloca a sessão como jogador na primeira sala com vaga (ou cria uma nova)."""
+    global _next_room_id
+    with rooms_lock:
+        for room in rooms.values():
+            if room.add_player(session) is not None:
+                return room
+        if len(rooms) >= MAX_ROOMS:
+            return None
+        room = GameRoom(_next_room_id)
+        _next_room_id += 1
+        rooms[room.room_id] = room
+        room.add_player(session)
+        return room
+
+def watch_room(session, room_id=None):
+    """Coloca a sessão como espectadora da sala pedida ou, sem id,
+    da primeira partida em andamento."""
+    with rooms_lock:
+        if room_id is not None:
+            room = rooms.get(int(room_id))
         else:
-            ball_x = paddle_x - PADDLE_WIDTH//2 - BALL_SIZE//2
-        
-        return True, ball_x, new_vx, new_vy
-    
-    return False, ball_x, ball_vx, ball_vy
+            running = [r for r in rooms.values() if r.state.game_started]
+            room = min(running or rooms.values(), key=lambda r: r.room_id, default=None)
+        if room is None:
+            return None
+        room.add_spectator(session)
+        return room
+
+def leave_room(room, session):
+    with rooms_lock:
+        if room.remove(session) and rooms.get(room.room_id) is room:
+            del rooms[room.room_id]
+            # A gravação é da thread de ticks: ela fecha o replay na próxima iteração
+            closed_rooms.append(room)
+            print(f"[Sala {room.room_id}] Sala encerrada")
+
+# ------------------ Espectadores ------------------
+
+class SpectatorFanout:
+    """Entrega o estado das salas aos espectadores fora da thread de simulação.
+    O loop do jogo só publica (sala, tick, estado); aqui cada frame é
+    codificado uma vez por codec e os mesmos bytes vão para todos."""
+
+    def __init__(self):
+        self.pending = {}  # sala -> (tick, estado); só o mais recente importa
+        self.lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def publish(self, room, tick, ticks_since_send, state):
+        with self.lock:
+            self.pending[room] = (tick, ticks_since_send, state)
+        self._notify()
+
+    def _notify(self):
+        self._wakeup.set()
+
+    def deliver(self):
+        started = time.perf_counter()
+        with self.lock:
+            pending, self.pending = self.pending, {}
+
+        for room, (tick, ticks_since_send, state) in pending.items():
+            frames = {}
+            for session in list(room.spectators):
+                codec = session.codec
+                if codec is None:
+                    continue
+                payload = frames.get(codec.name)
+                if payload is None:
+                    payload = frames[codec.name] = codec.encode_state(state, tick, ticks_since_send)
+                if not session.send_state(payload):
+                    leave_room(room, session)
+                    session.close()
+                    profiler.count("disconnects")
+        profiler.add("spectators", time.perf_counter() - started)
+
+    def run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self.deliver()
+
+# ------------------ UDP ------------------
+
+class UdpChannel:
+    """Canal UDP opcional: snapshots para o cliente e inputs com número de
+    sequência (inputs velhos ou duplicados são descartados). Entrada na sala
+    e mensagens de controle continuam pelo TCP."""
+
+    def __init__(self, sendto):
+        self._sendto = sendto
+        self.sessions = {}  # token -> (sala, sessão)
+        self.lock = threading.Lock()
+
+    def register(self, room, session):
+        with self.lock:
+            token = secrets.randbits(32)
+            while token in self.sessions:
+                token = secrets.randbits(32)
+            self.sessions[token] = (room, session)
+        session.udp = self
+        session.udp_token = token
+        return token
+
+    def unregister(self, session):
+        with self.lock:
+            self.sessions.pop(session.udp_token, None)
+
+    def sendto(self, payload, addr):
+        try:
+            self._sendto(payload, addr)
+        except OSError:
+            pass  # UDP: perder um snapshot é aceitável
+
+    def handle_datagram(self, data, addr):
+        decoded = decode_udp_input(data)
+        if decoded is None:
+            return
+        token, seq, ack, direction = decoded
+        entry = self.sessions.get(token)
+        if entry is None:
+            return
+        room, session = entry
+        if seq <= session.udp_seq:
+            return  # input atrasado, duplicado ou repetido
+        session.udp_seq = seq
+        # O endereço vem do datagrama (a porta UDP do cliente pode mudar via
+        # NAT); só um seq novo pode redirecionar os snapshots
+        session.udp_addr = addr
+        if ack:
+            session.acked_tick = ack
+        if not session.spectator:
+            # O ack do datagrama é o tick que o cliente via ao gerar o input
+            room.set_input(session.player_num, PlayerInput(
+                direction=direction, seq=seq, tick=ack or None
+            ))
+
+    def run(self, sock):
+        while True:
+            data, addr = sock.recvfrom(BUFFER_SIZE)
+            self.handle_datagram(data, addr)
+
+def enable_udp(sendto):
+    """Ativa o canal UDP global usado pelas sessões."""
+    global udp_channel
+    udp_channel = UdpChannel(sendto)
+    return udp_channel
+
+# ------------------ Replays ------------------
+
+def enable_replays(directory):
+    """Grava um replay de cada partida em directory (thread de escrita própria)."""
+    global replay_writer
+    os.makedirs(directory, exist_ok=True)
+    replay_writer = ReplayWriter(directory)
+    threading.Thread(target=replay_writer.run, daemon=True).start()
+    # Na saída grava o que já foi entregue à thread de escrita
+    atexit.register(replay_writer.close)
+    print(f"Gravando replays em {directory}")
+    return replay_writer
 
 # ------------------ Loop do jogo ------------------
 
-def game_loop():
-    global game_state, p1_input, p2_input
-    
-    PADDLE_SPEED = 5
-    last_tick_time = time.perf_counter()
-
+def tick_rooms(fanout, steps=1):
+    """Avança steps passos em todas as salas ativas e, no ritmo de envio
+    (SEND_EVERY_TICKS), faz o broadcast de cada uma (jogadores direto,
+    espectadores via fanout).
+    Sessões que falharam no envio (ou estouraram a fila de saída) são
+    encerradas; retorna a lista de (sala, sessão) removidas.
+    As fases da iteração vão para o profiler."""
+    started = time.perf_counter()
+    timings = profiler.timings()
+    with rooms_lock:
+        timings["lock_wait"] = time.perf_counter() - started
+        active_rooms = list(rooms.values())
+
+    # Salas encerradas desde a iteração anterior já não estão em rooms
+    while closed_rooms:
+        closed_rooms.popleft().close_replay()
+
+    disconnected = []
+    for room in active_rooms:
+        for _ in range(steps):
+            room.tick(timings)
+
+        if room.spectators and room.tick_count - room.last_spectator_tick >= SPECTATOR_SEND_EVERY:
+            ticks_since_send = room.tick_count - room.last_spectator_tick
+            room.last_spectator_tick = room.tick_count
+            fanout.publish(room, room.tick_count, ticks_since_send, room.state)
+
+        # A simulação pode rodar mais rápido que o envio
+        if room.tick_count - room.last_sent_tick < SEND_EVERY_TICKS:
+            continue
+
+        # Broadcast game_state e remoção dos clientes desconectados
+        for session in room.broadcast(timings):
+            leave_room(room, session)
+            session.close()
+            disconnected.append((room, session))
+
+    timings["tick"] = time.perf_counter() - started
+    profiler.record(timings)
+    if disconnected:
+        profiler.count("disconnects", len(disconnected))
+    return disconnected
+
+def profile_snapshot(scheduler):
+    """Fases do profiler + contadores do scheduler e das salas."""
+    with rooms_lock:
+        active_rooms = len(rooms)
+    return profiler.snapshot(dict(scheduler.stats(), rooms=active_rooms))
+
+def start_profiling(scheduler, admin_port=None, dump_path=None):
+    """Socket de admin local (--admin-port) e dump em JSON na saída (--profile-dump)."""
+    if admin_port is not None:
+        serve_admin(admin_port, lambda: profile_snapshot(scheduler), profiler.reset)
+        print(f"Admin (profiler) em 127.0.0.1:{admin_port}")
+    if dump_path is not None:
+        def dump():
+            with open(dump_path, "w") as f:
+                json.dump(profile_snapshot(scheduler), f, indent=2)
+        atexit.register(dump)
+        # SIGTERM também encerra pelo caminho normal (o atexit roda)
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+def game_loop(fanout, scheduler):
     while True:
         start = time.perf_counter()
-        now = start
-        dt = now - last_tick_time
-        last_tick_time = now
-
-        with mutex:
-            # Controle de início/parada
-            game_should_start = (len(client_players) >= 2) and (not game_state.game_over)
-            
-            # Se deve começar e ainda não começou
-            if not game_state.game_started and game_should_start:
-                ball_x, ball_y, ball_vx, ball_vy = reset_ball()
-                game_state = game_state._replace(
-                    ballx=ball_x, bally=ball_y, ballvx=ball_vx, ballvy=ball_vy, 
-                    game_started=True
-                )
-                print("Jogo iniciado! 2 jogadores conectados.")
-            
-            # Se estava rolando e parou (falta jogador) — apenas se não acabou
-            elif game_state.game_started and (not game_should_start) and (not game_state.game_over):
-                game_state = game_state._replace(
-                    ballvx=0.0, ballvy=0.0, game_started=False
-                )
-                print("Jogo pausado. Aguardando 2 jogadores.")
-
-            # Atualizar posições dos jogadores
-            new_p1y = game_state.p1y + (p1_input.direction * PADDLE_SPEED)
-            new_p1y = max(HUD_HEIGHT + PADDLE_HEIGHT//2, min(HEIGHT - PADDLE_HEIGHT//2, new_p1y))
-            
-            new_p2y = game_state.p2y + (p2_input.direction * PADDLE_SPEED)
-            new_p2y = max(HUD_HEIGHT + PADDLE_HEIGHT//2, min(HEIGHT - PADDLE_HEIGHT//2, new_p2y))
-            
-            # Atualizar física da bola
-            ball_x, ball_y = game_state.ballx, game_state.bally
-            ball_vx, ball_vy = game_state.ballvx, game_state.ballvy
-            score1, score2 = game_state.score1, game_state.score2
-            time_left = game_state.time_left
-            game_over = game_state.game_over
-            winner = game_state.winner
-            
-            if game_state.game_started and not game_over:
-                # cronômetro (contagem regressiva só enquanto rola)
-                time_left = max(0.0, time_left - dt)
-                if time_left <= 0.0 and not game_over:
-                    game_over = True
-                    # decide vencedor
-                    if score1 > score2:
-                        winner = 1
-                    elif score2 > score1:
-                        winner = 2
-                    else:
-                        winner = 0
-                    ball_vx = 0.0
-                    ball_vy = 0.0
-                    print("Fim de jogo!")
-
-                # Salva posição anterior para detectar cruzamento da linha de gol
-                prev_x, prev_y = ball_x, ball_y
-
-                # Mover bola
-                if not game_over:
-                    ball_x += ball_vx
-                    ball_y += ball_vy
-                    
-                    # Colisão com teto (topo do campo é HUD_HEIGHT) e chão
-                    if ball_y <= HUD_HEIGHT + BALL_SIZE//2:
-                        ball_vy = abs(ball_vy)
-                        ball_y = HUD_HEIGHT + BALL_SIZE//2
-                    elif ball_y >= HEIGHT - BALL_SIZE//2:
-                        ball_vy = -abs(ball_vy)
-                        ball_y = HEIGHT - BALL_SIZE//2
-                    
-                    # ---------- Gols em C (espessura real + parede atrás) ----------
-                    HALF_TH = GOAL_THICKNESS / 2.0
-                    HALF_B = BALL_SIZE / 2.0
-                    
-                    TOP_BAR_Y = GOAL_Y
-                    BOT_BAR_Y = GOAL_Y + GOAL_HEIGHT
-
-                    # 1) Verificação de GOL por CRUZAMENTO da linha de gol (só de FRENTE p/ TRÁS)
-                    #    Esquerda: cruza quando a face esquerda passa de x>GOAL_INSET para x<=GOAL_INSET
-                    prev_left = prev_x - HALF_B
-                    new_left  = ball_x - HALF_B
-                    prev_right = prev_x + HALF_B
-                    new_right  = ball_x + HALF_B
-
-
-                    # Linha invisível do gol, deslocada 10px para dentro
-                    # Puxada 'pra fora' do C (lado de campo). Use poucos px (ex.: 6.0)
-                    GOAL_LINE_OFFSET_OUT = 13.0
-                    # Para o gol da ESQUERDA (C abre para a direita): linha fica um pouco À DIREITA do poste
-                    LINE_LEFT_X  = GOAL_INSET + GOAL_LINE_OFFSET_OUT
-                    # Para o gol da DIREITA (C abre para a esquerda): linha fica um pouco À ESQUERDA do poste
-                    LINE_RIGHT_X = (WIDTH - GOAL_INSET) - GOAL_LINE_OFFSET_OUT
-
-
-                    left_cross  = (prev_left  > LINE_LEFT_X)  and (new_left  <= LINE_LEFT_X)
-                    right_cross = (prev_right < LINE_RIGHT_X) and (new_right >= LINE_RIGHT_X)
-
-                    if left_cross:
-                        denom = (new_left - prev_left)
-                        t = (LINE_LEFT_X - prev_left) / denom if denom != 0 else 0.0
-                        t = max(0.0, min(1.0, t))
-                        y_at_cross = prev_y + t * (ball_y - prev_y)
-                        if GOAL_Y <= y_at_cross <= GOAL_Y + GOAL_HEIGHT:
-                            # Gol do Jogador 2 (direita)
-                            score2 += 1
-                            ball_x, ball_y, ball_vx, ball_vy = reset_ball(-1)  # reinicia para a esquerda (quem tomou foi o Jogador 1)
-                            print(f"Gol do Jogador 2! Placar: {score1} x {score2}")
-                    elif right_cross:
-                        denom = (new_right - prev_right)
-                        t = (LINE_RIGHT_X - prev_right) / denom if denom != 0 else 0.0
-                        t = max(0.0, min(1.0, t))
-                        y_at_cross = prev_y + t * (ball_y - prev_y)
-                        if GOAL_Y <= y_at_cross <= GOAL_Y + GOAL_HEIGHT:
-                            # Gol do Jogador 1 (esquerda)
-                            score1 += 1
-                            ball_x, ball_y, ball_vx, ball_vy = reset_ball(1)  # reinicia para a direita (quem tomou foi o Jogador 2)
-                            print(f"Gol do Jogador 1! Placar: {score1} x {score2}")
-                    else:
-                        # 2) Rebate nas BARRAS superior/inferior do "C" (por dentro e por fora)
-                        #    NOVO: Rebate na HASTE VERTICAL dos gols (por dentro e por fora)
-                        #    Evita que a bola atravesse a parte de trás (externa) do gol.
-                        LEFT_POST_X  = GOAL_INSET
-                        RIGHT_POST_X = (WIDTH - GOAL_INSET)
-#    Checagem do POSTE ESQUERDO (apenas face EXTERNA)
-                        if (GOAL_Y - HALF_TH) <= ball_y <= (GOAL_Y + GOAL_HEIGHT + HALF_TH):
-                            if abs(ball_x - LEFT_POST_X) <= (HALF_TH + HALF_B):
-                                if ball_x <= LEFT_POST_X:
-                                    # Fora do gol (lado esquerdo): rebate para a esquerda
-                                    ball_vx = -abs(ball_vx)
-                                    ball_x = LEFT_POST_X - HALF_TH - HALF_B
-
-                        
-                        #    Checagem do POSTE DIREITO (apenas face EXTERNA)
-                        if (GOAL_Y - HALF_TH) <= ball_y <= (GOAL_Y + GOAL_HEIGHT + HALF_TH):
-                            if abs(ball_x - RIGHT_POST_X) <= (HALF_TH + HALF_B):
-                                if ball_x >= RIGHT_POST_X:
-                                    # Fora do gol (lado direito): rebate para a direita
-                                    ball_vx = abs(ball_vx)
-                                    ball_x = RIGHT_POST_X + HALF_TH + HALF_B
-
-
-
-                        #    Região X coberta pela barra esquerda
-                        if (GOAL_INSET - HALF_TH) <= ball_x <= (GOAL_INSET + GOAL_BAR_LENGTH + HALF_TH):
-                            # Topo esquerdo
-                            if abs(ball_y - TOP_BAR_Y) <= (HALF_TH + HALF_B):
-                                if ball_y <= TOP_BAR_Y:
-                                    ball_vy = -abs(ball_vy)
-                                    ball_y = TOP_BAR_Y - HALF_TH - HALF_B
-                                else:
-                                    ball_vy = abs(ball_vy)
-                                    ball_y = TOP_BAR_Y + HALF_TH + HALF_B
-                            # Fundo esquerdo
-                            if abs(ball_y - BOT_BAR_Y) <= (HALF_TH + HALF_B):
-                                if ball_y <= BOT_BAR_Y:
-                                    ball_vy = -abs(ball_vy)
-                                    ball_y = BOT_BAR_Y - HALF_TH - HALF_B
-                                else:
-                                    ball_vy = abs(ball_vy)
-                                    ball_y = BOT_BAR_Y + HALF_TH + HALF_B
-                        
-                        #    Região X coberta pela barra direita
-                        if (WIDTH - GOAL_INSET - GOAL_BAR_LENGTH - HALF_TH) <= ball_x <= (WIDTH - GOAL_INSET + HALF_TH):
-                            if abs(ball_y - TOP_BAR_Y) <= (HALF_TH + HALF_B):
-                                if ball_y <= TOP_BAR_Y:
-                                    ball_vy = -abs(ball_vy)
-                                    ball_y = TOP_BAR_Y - HALF_TH - HALF_B
-                                else:
-                                    ball_vy = abs(ball_vy)
-                                    ball_y = TOP_BAR_Y + HALF_TH + HALF_B
-                            if abs(ball_y - BOT_BAR_Y) <= (HALF_TH + HALF_B):
-                                if ball_y <= BOT_BAR_Y:
-                                    ball_vy = -abs(ball_vy)
-                                    ball_y = BOT_BAR_Y - HALF_TH - HALF_B
-                                else:
-                                    ball_vy = abs(ball_vy)
-                                    ball_y = BOT_BAR_Y + HALF_TH + HALF_B
-
-                        
-
-                    # 2.1) Cantos das barras (evita teleporte ao bater na ponta)
-
-                    # Trata cada ponta como círculo de raio HALF_TH; a bola tem raio HALF_B.
-
-                    def _corner_bounce(cx, cy, ball_x, ball_y, ball_vx, ball_vy):
-
-                        dx = ball_x - cx
-
-                        dy = ball_y - cy
-
-                        dist2 = dx*dx + dy*dy
-
-                        min_d = (HALF_TH + HALF_B)
-
-                        min_d2 = min_d * min_d
-
-                        if dist2 < min_d2:
-
-                            dist = math.sqrt(dist2) if dist2 > 0 else 1.0
+        steps = scheduler.due_steps(start)
+        if steps:
+            tick_rooms(fanout, steps)
+            scheduler.finish(start)
+
+        # Dorme até o prazo absoluto do próximo passo
+        time.sleep(scheduler.sleep_time())
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog=f"python {argv[0]}", description="Servidor do Hockey")
+    parser.add_argument("port", type=int, help="porta TCP")
+    parser.add_argument("--asyncio", action="store_true",
+                        help="usa o servidor asyncio (uma thread para todas as conexões)")
+    parser.add_argument("--udp", action="store_true",
+                        help="aceita snapshots/inputs por UDP na mesma porta")
+    parser.add_argument("--admin-port", type=int, default=None,
+                        help="porta local (127.0.0.1) para consultar o profiler do loop de ticks")
+    parser.add_argument("--profile-dump", metavar="ARQUIVO", default=None,
+                        help="grava o profiler em JSON ao encerrar")
+    parser.add_argument("--replay-dir", metavar="DIR", default=None,
+                        help="grava um replay de cada partida neste diretório (ver replay.py)")
+    return parser.parse_args(argv[1:])
 
-                            nx = dx / dist
-
-                            ny = dy / dist
-
-                            # Reposiciona a bola para fora da sobreposição
-
-                            ball_x = cx + nx * min_d
-
-                            ball_y = cy + ny * min_d
-
-                            # Reflete velocidade se estiver indo em direção ao canto
-
-                            vdotn = ball_vx * nx + ball_vy * ny
-
-                            if vdotn < 0:
-
-                                ball_vx = ball_vx - 2.0 * vdotn * nx
-
-                                ball_vy = ball_vy - 2.0 * vdotn * ny
-
-                            return True, ball_x, ball_y, ball_vx, ball_vy
-
-                        return False, ball_x, ball_y, ball_vx, ball_vy
-
-
-                    # Cantos do gol esquerdo (abre para a direita)
-
-                    left_top_cx  = GOAL_INSET + GOAL_BAR_LENGTH
-
-                    left_top_cy  = TOP_BAR_Y
-
-                    left_bot_cx  = GOAL_INSET + GOAL_BAR_LENGTH
-
-                    left_bot_cy  = BOT_BAR_Y
-
-
-                    # Cantos do gol direito (abre para a esquerda)
-
-                    right_top_cx = (WIDTH - GOAL_INSET) - GOAL_BAR_LENGTH
-
-                    right_top_cy = TOP_BAR_Y
-
-                    right_bot_cx = (WIDTH - GOAL_INSET) - GOAL_BAR_LENGTH
-
-                    right_bot_cy = BOT_BAR_Y
-
-
-                    changed, ball_x, ball_y, ball_vx, ball_vy = _corner_bounce(left_top_cx,  left_top_cy,  ball_x, ball_y, ball_vx, ball_vy)
-
-                    if not changed:
-
-                        changed, ball_x, ball_y, ball_vx, ball_vy = _corner_bounce(left_bot_cx,  left_bot_cy,  ball_x, ball_y, ball_vx, ball_vy)
-
-                    if not changed:
-
-                        changed, ball_x, ball_y, ball_vx, ball_vy = _corner_bounce(right_top_cx, right_top_cy, ball_x, ball_y, ball_vx, ball_vy)
-
-                    if not changed:
-
-                        changed, ball_x, ball_y, ball_vx, ball_vy = _corner_bounce(right_bot_cx, right_bot_cy, ball_x, ball_y, ball_vx, ball_vy)
+def main():
+    global porta
+    args = parse_args(sys.argv)
+    porta = args.port
 
-                        # 1b) Failsafe: se após colisões a bola já estiver ALÉM da linha de gol, conte o gol
-                        # Somente se cruzou DA FRENTE PARA DENTRO neste tick (usa prev_x e a direção atual).
-                        mouth_top = TOP_BAR_Y + HALF_TH
-                        mouth_bot = BOT_BAR_Y - HALF_TH
-                        if mouth_top <= ball_y <= mouth_bot:
-                            prev_left_face  = prev_x - HALF_B
-                            prev_right_face = prev_x + HALF_B
-                            # Esquerda: bola inteira passou da linha e estava à frente antes (indo para a esquerda)
-                            if (ball_vx < 0) and (prev_right_face > LINE_LEFT_X) and ((ball_x + HALF_B) <= LINE_LEFT_X):
-                                score2 += 1
-                                ball_x, ball_y, ball_vx, ball_vy = reset_ball(-1)  # recomeça para a esquerda
-                                print(f"Gol (failsafe) do Jogador 2! Placar: {score1} x {score2}")
-                            # Direita: bola inteira passou da linha e estava à frente antes (indo para a direita)
-                            elif (ball_vx > 0) and (prev_left_face < LINE_RIGHT_X) and ((ball_x - HALF_B) >= LINE_RIGHT_X):
-                                score1 += 1
-                                ball_x, ball_y, ball_vx, ball_vy = reset_ball(1)   # recomeça para a direita
-                                print(f"Gol (failsafe) do Jogador 1! Placar: {score1} x {score2}")
+    if args.asyncio:
+        import server_async
+        server_async.run(host, porta, args.udp, args.admin_port, args.profile_dump, args.replay_dir)
+        return
 
-# 3) PAREDE ATRÁS DOS GOLS (nas bordas da tela) — SEM exceção
-                        #    (sempre rebate no fundo, mesmo se a bola estiver alinhada com a boca)
-                        if (ball_x - HALF_B) <= 0:
-                            ball_vx = abs(ball_vx)
-                            ball_x = HALF_B
-                        if (ball_x + HALF_B) >= WIDTH:
-                            ball_vx = -abs(ball_vx)
-                            ball_x = WIDTH - HALF_B
+    if args.replay_dir is not None:
+        enable_replays(args.replay_dir)
 
-                    # 4) Colisão com PADDLES (sempre verificar ambos)
-                    _c, ball_x, ball_vx, ball_vy = check_paddle_collision(
-                        ball_x, ball_y, ball_vx, ball_vy, PADDLE_DISTANCE_FROM_GOAL, new_p1y
-                    )
-                    _c, ball_x, ball_vx, ball_vy = check_paddle_collision(
-                        ball_x, ball_y, ball_vx, ball_vy, WIDTH - PADDLE_DISTANCE_FROM_GOAL, new_p2y
-                    )
-                    
-                    # Segurança: se sair da tela por algum bug, reseta
-                    if ball_x < -BALL_SIZE or ball_x > WIDTH + BALL_SIZE:
-                        ball_x, ball_y, ball_vx, ball_vy = reset_ball()
+    scheduler = FixedStepScheduler()
+    start_profiling(scheduler, args.admin_port, args.profile_dump)
 
-            # Commit do estado
-            game_state = GameState(
-                p1y=new_p1y,
-                p2y=new_p2y,
-                ballx=ball_x,
-                bally=ball_y,
-                ballvx=ball_vx,
-                ballvy=ball_vy,
-                score1=score1,
-                score2=score2,
-                game_started=game_state.game_started if game_over else game_state.game_started,
-                time_left=time_left,
-                game_over=game_over,
-                winner=winner
-            )
+    if args.udp:
+        udp_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        udp_sock.bind((host, porta))
+        channel = enable_udp(udp_sock.sendto)
+        threading.Thread(target=channel.run, args=(udp_sock,), daemon=True).start()
+        print(f"Observando UDP na porta :{porta}")
 
-        # Broadcast game_state
-        msg = dict_to_json_string(game_state._asdict())
-        disconnected_clients = []
-        
-        for conn in clients:
-            try:
-                conn.sendall((msg + "\\n").encode("utf-8"))
-            except Exception:
-                disconnected_clients.append(conn)
-        
-        # Remover clientes desconectados
-        for conn in disconnected_clients:
-            if conn in clients:
-                clients.remove(conn)
-            if conn in client_players:
-                with mutex:
-                    del client_players[conn]
-
-        elapsed = time.perf_counter() - start
-        sleep_time = max(0.0, TICK - elapsed)
-        time.sleep(sleep_time)
-
-def main():
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
         s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         s.bind((host, porta))
         s.listen()
         print(f"Observando TCP na porta :{porta}")
-        print("Aguardando 2 jogadores para iniciar o jogo...")
+        print(f"Aguardando jogadores (até {MAX_ROOMS} salas)...")
 
-        threading.Thread(target=game_loop, daemon=True).start()
+        fanout = SpectatorFanout()
+        threading.Thread(target=fanout.run, daemon=True).start()
+        threading.Thread(target=game_loop, args=(fanout, scheduler), daemon=True).start()
 
         while True:
             conn, addr = s.accept()
-            clients.append(conn)
+            # Sem Nagle: os frames de cada tick são pequenos e não podem
+            # esperar o ACK do anterior (o asyncio já desliga por padrão)
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             threading.Thread(target=handle_client, args=(conn, addr), daemon=True).start()
 
 if __name__ == "__main__":
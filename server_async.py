@@ -0,0 +1,156 @@
+import asyncio
+import time
+from config import MAX_ROOMS
+from server import (
+    DELIMITER, MAX_LINE_SIZE, Session, SpectatorFanout, leave_room, tick_rooms,
+    join_from_hello, handle_line, enable_udp, enable_replays, start_profiling
+)
+from scheduler import FixedStepScheduler
+
+class AsyncSession(Session):
+    """Sessão sobre um StreamWriter; a fila de saída é drenada por uma
+    corrotina própria, que espera o drain do transporte entre os frames."""
+
+    def __init__(self, writer, addr):
+        super().__init__(writer, addr)
+        self.writer = writer
+        self.transport = writer.transport
+        self._wakeup = asyncio.Event()
+
+    def send(self, payload, state=False):
+        if self.closed or self.transport.is_closing() or not self.outbound.push(payload, state):
+            return False
+        self._wakeup.set()
+        return True
+
+    async def run_sender(self):
+        try:
+            while not self.closed:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while True:
+                    payload = self.outbound.pop()
+                    if payload is None:
+                        break
+                    self.writer.write(payload)
+                    # Com o buffer do transporte cheio, os frames novos ficam na
+                    # fila (e a política decide o que fazer) em vez de acumular
+                    await self.writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.closed = True
+
+    def close(self):
+        self.closed = True
+        self._wakeup.set()
+        if self.udp is not None:
+            self.udp.unregister(self)
+        self.transport.close()
+
+class AsyncSpectatorFanout(SpectatorFanout):
+    """Fanout agendado no próprio event loop, logo após o tick."""
+
+    def __init__(self):
+        super().__init__()
+        self._scheduled = False
+
+    def _notify(self):
+        if not self._scheduled:
+            self._scheduled = True
+            asyncio.get_running_loop().call_soon(self._deliver_scheduled)
+
+    def _deliver_scheduled(self):
+        self._scheduled = False
+        self.deliver()
+
+async def handle_client(reader, writer):
+    addr = writer.get_extra_info("peername")
+    session = AsyncSession(writer, addr)
+    room = None
+    sender_task = None
+
+    try:
+        while True:
+            try:
+                data = await reader.readuntil(DELIMITER)
+            except asyncio.IncompleteReadError:
+                break
+            except asyncio.LimitOverrunError:
+                print(f"Linha muito longa de {addr}. Encerrando.")
+                break
+            line = data[:-len(DELIMITER)]
+            if not line:
+                continue
+            # A primeira linha decide a sala e o papel (jogador ou espectador)
+            if room is None:
+                room = join_from_hello(session, line)
+                if room is None:
+                    break
+                sender_task = asyncio.create_task(session.run_sender())
+            try:
+                handle_line(room, session, line)
+            except Exception as e:
+                print(f"Erro ao processar input de {addr}: {e}")
+
+    except Exception as e:
+        print(f"Erro ao lidar com {addr}: {e}")
+    finally:
+        # Remover cliente da sala
+        if room is not None:
+            leave_room(room, session)
+        session.close()
+        if sender_task is not None:
+            sender_task.cancel()
+        print(f"Conexão com {addr} fechada")
+
+async def game_loop(fanout, scheduler):
+    while True:
+        start = time.perf_counter()
+        steps = scheduler.due_steps(start)
+        if steps:
+            tick_rooms(fanout, steps)
+            scheduler.finish(start)
+
+        # Dorme até o prazo absoluto do próximo passo
+        await asyncio.sleep(scheduler.sleep_time())
+
+class UdpProtocol(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.channel = None
+
+    def connection_made(self, transport):
+        self.channel = enable_udp(transport.sendto)
+
+    def datagram_received(self, data, addr):
+        self.channel.handle_datagram(data, addr)
+
+async def serve(host, port, udp=False, admin_port=None, profile_dump=None, replay_dir=None):
+    server = await asyncio.start_server(
+        handle_client, host or None, port, reuse_address=True, limit=MAX_LINE_SIZE
+    )
+    print(f"Observando TCP (asyncio) na porta :{port}")
+    if udp:
+        await asyncio.get_running_loop().create_datagram_endpoint(
+            UdpProtocol, local_addr=(host or "0.0.0.0", port)
+        )
+        print(f"Observando UDP (asyncio) na porta :{port}")
+    print(f"Aguardando jogadores (até {MAX_ROOMS} salas)...")
+
+    if replay_dir is not None:
+        enable_replays(replay_dir)
+
+    scheduler = FixedStepScheduler()
+    start_profiling(scheduler, admin_port, profile_dump)
+    loop_task = asyncio.create_task(game_loop(AsyncSpectatorFanout(), scheduler))
+    async with server:
+        try:
+            await server.serve_forever()
+        finally:
+            loop_task.cancel()
+
+def run(host, port, udp=False, admin_port=None, profile_dump=None, replay_dir=None):
+    try:
+        asyncio.run(serve(host, port, udp, admin_port, profile_dump, replay_dir))
+    except KeyboardInterrupt:
+        pass
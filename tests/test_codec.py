@@ -0,0 +1,175 @@
+import random
+import pytest
+from config import GameState
+from codec import CODECS, MAX_FRAME_SIZE, FrameReader, get_codec
+
+# Valores exatos em float32 (o codec binário usa "f")
+STATE = GameState(
+    p1y=300.5, p2y=350.25, ballx=410.0, bally=320.75, ballvx=-6.0, ballvy=2.5,
+    score1=1, score2=2, game_started=True, time_left=170.5, game_over=False, winner=0
+)
+
+def read_frame(codec, payload):
+    """Passa o payload pelo FrameReader como o cliente; retorna (controles, estado)."""
+    return FrameReader(codec).feed(payload)
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_state_round_trip(name):
+    codec = get_codec(name)
+    _controls, frame = read_frame(codec, codec.encode_state(STATE, 42, 3, (7, 9)))
+    assert codec.decode_state(frame) == (42, 3, (7, 9), STATE)
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_control_round_trip(name):
+    codec = get_codec(name)
+    controls, frame = read_frame(codec, codec.encode_control({"player": 2}))
+    assert controls == [{"player": 2}]
+    assert frame is None
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        get_codec("xml")
+
+# ------------------ Deltas ------------------
+
+BASE = GameState(
+    p1y=330.0, p2y=330.0, ballx=400.0, bally=330.0, ballvx=6.0, ballvy=0.0,
+    score1=0, score2=0, game_started=False, time_left=180.0, game_over=False, winner=0
+)
+CHANGED = STATE._replace(game_over=True, winner=2)  # todos os campos diferentes de BASE
+
+def test_changed_differs_in_every_field():
+    assert all(new != old for new, old in zip(CHANGED, BASE))
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+@pytest.mark.parametrize("bit", range(len(GameState._fields)))
+def test_delta_round_trip_single_field(name, bit):
+    """Um campo por vez (um bit da máscara do codec binário)."""
+    codec = get_codec(name)
+    field = GameState._fields[bit]
+    state = BASE._replace(**{field: getattr(CHANGED, field)})
+    _controls, frame = read_frame(codec, codec.encode_delta(state, 11, BASE, 10, 1, (3, 4)))
+    assert codec.decode_state(frame, {10: BASE}) == (11, 1, (3, 4), state)
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+@pytest.mark.parametrize("mask", [0, 0b101010101010, 0b010101010101, (1 << len(GameState._fields)) - 1])
+def test_delta_round_trip_masks(name, mask):
+    codec = get_codec(name)
+    state = GameState._make(
+        new if mask & (1 << i) else old for i, (new, old) in enumerate(zip(CHANGED, BASE))
+    )
+    _controls, frame = read_frame(codec, codec.encode_delta(state, 11, BASE, 10))
+    assert codec.decode_state(frame, {10: BASE})[3] == state
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_delta_without_base(name):
+    """Sem o estado base no histórico o delta não é aplicado (aguarda keyframe)."""
+    codec = get_codec(name)
+    _controls, frame = read_frame(codec, codec.encode_delta(CHANGED, 11, BASE, 10))
+    assert codec.decode_state(frame, {9: BASE})[3] is None
+
+# ------------------ FrameReader ------------------
+
+def chunks(data, sizes):
+    """Corta data em pedaços com os tamanhos de sizes (repetidos em ciclo)."""
+    pos, i = 0, 0
+    while pos < len(data):
+        yield data[pos:pos + sizes[i % len(sizes)]]
+        pos += sizes[i % len(sizes)]
+        i += 1
+
+def make_stream(codec, rng, count):
+    """Estados (keyframes e deltas) com controles intercalados.
+    Retorna (bytes, {tick: estado}, controles em ordem)."""
+    payloads, states, controls = [], {}, []
+    for tick in range(1, count + 1):
+        if rng.random() < 0.3:
+            message = {"seq": tick, "text": "x" * rng.randint(0, 300)}
+            controls.append(message)
+            payloads.append(codec.encode_control(message))
+        state = STATE._replace(p1y=float(tick % 500), score1=tick % 100, score2=rng.randint(0, 9))
+        states[tick] = state
+        if rng.random() < 0.5:
+            payloads.append(codec.encode_delta(state, tick, BASE, 0, 1, (tick, 0)))
+        else:
+            payloads.append(codec.encode_state(state, tick, 1, (tick, 0)))
+    return b"".join(payloads), states, controls
+
+def read_stream(codec, pieces):
+    """Alimenta o FrameReader pedaço a pedaço; retorna (controles, [(tick, estado)])."""
+    reader = FrameReader(codec)
+    controls, received = [], []
+    for piece in pieces:
+        new_controls, frame = reader.feed(piece)
+        controls += new_controls
+        if frame is not None:
+            tick, _step, _acks, state = codec.decode_state(frame, {0: BASE})
+            received.append((tick, state))
+    assert not reader.buffer
+    return controls, received
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_reader_returns_newest_state(name):
+    """Vários estados no mesmo feed: só o mais novo é devolvido, mas todos
+    os controles, em ordem."""
+    codec = get_codec(name)
+    payload = (codec.encode_state(BASE, 1) + codec.encode_control({"a": 1})
+               + codec.encode_state(STATE, 2) + codec.encode_control({"b": 2})
+               + codec.encode_state(CHANGED, 3))
+    controls, frame = read_frame(codec, payload)
+    assert controls == [{"a": 1}, {"b": 2}]
+    assert codec.decode_state(frame) == (3, 1, (0, 0), CHANGED)
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_reader_control_after_newest_state(name):
+    codec = get_codec(name)
+    payload = codec.encode_state(STATE, 5) + codec.encode_control({"a": 1})
+    controls, frame = read_frame(codec, payload)
+    assert controls == [{"a": 1}]
+    assert codec.decode_state(frame)[0] == 5
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+@pytest.mark.parametrize("chunk", [1, 2, 3, 5, 7, 64, 1460])
+def test_reader_frames_split_across_feeds(name, chunk):
+    """Frames, o tamanho binário e o delimitador JSON (2 bytes) cortados em
+    qualquer ponto: a leitura continua de onde parou."""
+    codec = get_codec(name)
+    data, states, expected_controls = make_stream(codec, random.Random(chunk), 60)
+    controls, received = read_stream(codec, chunks(data, [chunk]))
+    assert controls == expected_controls
+    assert received[-1] == (60, states[60])
+    if chunk == 1:  # cada feed completa no máximo um frame: nenhum estado some
+        assert received == sorted(states.items())
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_reader_random_chunks(name):
+    codec = get_codec(name)
+    rng = random.Random(7)
+    for _ in range(20):
+        data, states, expected_controls = make_stream(codec, rng, rng.randint(1, 200))
+        sizes = [rng.randint(1, 700) for _ in range(50)]
+        controls, received = read_stream(codec, chunks(data, sizes))
+        assert controls == expected_controls
+        ticks = [tick for tick, _state in received]
+        assert ticks == sorted(set(ticks)) and ticks[-1] == max(states)
+        assert all(state == states[tick] for tick, state in received)
+
+def test_reader_json_frame_too_large():
+    codec = get_codec("json")
+    reader = FrameReader(codec)
+    with pytest.raises(ValueError):
+        for piece in chunks(b"x" * (MAX_FRAME_SIZE + 1), [1460]):
+            reader.feed(piece)
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_reader_max_frame(name):
+    """O limite vale para os bytes de um frame ainda incompleto."""
+    codec = get_codec(name)
+    payload = codec.encode_control({"text": "x" * 500})
+    reader = FrameReader(codec, max_frame=len(payload) - 2)
+    reader.feed(payload[:-2])
+    with pytest.raises(ValueError):
+        reader.feed(payload[-2:-1])
+    reader = FrameReader(codec, max_frame=len(payload) - 1)
+    assert reader.feed(payload[:-1]) == ([], None)
+    assert reader.feed(payload[-1:]) == ([{"text": "x" * 500}], None)
@@ -0,0 +1,130 @@
+import math
+import random
+import pytest
+import engine
+from config import (
+    BALL_SIZE, HEIGHT, HUD_HEIGHT, PADDLE_DISTANCE_FROM_GOAL, PADDLE_HEIGHT, PADDLE_WIDTH, PlayerInput
+)
+from engine import (
+    HALF_B, LEFT_GOAL_ZONE_X, RIGHT_GOAL_ZONE_X, PADDLE_SPEED,
+    goal_collisions, initial_state, start_match, step, sweep_ball
+)
+from policies import RandomPolicy, TrackBall
+
+def play(p1, p2, ticks, seconds=60.0):
+    state = start_match(initial_state()._replace(time_left=seconds))
+    states = []
+    for _ in range(ticks):
+        state = step(state, PlayerInput(p1(state, 1)), PlayerInput(p2(state, 2)))
+        states.append(state)
+    return states
+
+def test_goal_collisions_noop_outside_goal_zones():
+    """Fora das zonas dos gols (antes e depois do movimento) o teste
+    completo não muda nada: é o que a broadphase do step pula."""
+    rng = random.Random(1)
+    low, high = LEFT_GOAL_ZONE_X + HALF_B, RIGHT_GOAL_ZONE_X - HALF_B
+    for _ in range(20000):
+        prev_x, ball_x = rng.uniform(low, high), rng.uniform(low, high)
+        prev_y, ball_y = rng.uniform(HUD_HEIGHT, HEIGHT), rng.uniform(HUD_HEIGHT, HEIGHT)
+        ball_vx, ball_vy = rng.uniform(-12, 12), rng.uniform(-12, 12)
+        args = (prev_x, prev_y, ball_x, ball_y, ball_vx, ball_vy, 3, 4)
+        assert goal_collisions(*args) == args[2:]
+
+@pytest.mark.parametrize("seed", range(4))
+def test_broadphase_matches_full_goal_test(seed, monkeypatch):
+    """Partidas inteiras com e sem a broadphase dão os mesmos estados."""
+    with_broadphase = play(TrackBall(seed), RandomPolicy(seed), 3600)
+    monkeypatch.setattr(engine, "LEFT_GOAL_ZONE_X", math.inf)
+    monkeypatch.setattr(engine, "RIGHT_GOAL_ZONE_X", -math.inf)
+    full = play(TrackBall(seed), RandomPolicy(seed), 3600)
+    assert with_broadphase == full
+    assert with_broadphase[-1].score1 + with_broadphase[-1].score2 > 0  # houve gols
+
+# ------------------ Colisão contínua ------------------
+
+HALF_W = PADDLE_WIDTH//2 + BALL_SIZE//2
+HALF_H = PADDLE_HEIGHT//2 + BALL_SIZE//2
+
+@pytest.fixture
+def swept(monkeypatch):
+    """Liga SWEPT_COLLISION e registra (vx antes, vx depois) de cada
+    rebote em paddle informado por sweep_ball."""
+    monkeypatch.setattr(engine, "SWEPT_COLLISION", True)
+    hits = []
+
+    def recording_sweep(x0, y0, vx, vy, *paddles):
+        result = sweep_ball(x0, y0, vx, vy, *paddles)
+        if result[4]:
+            hits.append((vx, result[2]))
+        return result
+    monkeypatch.setattr(engine, "sweep_ball", recording_sweep)
+    return hits
+
+def assert_all_bounced(hits):
+    assert hits
+    assert all((after > 0) != (before > 0) for before, after in hits)
+
+@pytest.mark.parametrize("scale, case", [
+    # Contato em que o teste de sobreposição no ponto de impacto erra por um ulp
+    (4.0, (117.65568505760243, 447.0598683590934, 5.955424407580563, -0.7300137845230715,
+           405.99020348887257, 425.99020348887257)),
+    (1.0, (152.10314837713616, 546.7946836277858, -5.040243496227165, -3.255141394584843,
+           510.28834872635133, 515.2883487263514)),
+])
+def test_swept_paddle_hit_always_bounces(monkeypatch, scale, case):
+    monkeypatch.setattr(engine, "STEP_SCALE", scale)
+    x0, y0, vx, vy, py0, py1 = case
+    _x, _y, new_vx, _vy, paddle = sweep_ball(x0, y0, vx, vy, py0, py1, 300.0, 300.0)
+    assert paddle == 1
+    assert (new_vx > 0) != (vx > 0)
+
+@pytest.mark.parametrize("scale", [1.0, 4.0])
+def test_swept_paddle_hits_fuzz(monkeypatch, scale):
+    """Bola perto do paddle 1 (que também se move): todo contato informado
+    rebate e termina o passo fora do paddle. (Depois de rebater em outro
+    collider a bola pode entrar no paddle; aí vale o teste discreto do step.)"""
+    monkeypatch.setattr(engine, "STEP_SCALE", scale)
+    rng = random.Random(3)
+    paddle_x = PADDLE_DISTANCE_FROM_GOAL
+    hits = 0
+    for _ in range(20000):
+        py0 = rng.uniform(120, 540)
+        py1 = py0 + rng.choice((-1, 0, 1)) * PADDLE_SPEED * scale
+        x0, y0 = paddle_x + rng.uniform(-40, 40), py0 + rng.uniform(-45, 45)
+        if abs(x0 - paddle_x) < HALF_W and abs(y0 - py0) < HALF_H:
+            continue  # já começa sobreposto (fica com o teste discreto)
+        angle = rng.uniform(-math.pi / 4, math.pi / 4)
+        vx, vy = 6 * math.cos(angle) * rng.choice((-1, 1)), 6 * math.sin(angle)
+        x, y, new_vx, _vy, paddle = sweep_ball(x0, y0, vx, vy, py0, py1, 300.0, 300.0)
+        if paddle:
+            hits += 1
+            assert (new_vx > 0) != (vx > 0)
+            assert not (abs(x - paddle_x) < HALF_W - 1e-9 and abs(y - py1) < HALF_H - 1e-9)
+    assert hits > 1000
+
+@pytest.mark.parametrize("direction", [1, -1])
+def test_swept_moving_paddle_face_contact(monkeypatch, direction):
+    """Paddle andando sobre a bola (face de baixo descendo, ou de cima
+    subindo), em passo largo: a bola rebate para longe da face."""
+    monkeypatch.setattr(engine, "STEP_SCALE", 4.0)
+    paddle_x = PADDLE_DISTANCE_FROM_GOAL
+    py0 = 300.0
+    py1 = py0 + direction * PADDLE_SPEED * 4.0
+    # 2 px além da face, dentro da faixa x do paddle, indo para o centro dele
+    x0, y0 = paddle_x + 10, py0 + direction * (HALF_H + 2)
+    vx, vy = -4.0, direction * 4.0
+    x, y, new_vx, new_vy, paddle = sweep_ball(x0, y0, vx, vy, py0, py1, 300.0, 300.0)
+    assert paddle == 1
+    assert (new_vy > 0) == (direction > 0)  # para longe da face
+    assert new_vx > 0
+    assert not (abs(x - paddle_x) < HALF_W and abs(y - py1) < HALF_H)
+
+@pytest.mark.parametrize("scale", [1.0, 4.0])
+def test_swept_matches_no_lost_bounces(swept, monkeypatch, scale):
+    """Partidas inteiras com SWEPT_COLLISION (60 Hz e passo 4x maior, como
+    com TICK_RATE=15): nenhum rebote informado pelo sweep se perde."""
+    monkeypatch.setattr(engine, "STEP_SCALE", scale)
+    for seed in range(40):
+        play(TrackBall(seed), RandomPolicy(seed), 1800)
+    assert_all_bounced(swept)
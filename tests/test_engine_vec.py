@@ -0,0 +1,76 @@
+import math
+import random
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import engine
+from config import GOAL_Y, GOAL_HEIGHT, HEIGHT, HUD_HEIGHT, PlayerInput, WIDTH
+from engine import initial_state, start_match
+from engine_vec import MatchBatch
+
+MATCHES = 100
+TICKS = 1600
+
+def random_state(rng):
+    """Partida em andamento com a bola em qualquer ponto do campo (perto dos
+    gols e das quinas inclusive) e tempo curto o bastante para algumas
+    acabarem no meio."""
+    state = start_match(initial_state())
+    angle = rng.uniform(0, 2 * math.pi)
+    speed = rng.uniform(4, 9)
+    return state._replace(
+        ballx=rng.uniform(20, WIDTH - 20),
+        bally=rng.choice((rng.uniform(HUD_HEIGHT + 10, HEIGHT - 10),
+                          rng.uniform(GOAL_Y - 30, GOAL_Y + 30),
+                          rng.uniform(GOAL_Y + GOAL_HEIGHT - 30, GOAL_Y + GOAL_HEIGHT + 30))),
+        ballvx=speed * math.cos(angle),
+        ballvy=speed * math.sin(angle),
+        p1y=rng.uniform(HUD_HEIGHT, HEIGHT),
+        p2y=rng.uniform(HUD_HEIGHT, HEIGHT),
+        time_left=rng.uniform(5, 40),
+    )
+
+def choose(rng, state, paddle_y, hold):
+    """Metade das partidas segue a bola (para haver rebatidas), a outra
+    metade mexe aleatoriamente."""
+    if hold and rng.random() < 0.5:
+        return 0 if abs(state.bally - paddle_y) < 8 else (1 if state.bally > paddle_y else -1)
+    return rng.choice((-1, 0, 1))
+
+def test_batch_matches_scalar_step(monkeypatch):
+    """MatchBatch dá exatamente os mesmos estados que engine.step, tick a
+    tick, em partidas que passam por gols, quinas, paddles e fim de tempo."""
+    monkeypatch.setattr(engine, "SWEPT_COLLISION", False)
+    corners = []
+    corner_bounce = engine._corner_bounce
+    def counting_corner_bounce(*args):
+        result = corner_bounce(*args)
+        corners.append(result[0])
+        return result
+    monkeypatch.setattr(engine, "_corner_bounce", counting_corner_bounce)
+    rng = random.Random(11)
+    states = [random_state(rng) for _ in range(MATCHES)]
+    batch = MatchBatch.from_states(states)
+    assert batch.states() == states
+    dirs = [[0, 0] for _ in states]
+    goals = paddle_hits = ended = 0
+    for tick in range(TICKS):
+        for i, state in enumerate(states):
+            if tick % 6 == 0:
+                dirs[i] = [choose(rng, state, state.p1y, i % 2 == 0),
+                           choose(rng, state, state.p2y, i % 3 == 0)]
+        p1 = np.array([d[0] for d in dirs])
+        p2 = np.array([d[1] for d in dirs])
+        new_states = [engine.step(state, PlayerInput(a), PlayerInput(b))
+                      for state, (a, b) in zip(states, dirs)]
+        batch.step(p1, p2)
+        assert batch.states() == new_states, f"divergiu no tick {tick}"
+        for old, new in zip(states, new_states):
+            goals += (new.score1 + new.score2) - (old.score1 + old.score2)
+            ended += new.game_over and not old.game_over
+            if (old.ballvx > 0) != (new.ballvx > 0) and abs(new.ballx - WIDTH / 2) > 200:
+                paddle_hits += 1
+        states = new_states
+    # O teste só vale se passou pelos casos difíceis
+    assert goals > 50 and paddle_hits > 100 and ended > 20 and sum(corners) > 20
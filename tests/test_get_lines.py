@@ -0,0 +1,57 @@
+import random
+import pytest
+from server import DELIMITER, MAX_LINE_SIZE, get_lines
+
+class ChunkedConn:
+    """Socket falso: entrega o stream em pedaços de tamanho fixo ou aleatório."""
+
+    def __init__(self, data, chunk=None, seed=0):
+        self.data = data
+        self.pos = 0
+        self.chunk = chunk
+        self.rng = random.Random(seed)
+
+    def recv_into(self, view):
+        size = self.chunk or self.rng.randint(1, 4000)
+        n = min(len(view), size, len(self.data) - self.pos)
+        view[:n] = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+def stream(lines):
+    return b"".join(line + DELIMITER for line in lines)
+
+LINES = [b'{"direction":1,"seq":%d}' % i for i in range(200)]
+
+@pytest.mark.parametrize("chunk", [1, 2, 3, 5, 7, 64, 1460])
+def test_lines_split_across_chunks(chunk):
+    """Linhas e o delimitador (2 bytes) cortados em qualquer ponto."""
+    assert list(get_lines(ChunkedConn(stream(LINES), chunk))) == LINES
+
+def test_long_lines_random_chunks():
+    rng = random.Random(1)
+    lines = [b"x" * rng.randint(0, MAX_LINE_SIZE) for _ in range(500)]
+    assert list(get_lines(ChunkedConn(stream(lines), seed=2))) == lines
+
+def test_partial_line_at_eof():
+    data = stream(LINES[:2]) + b'{"tail":1}'
+    assert list(get_lines(ChunkedConn(data, 3))) == LINES[:2] + [b'{"tail":1}']
+
+def test_empty_lines():
+    assert list(get_lines(ChunkedConn(DELIMITER * 2 + b"a" + DELIMITER, 1))) == [b"", b"", b"a"]
+
+def test_line_at_limit_is_accepted():
+    line = b"a" * MAX_LINE_SIZE
+    assert list(get_lines(ChunkedConn(stream([line, b"b"]), 1460))) == [line, b"b"]
+
+@pytest.mark.parametrize("chunk", [1, 1460, None])
+def test_overlong_line_raises(chunk):
+    lines = get_lines(ChunkedConn(stream([b"ok", b"a" * (MAX_LINE_SIZE + 1)]), chunk))
+    assert next(lines) == b"ok"
+    with pytest.raises(ValueError):
+        next(lines)
+
+def test_overlong_line_without_delimiter_raises():
+    """Um cliente que nunca manda o delimitador não faz o buffer crescer."""
+    with pytest.raises(ValueError):
+        list(get_lines(ChunkedConn(b"a" * (10 * MAX_LINE_SIZE), 1460)))
@@ -0,0 +1,59 @@
+import random
+import server
+from config import INPUT_DELAY_TICKS, PlayerInput
+
+class FakeSession:
+    codec = None
+    spectator = False
+
+def script(seed, length=600):
+    """Inputs do jogador 1: (tick visto pelo cliente, direção)."""
+    rng = random.Random(seed)
+    return [(tick, rng.choice((-1, 0, 1)))
+            for tick in range(1, length) if rng.random() < 0.2]
+
+def play(inputs, offsets):
+    """Entrega cada input offsets[i] ticks depois do tick carimbado.
+    Retorna o y do paddle 1 em cada tick."""
+    room = server.GameRoom(1)
+    room.add_player(FakeSession())
+    arrivals = {}
+    for seq, ((tick, direction), offset) in enumerate(zip(inputs, offsets), 1):
+        arrivals.setdefault(tick + offset, []).append(PlayerInput(direction, seq, tick))
+    path = []
+    for _ in range(inputs[-1][0] + 40):
+        for player_input in arrivals.get(room.tick_count, ()):
+            room.set_input(1, player_input)
+        room.tick()
+        path.append(room.state.p1y)
+    return path
+
+def late_inputs():
+    return server.profiler.snapshot()["counters"].get("late_inputs", 0)
+
+def test_jitter_within_delay_keeps_paddle_path():
+    """O mesmo script carimbado, com jitter menor que o atraso, produz o
+    mesmo caminho do paddle."""
+    inputs = script(1)
+    expected = play(inputs, [0] * len(inputs))
+    assert len(set(expected)) > 10
+    rng = random.Random(2)
+    for _ in range(5):
+        before = late_inputs()
+        offsets = [rng.randrange(INPUT_DELAY_TICKS) for _ in inputs]
+        assert play(inputs, offsets) == expected
+        assert late_inputs() == before
+
+def test_delay_follows_round_trip():
+    """RTT acima de INPUT_DELAY_TICKS: só o primeiro input chega atrasado;
+    depois o atraso acompanha o RTT e o jitter não muda o caminho."""
+    inputs = [(1, 0)] + script(3)
+    lag = 3 * INPUT_DELAY_TICKS
+    rng = random.Random(4)
+    paths = []
+    for jitter in (0, 1, 2, 2, 2):
+        before = late_inputs()
+        offsets = [lag] + [lag - rng.randint(0, jitter) for _ in inputs[1:]]
+        paths.append(play(inputs, offsets))
+        assert late_inputs() - before == 1
+    assert all(path == paths[0] for path in paths)
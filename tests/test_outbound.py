@@ -0,0 +1,45 @@
+import pytest
+from server import OutboundQueue, profiler
+
+@pytest.fixture(autouse=True)
+def reset_profiler():
+    profiler.reset()
+
+def dropped_frames():
+    return profiler.snapshot()["counters"].get("dropped_frames", 0)
+
+def drain(queue):
+    frames = []
+    while (payload := queue.pop()) is not None:
+        frames.append(payload)
+    return frames
+
+def test_latest_keeps_only_newest_state():
+    queue = OutboundQueue(maxsize=3, policy="latest")
+    for i in range(4):
+        assert queue.push(f"s{i}", state=True)
+    assert drain(queue) == ["s3"]
+    assert dropped_frames() == 3
+
+def test_latest_keeps_control_frames_in_order():
+    queue = OutboundQueue(maxsize=3, policy="latest")
+    assert queue.push("player")
+    assert queue.push("s0", state=True)
+    assert queue.push("udp_token")
+    assert queue.push("s1", state=True)
+    assert drain(queue) == ["player", "udp_token", "s1"]
+    assert dropped_frames() == 1
+
+def test_latest_full_of_controls_disconnects():
+    queue = OutboundQueue(maxsize=2, policy="latest")
+    assert queue.push("c0")
+    assert queue.push("c1")
+    assert not queue.push("s0", state=True)
+    assert drain(queue) == ["c0", "c1"]
+
+def test_disconnect_policy():
+    queue = OutboundQueue(maxsize=2, policy="disconnect")
+    assert queue.push("s0", state=True)
+    assert queue.push("s1", state=True)
+    assert not queue.push("s2", state=True)
+    assert dropped_frames() == 0
@@ -0,0 +1,106 @@
+import random
+import pytest
+import engine
+import replay as replay_module
+import server
+from config import PlayerInput, REPLAY_KEYFRAME_INTERVAL
+from replay import Replay, ReplayWriter
+
+class FakeSession:
+    codec = None
+    spectator = False
+
+@pytest.fixture(scope="module")
+def recorded(tmp_path_factory):
+    """Grava play_match. Retorna (caminho do replay, {tick: estado depois do tick})."""
+    directory = tmp_path_factory.mktemp("replays")
+    writer = ReplayWriter(str(directory))
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(server, "replay_writer", writer)
+        states = play_match(server.GameRoom(1))
+    writer.close()
+    paths = list(directory.glob("*.replay"))
+    assert len(paths) == 1
+    return paths[0], states
+
+def play_match(room):
+    """Partida curta na sala: inputs aleatórios (inclusive direções fora de
+    -1..1), uma pausa e fim de jogo."""
+    p1, p2 = FakeSession(), FakeSession()
+    room.add_player(p1)
+    room.add_player(p2)
+    room.state = room.state._replace(time_left=30.0)
+    rng = random.Random(1)
+    states = {}
+    for i in range(60 * 40):
+        if i == 700:
+            room.remove(p2)
+        if i == 760:
+            room.add_player(p2)
+        if rng.random() < 0.1:
+            room.set_input(1, PlayerInput(rng.choice((-1, 0, 1, 3, 500))))
+            room.set_input(2, PlayerInput(rng.choice((-1, 0, 1)), None, room.tick_count))
+        room.tick()
+        states[room.tick_count] = room.state
+        if room.state.game_over:
+            break
+    assert room.state.game_over and room.replay is None
+    return states
+
+def test_keyframes(recorded):
+    path, states = recorded
+    with Replay(path) as replay:
+        assert (replay.first_tick, replay.last_tick) == (1, max(states))
+        # Periódicos + pausa (tick 701) e retomada (tick 761)
+        assert {1, 1 + REPLAY_KEYFRAME_INTERVAL, 701, 761} <= set(replay.keyframe_ticks)
+
+def test_seek_matches_recorded_states(recorded):
+    path, states = recorded
+    with Replay(path) as replay:
+        # Amostra + os ticks em volta de cada keyframe (onde o seek troca de base)
+        ticks = set(range(replay.first_tick, replay.last_tick + 1, 5))
+        for keyframe in replay.keyframe_ticks:
+            ticks.update(t for t in (keyframe - 1, keyframe, keyframe + 1) if t in states)
+        ticks.add(replay.last_tick)
+        for tick in sorted(ticks):
+            assert replay.state_at(tick) == states[tick]
+
+def test_states_iterates_ranges(recorded):
+    path, states = recorded
+    with Replay(path) as replay:
+        assert dict(replay.states()) == states
+        assert list(replay.states(650, 900)) == [(t, states[t]) for t in range(650, 901)]
+
+def test_seek_out_of_range(recorded):
+    path, _states = recorded
+    with Replay(path) as replay:
+        with pytest.raises(IndexError):
+            replay.state_at(replay.last_tick + 1)
+        with pytest.raises(IndexError):
+            replay.state_at(0)
+
+@pytest.mark.parametrize("cut", [1, 7, 40])
+def test_truncated_file(recorded, tmp_path, cut):
+    """Gravação interrompida: vale até o último registro completo."""
+    path, states = recorded
+    truncated = tmp_path / "truncated.bin"
+    truncated.write_bytes(path.read_bytes()[:-cut])
+    with Replay(truncated) as replay:
+        assert replay.last_tick < max(states)
+        assert replay.state_at(replay.last_tick) == states[replay.last_tick]
+
+@pytest.mark.parametrize("name, value", [("TICK_RATE", 30), ("SWEPT_COLLISION", True)])
+def test_config_mismatch(recorded, monkeypatch, name, value):
+    """Com outro TICK_RATE ou SWEPT_COLLISION os passos refeitos divergem."""
+    path, _states = recorded
+    with Replay(path) as replay:
+        assert (replay.tick_rate, replay.swept_collision) == (replay_module.TICK_RATE, False)
+    monkeypatch.setattr(replay_module if name == "TICK_RATE" else engine, name, value)
+    with pytest.raises(ValueError):
+        Replay(path)
+
+def test_not_a_replay(tmp_path):
+    bad = tmp_path / "bad.replay"
+    bad.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        Replay(bad)
@@ -0,0 +1,46 @@
+from scheduler import FixedStepScheduler
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make(step=0.25, max_catchup=3):
+    # Passo em potência de 2: os prazos somados são exatos em float
+    clock = FakeClock()
+    return FixedStepScheduler(step, max_catchup, clock), clock
+
+def test_steps_on_absolute_deadlines():
+    scheduler, clock = make()
+    assert scheduler.due_steps() == 0
+    assert scheduler.sleep_time() == 0.25
+    clock.now = 0.25
+    assert scheduler.due_steps() == 1
+    # Acordar um pouco atrasado não desloca a grade
+    clock.now = 0.55
+    assert scheduler.due_steps() == 1
+    assert scheduler.sleep_time() == 0.75 - 0.55
+    assert scheduler.stats() == {"steps": 2, "late_ticks": 0, "dropped_steps": 0, "overruns": 0}
+
+def test_catches_up_late_steps():
+    scheduler, clock = make()
+    clock.now = 0.8  # prazos 0.25, 0.5 e 0.75 vencidos
+    assert scheduler.due_steps() == 3
+    assert scheduler.stats()["late_ticks"] == 2
+    assert scheduler.sleep_time() == 1.0 - 0.8
+
+def test_drops_steps_beyond_max_catchup():
+    scheduler, clock = make()
+    clock.now = 2.0  # 8 prazos vencidos, recupera 3
+    assert scheduler.due_steps() == 3
+    assert scheduler.stats()["dropped_steps"] == 5
+    # A grade recomeça a partir de agora
+    assert scheduler.sleep_time() == 0.25
+
+def test_counts_overruns():
+    scheduler, clock = make()
+    scheduler.finish(0.0, now=0.2)
+    scheduler.finish(0.0, now=0.3)
+    assert scheduler.stats()["overruns"] == 1
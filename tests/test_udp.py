@@ -0,0 +1,31 @@
+from codec import encode_udp_input
+from server import GameRoom, Session, UdpChannel
+
+def make_player():
+    channel = UdpChannel(lambda payload, addr: None)
+    room = GameRoom(1)
+    session = Session(None, ("127.0.0.1", 1000))
+    room.add_player(session)
+    token = channel.register(room, session)
+    return channel, session, token
+
+def test_new_seq_sets_address():
+    channel, session, token = make_player()
+    channel.handle_datagram(encode_udp_input(token, 1, 0, 1), ("10.0.0.1", 5000))
+    assert session.udp_addr == ("10.0.0.1", 5000)
+    # NAT trocou a porta: o próximo seq redireciona os snapshots
+    channel.handle_datagram(encode_udp_input(token, 2, 0, 1), ("10.0.0.1", 5001))
+    assert session.udp_addr == ("10.0.0.1", 5001)
+
+def test_replayed_datagram_keeps_address():
+    channel, session, token = make_player()
+    channel.handle_datagram(encode_udp_input(token, 5, 0, 1), ("10.0.0.1", 5000))
+    for seq in (5, 4):  # duplicado e atrasado, vindos de outro endereço
+        channel.handle_datagram(encode_udp_input(token, seq, 0, -1), ("10.9.9.9", 6666))
+    assert session.udp_addr == ("10.0.0.1", 5000)
+    assert session.udp_seq == 5
+
+def test_unknown_token_is_ignored():
+    channel, session, token = make_player()
+    channel.handle_datagram(encode_udp_input(token ^ 1, 1, 0, 1), ("10.9.9.9", 6666))
+    assert session.udp_addr is None